@@ -47,6 +47,7 @@ Usage
 __revision__ = "$Id$"
 
 from pknyx.core.device import Device
+from pknyx.core.deviceHost import DeviceHost
 from pknyx.core.functionalBlock import FunctionalBlock
 
 from pknyx.services.logger import Logger
@@ -0,0 +1,391 @@
+# -*- coding: utf-8 -*-
+
+""" Python KNX framework
+
+License
+=======
+
+ - B{pKNyX} (U{http://www.pknyx.org}) is Copyright:
+  - (C) 2013-2015 Frédéric Mantegazza
+
+This program is free software; you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation; either version 2 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program; if not, write to the Free Software
+Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+
+or see:
+
+ - U{http://www.gnu.org/licenses/gpl.html}
+
+Module purpose
+==============
+
+Telegram throughput benchmark
+
+Implements
+==========
+
+ - B{BenchTransceiver}
+ - B{StackBenchmark}
+
+Documentation
+=============
+
+Drives synthetic KNXnet/IP ROUTING_IND frames through a complete L{Stack}, using an in-process transceiver
+(no multicast involved), with a given number of bound GADs (one GroupObject per GAD).
+
+Measures:
+ - inbound: frames/s, and latency from frame reception to GroupObject.onWrite() completion (Datapoint updated
+   and owner notified);
+ - outbound: frames/s, and latency from Datapoint.value assignment to the frame being put on the wire.
+
+Throughput is measured by flooding the stack; latencies are measured frame by frame, on an idle stack.
+
+Frames not handled (inbound) or not put on the wire (outbound) before timeout are reported as missed, and make the
+benchmark fail.
+
+Usage
+=====
+
+python -m pknyx.benchmarks.stackBenchmark --gads 10,1000,10000 --frames 10000 --output results.json
+
+@author: Frédéric Mantegazza
+@copyright: (C) 2013-2015 Frédéric Mantegazza
+@license: GPL
+"""
+
+__revision__ = "$Id$"
+
+import argparse
+import json
+import platform
+import sys
+import threading
+import time
+
+from pknyx.common import config
+from pknyx.services.logger import Logger
+from pknyx.stack.stack import Stack
+from pknyx.stack.groupAddress import GroupAddress
+from pknyx.stack.priority import Priority
+from pknyx.stack.result import Result
+from pknyx.stack.transceiver.transceiver import Transceiver
+from pknyx.stack.knxnetip.knxNetIPHeader import KNXnetIPHeader
+from pknyx.stack.cemi.cemiLData import CEMILData
+from pknyx.stack.cemi.cemiLDataTelegram import CEMILDataTelegram
+from pknyx.core.datapoint import Datapoint
+from pknyx.core.groupObject import GroupObject
+
+
+class BenchTransceiver(Transceiver):
+    """ In-process transceiver
+
+    Incoming frames are injected by the benchmark; outgoing frames are encoded as on the wire, then dropped.
+
+    @ivar _onTransmit: callback called with each encoded outgoing frame
+    @type _onTransmit: callable
+    """
+    def __init__(self, tLSAP):
+        """
+        """
+        super(BenchTransceiver, self).__init__(tLSAP)
+
+        self._onTransmit = None
+        self._running = False
+        self._transmitter = threading.Thread(target=self._transmitterLoop, name="Bench transmitter")
+
+    @property
+    def onTransmit(self):
+        return self._onTransmit
+
+    @onTransmit.setter
+    def onTransmit(self, callback):
+        self._onTransmit = callback
+
+    def inject(self, inFrame):
+        """ Handle a KNXnet/IP frame, as if it was received from the bus
+
+        @param inFrame: KNXnet/IP frame
+        @type inFrame: bytearray
+        """
+        inFrame = memoryview(inFrame)
+        KNXnetIPHeader(inFrame)
+        cEMI = CEMILDataTelegram.decode(inFrame[KNXnetIPHeader.HEADER_SIZE:])
+        self._tLSAP.putInFrame(cEMI)
+
+    def _transmitterLoop(self):
+        """
+        """
+        while self._running:
+            transmission = self._tLSAP.getOutFrame()
+            if transmission is None:
+                continue
+
+            cEMIRawFrame = transmission.payload.raw
+            header = KNXnetIPHeader(service=KNXnetIPHeader.ROUTING_IND, serviceLength=len(cEMIRawFrame))
+            frame = header.frame + cEMIRawFrame
+            if self._onTransmit is not None:
+                self._onTransmit(frame)
+
+            transmission.result = Result.OK
+            transmission.acquire()
+            try:
+                transmission.waitConfirm = False
+                transmission.notifyAll()
+            finally:
+                transmission.release()
+
+    def start(self):
+        self._running = True
+        self._transmitter.start()
+
+    def stop(self):
+        self._running = False
+
+    def join(self):
+        self._transmitter.join()
+
+
+class BenchOwner(object):
+    """ Minimal Datapoint owner, recording notification times
+    """
+    def __init__(self):
+        super(BenchOwner, self).__init__()
+
+        self.times = []
+        self.expected = 0
+        self.event = threading.Event()
+
+    def notify(self, dp, oldValue, newValue):
+        self.times.append(time.time())
+        if len(self.times) >= self.expected:
+            self.event.set()
+
+
+class StackBenchmark(object):
+    """ Stack benchmark, for a given number of bound GADs
+    """
+    SRC = "1.1.1"
+    DEVICE = "1.1.254"
+
+    def __init__(self, nbGads, nbFrames, timeout=10.):
+        """
+
+        @param nbGads: number of GADs bound to the stack
+        @type nbGads: int
+
+        @param nbFrames: number of frames to send for each measure
+        @type nbFrames: int
+
+        @param timeout: max time to wait for inbound frames to be handled (all frames for throughput,
+                        each frame for latency), in s
+        @type timeout: float
+        """
+        super(StackBenchmark, self).__init__()
+
+        self._nbGads = nbGads
+        self._nbFrames = nbFrames
+        self._timeout = timeout
+
+        self._stack = Stack(StackBenchmark.DEVICE, transCls=BenchTransceiver, transParams={})
+        self._transceiver = self._stack.tc
+        self._owner = BenchOwner()
+
+        self._gads = []
+        self._datapoints = []
+        for i in xrange(nbGads):
+            gad = GroupAddress(i + 1)
+            datapoint = Datapoint(self._owner, "dp_%d" % i, "output", "1.001", default="Off")
+            groupObject = GroupObject(datapoint, flags="CWT")
+            groupObject.group = self._stack.agds.subscribe(gad, groupObject)
+            self._gads.append(gad)
+            self._datapoints.append(datapoint)
+
+        # Pre-built inbound frames (GroupValue_Write, alternating 0/1), one per GAD
+        self._inFrames = [self._buildFrame(gad, i % 2) for i, gad in enumerate(self._gads)]
+
+    def _buildFrame(self, gad, value):
+        """ Build a KNXnet/IP ROUTING_IND frame, with a GroupValue_Write of a 1 bit value
+        """
+        cEMI = CEMILData()
+        cEMI.messageCode = CEMILData.MC_LDATA_IND
+        cEMI.sourceAddress = StackBenchmark.SRC
+        cEMI.destinationAddress = gad
+        cEMI.priority = Priority("low")
+        cEMI.hopCount = 6
+        cEMI.npdu = bytearray((1, 0x00, 0x80 | value))
+        cEMIRawFrame = cEMI.frame.raw
+        header = KNXnetIPHeader(service=KNXnetIPHeader.ROUTING_IND, serviceLength=len(cEMIRawFrame))
+
+        return header.frame + cEMIRawFrame
+
+    @staticmethod
+    def _stats(count, duration, latencies, missed=0):
+        """ Compute throughput and latency percentiles (in µs)
+        """
+        latencies = sorted(latencies)
+
+        def percentile(p):
+            if not latencies:
+                return None
+            return round(latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1e6, 1)
+
+        return {"frames": count,
+                "missed": missed,
+                "framesPerSecond": round((count - missed) / duration, 1) if duration > 0 else None,
+                "latency": {"p50": percentile(0.50), "p99": percentile(0.99), "unit": "us"}
+               }
+
+    def _inbound(self):
+        inject = self._transceiver.inject
+        inFrames = self._inFrames
+        nbInFrames = len(inFrames)
+
+        # Throughput
+        self._owner.times = []
+        self._owner.expected = self._nbFrames
+        self._owner.event.clear()
+        startTime = time.time()
+        for i in xrange(self._nbFrames):
+            inject(inFrames[i % nbInFrames])
+        if self._owner.event.wait(self._timeout):
+            missed = 0
+            duration = self._owner.times[-1] - startTime
+        else:
+            missed = self._nbFrames - len(self._owner.times)
+            duration = time.time() - startTime
+            Logger().error("StackBenchmark._inbound(): %d frame(s) not handled after %.1fs" % (missed, self._timeout))
+
+        # Latency
+        latencies = []
+        for i in xrange(self._nbFrames):
+            self._owner.times = []
+            self._owner.expected = 1
+            self._owner.event.clear()
+            startTime = time.time()
+            inject(inFrames[i % nbInFrames])
+            if not self._owner.event.wait(self._timeout):
+                Logger().error("StackBenchmark._inbound(): frame %d not handled after %.1fs" % (i, self._timeout))
+                missed += 1
+                continue
+            latencies.append(self._owner.times[0] - startTime)
+
+        return self._stats(self._nbFrames, duration, latencies, missed)
+
+    @staticmethod
+    def _destination(frame):
+        """ Get the raw destination address of a KNXnet/IP ROUTING_IND frame
+        """
+        index = KNXnetIPHeader.HEADER_SIZE + 2 + frame[KNXnetIPHeader.HEADER_SIZE + 1] + 4
+        return frame[index] << 8 | frame[index + 1]
+
+    def _outbound(self):
+        transmitted = {}  # time of the last frame put on the wire, by raw GAD
+        condition = threading.Condition()
+
+        def onTransmit(frame):
+            with condition:
+                transmitted[self._destination(frame)] = time.time()
+                condition.notifyAll()
+
+        self._transceiver.onTransmit = onTransmit
+        datapoints = self._datapoints
+        gads = self._gads
+        nbDatapoints = len(datapoints)
+
+        # Each frame is waited for, as value assignment may not block until it is transmitted (GroupObject not
+        # waiting for confirmation, shaper delay...) or may not transmit anything (full output queue...)
+        latencies = []
+        missed = 0
+        lastTime = startTime = time.time()
+        for i in xrange(self._nbFrames):
+            datapoint = datapoints[i % nbDatapoints]
+            gad = gads[i % nbDatapoints].raw
+            with condition:
+                transmitted.pop(gad, None)
+            setTime = time.time()
+            datapoint.value = "On" if datapoint.value == "Off" else "Off"
+            endTime = setTime + self._timeout
+            with condition:
+                while gad not in transmitted and time.time() < endTime:
+                    condition.wait(endTime - time.time())
+                transmitTime = transmitted.get(gad)
+            if transmitTime is None:
+                Logger().error("StackBenchmark._outbound(): frame %d not transmitted after %.1fs" % (i, self._timeout))
+                missed += 1
+                continue
+            latencies.append(transmitTime - setTime)
+            lastTime = transmitTime
+        duration = lastTime - startTime
+
+        self._transceiver.onTransmit = None
+
+        return self._stats(self._nbFrames, duration, latencies, missed)
+
+    def run(self):
+        """ Run the benchmark
+
+        @return: results
+        @rtype: dict
+        """
+        self._stack.start()
+        try:
+            return {"gads": self._nbGads,
+                    "inbound": self._inbound(),
+                    "outbound": self._outbound()
+                   }
+        finally:
+            self._stack.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="stackBenchmark.py",
+                                     description="This tool measures the telegram throughput of the stack.")
+    parser.add_argument("-l", "--logger",
+                        choices=["trace", "debug", "info", "warning", "error", "exception", "critical"],
+                        action="store", dest="loggerLevel", default="info", metavar="LEVEL",
+                        help="logger level")
+    parser.add_argument("-g", "--gads", action="store", type=str, dest="gads", default="10,1000,10000",
+                        help="comma separated numbers of bound GADs")
+    parser.add_argument("-f", "--frames", action="store", type=int, dest="frames", default=10000,
+                        help="number of frames for each measure")
+    parser.add_argument("-t", "--timeout", action="store", type=float, dest="timeout", default=10.,
+                        help="max time to wait for inbound frames, in s")
+    parser.add_argument("-o", "--output", action="store", type=str, dest="output", default=None,
+                        help="JSON output file (default to stdout)")
+    args = parser.parse_args()
+
+    Logger().setLevel(args.loggerLevel)
+
+    results = {"version": config.APP_VERSION,
+               "python": platform.python_version(),
+               "platform": platform.platform(),
+               "date": time.strftime("%Y-%m-%dT%H:%M:%S"),
+               "results": []
+              }
+    for nbGads in [int(nbGads) for nbGads in args.gads.split(',')]:
+        results["results"].append(StackBenchmark(nbGads, args.frames, args.timeout).run())
+
+    if args.output is None:
+        json.dump(results, sys.stdout, indent=4, sort_keys=True)
+        print
+    else:
+        with open(args.output, 'w') as output:
+            json.dump(results, output, indent=4, sort_keys=True)
+
+    # Missed frames make the benchmark fail
+    if any(result["inbound"]["missed"] or result["outbound"]["missed"] for result in results["results"]):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -52,3 +52,27 @@ LOGGER_LEVEL = "info"
 LOGGER_DIR = "/tmp"
 LOGGER_MAX_BYTES = 4096 * 1024
 LOGGER_BACKUP_COUNT = 4  # set to 0 to disable logging on file
+
+# Notifier (threaded jobs)
+NOTIFIER_WORKERS = 4
+NOTIFIER_MAX_PENDING = 256
+NOTIFIER_OVERFLOW = "dropOldest"  # in ("dropOldest", "coalesce", "block")
+NOTIFIER_MAX_PER_FB = None  # max number of jobs of a FunctionalBlock running at the same time (None for no limit)
+NOTIFIER_STOP_TIMEOUT = 5.  # max time to wait for running jobs when a device stops, in s
+
+# Stack init reads (GroupValue_Read sent on start, for GroupObjects with the init flag)
+STACK_INIT_READ_RATE = 20.  # bus budget, in telegrams/s (should match the line coupler capacity)
+STACK_INIT_READ_BURST = 5  # number of reads which can be sent in a row
+STACK_INIT_READ_TIMEOUT = 2.  # time to wait for an answer, in s (doubled on each retry)
+STACK_INIT_READ_RETRIES = 2
+
+# Stack outbound traffic shaping
+STACK_OUT_QUEUE_SIZE = 0  # max number of pending transmissions (0 for no limit); new ones are dropped when full
+STACK_OUT_RATE = None  # bus budget, in telegrams/s (None for no limit); about 50 for a 9600 bit/s TP1 line
+STACK_OUT_BURST = 10  # number of telegrams which can be sent in a row
+STACK_OUT_PRIORITY_RATES = None  # bus budget of priorities, in telegrams/s (ex: {'low': 20.}), None for no limit
+STACK_OUT_MIN_INTERVAL = 0.  # min interval between 2 transmissions on the same GAD, in s (0 for no limit)
+
+# Stack group value cache (last known value of each GAD, filled from writes and responses)
+STACK_GROUP_VALUE_CACHE = True
+STACK_READ_TIMEOUT = 1.  # default time to wait for the answer of a local read, in s
@@ -34,8 +34,6 @@ Implements
 ==========
 
  - B{Signal}
- - B{_WeakMethod_FuncHost}
- - B{_WeakMethod}
 
 Documentation
 =============
@@ -43,10 +41,12 @@ Documentation
 To use, simply create a B{Signal} instance. The instance may be a member of a class, a global, or a local; it makes no
 difference what scope it resides within. Connect slots to the signal using the B{connect()} method.
 
-The slot may be a member of a class or a simple function. If the slot is a member of a class, Signal will automatically
-detect when the method's class instance has been deleted and remove it from its list of connected slots.
+The slot may be a member of a class or a simple function. If the slot is a member of a class, only a weak reference
+to its instance is kept: Signal will automatically detect when the instance has been deleted and remove it from its
+list of connected slots. Simple functions are kept alive by the signal.
 
-This class was generously donated by a poster on ASPN see U{http://aspn.activestate.com}
+Slots are stored in a dict (so connect/disconnect are O(1)), and called in connection order, from an immutable
+snapshot of the slots: connecting or disconnecting slots while the signal is emitted is safe.
 
 Usage
 =====
@@ -66,64 +66,102 @@ test(): 'Hello World!'
 
 __revision__ = "$Id$"
 
-import os
-import os.path
+import collections
+import threading
 import weakref
-import inspect
 
 #from pknyx.services.logger import Logger
 
 
 class Signal(object):
     """ class Signal.
+
+    @ivar _slots: connected slots, as (weak reference to instance or None, function), by key
+    @type _slots: L{OrderedDict<collections>}
+
+    @ivar _snapshot: cached snapshot of the slots (None when it must be rebuilt)
+    @type _snapshot: tuple
+
+    @ivar _lock: lock protecting slots changes
+    @type _lock: L{Lock<threading>}
     """
     def __init__(self):
         """ Init the Signal object.
         """
-        self.__slots = []
+        super(Signal, self).__init__()
 
-        # Keeping references to _WeakMethod_FuncHost objects.
-        # If we didn't, then the weak references would die for
-        # non-method slots that we've created.
-        self.__funchost = []
+        self._slots = collections.OrderedDict()
+        self._snapshot = ()
+        self._lock = threading.Lock()
 
     def __call__(self, *args, **kwargs):
         self.emit(*args, **kwargs)
 
+    def __len__(self):
+        return len(self._slots)
+
+    @staticmethod
+    def _key(slot):
+        """ Compute the key of a slot
+
+        @param slot: method or function
+        @type slot: callable
+        """
+        try:
+            return id(slot.im_self), slot.im_func
+        except AttributeError:
+            return slot
+
     def emit(self, *args, **kwargs):
         """ Emit the signal.
 
         @todo: add try/except?
         """
-        for i in xrange(len(self.__slots)):
-            slot = self.__slots[i]
-            if slot != None:
-                #try:
-                slot(*args, **kwargs)
-                #except:
-                #    Logger().exception("Signal.emit()", debug=True)
-                #    raise
+        snapshot = self._snapshot
+        if snapshot is None:
+            with self._lock:
+                snapshot = self._snapshot = tuple(self._slots.itervalues())
+
+        for ref, func in snapshot:
+            if ref is None:
+                func(*args, **kwargs)
             else:
-                del self.__slots[i]
+                obj = ref()
+                if obj is not None:
+                    func(obj, *args, **kwargs)
 
-    def connect(self, slot): # , keepRef=False):
+    def connect(self, slot):
         """ Connect slot to the signal
 
+        If the slot is already connected, it is moved to the end of the slots.
+
         @param slot: method or function
         @type slot: callable
         """
-        self.disconnect(slot)
-        if inspect.ismethod(slot):
-            #if keepRef:
-                #self.__slots.append(slot)
-            #else:
-            self.__slots.append(_WeakMethod(slot))
+        key = self._key(slot)
+        if isinstance(key, tuple) and slot.im_self is not None:
+            entry = (weakref.ref(slot.im_self, lambda ref, key=key: self._remove(key, ref)), slot.im_func)
         else:
-            o = _WeakMethod_FuncHost(slot)
-            self.__slots.append(_WeakMethod(o.func))
+            entry = (None, slot)
+        with self._lock:
+            self._slots.pop(key, None)
+            self._slots[key] = entry
+            self._snapshot = None
 
-            # we stick a copy in here just to keep the instance alive
-            self.__funchost.append(o)
+    def _remove(self, key, ref=None):
+        """ Remove a slot
+
+        @param key: key of the slot
+        @type key: tuple or callable
+
+        @param ref: if not None, only remove the slot if it uses this weak reference
+        @type ref: L{ref<weakref>}
+        """
+        with self._lock:
+            entry = self._slots.get(key)
+            if entry is not None and (ref is None or entry[0] is ref):
+                del self._slots[key]
+                self._snapshot = None
 
     def disconnect(self, slot):
         """ Disconnect slot from the signal
@@ -131,49 +169,95 @@ class Signal(object):
         @param slot: method or function
         @type slot: callable
         """
-        try:
-            for i in xrange(len(self.__slots)):
-                wm = self.__slots[i]
-                if inspect.ismethod(slot):
-                    if wm.f == slot.im_func and wm.c() == slot.im_self:
-                        del self.__slots[i]
-                        return
-                else:
-                    if wm.c().hostedFunction == slot:
-                        del self.__slots[i]
-                        return
-        except:
-            pass
+        self._remove(self._key(slot))
 
     def disconnectAll(self):
         """ Disconnect all slots from the signal
         """
-        del self.__slots
-        del self.__funchost
-        del self.__methodhost
-        self.__slots = []
-        self.__funchost = []
-        self.__methodhost = []
+        with self._lock:
+            self._slots.clear()
+            self._snapshot = ()
 
 
-class _WeakMethod_FuncHost:
-    """
-    """
-    def __init__(self, func):
-        self.hostedFunction = func
+if __name__ == '__main__':
+    import unittest
+    import gc
 
-    def func(self, *args, **kwargs):
-        self.hostedFunction(*args, **kwargs)
 
+    class Receiver(object):
+        def __init__(self, calls):
+            self.calls = calls
 
-class _WeakMethod:
-    """
-    """
-    def __init__(self, f):
-        self.f = f.im_func
-        self.c = weakref.ref(f.im_self)
+        def slot(self, *args, **kwargs):
+            self.calls.append((self, args, kwargs))
 
-    def __call__(self, *args, **kwargs):
-        if self.c() == None:
-            return
-        self.f(self.c(), *args, **kwargs)
+
+    class SignalTestCase(unittest.TestCase):
+
+        def setUp(self):
+            self.signal = Signal()
+            self.calls = []
+
+        def tearDown(self):
+            pass
+
+        def _function(self, *args):
+            pass
+
+        def test_function(self):
+            def slot(*args, **kwargs):
+                self.calls.append((slot, args, kwargs))
+            self.signal.connect(slot)
+            self.signal.connect(slot)
+            self.signal.emit(1, b=2)
+            self.assertEqual(self.calls, [(slot, (1,), {'b': 2})])
+            self.signal.disconnect(slot)
+            self.signal(3)
+            self.assertEqual(len(self.calls), 1)
+
+        def test_method(self):
+            receiver1 = Receiver(self.calls)
+            receiver2 = Receiver(self.calls)
+            self.signal.connect(receiver1.slot)
+            self.signal.connect(receiver2.slot)
+            self.assertEqual(len(self.signal), 2)
+            self.signal.emit(1)
+            self.assertEqual(self.calls, [(receiver1, (1,), {}), (receiver2, (1,), {})])
+            self.signal.disconnect(receiver1.slot)
+            self.signal.emit(2)
+            self.assertEqual(self.calls[-1], (receiver2, (2,), {}))
+            self.assertEqual(len(self.calls), 3)
+
+        def test_weak(self):
+            receiver = Receiver(self.calls)
+            self.signal.connect(receiver.slot)
+            del receiver
+            gc.collect()
+            self.assertEqual(len(self.signal), 0)
+            self.signal.emit(1)
+            self.assertEqual(self.calls, [])
+
+        def test_disconnectDuringEmit(self):
+            receivers = [Receiver(self.calls) for i in xrange(3)]
+            def slot(*args):
+                for receiver in receivers:
+                    self.signal.disconnect(receiver.slot)
+            self.signal.connect(slot)
+            for receiver in receivers:
+                self.signal.connect(receiver.slot)
+            self.signal.emit(1)
+            self.assertEqual(len(self.calls), 3)
+            self.signal.emit(2)
+            self.assertEqual(len(self.calls), 3)
+
+        def test_disconnectAll(self):
+            receiver = Receiver(self.calls)
+            self.signal.connect(receiver.slot)
+            self.signal.connect(self._function)
+            self.signal.disconnectAll()
+            self.signal.emit(1)
+            self.assertEqual(self.calls, [])
+            self.assertEqual(len(self.signal), 0)
+
+
+    unittest.main()
@@ -103,6 +103,9 @@ class Datapoint(object):
     @ivar _data: KNX encoded data
     @type _data: depends on sub-class
 
+    @ivar _frame: bus frame of the current data, with its size (built on first use)
+    @type _frame: tuple of (bytearray, int)
+
     @ivar _dptXlator: DPT translator associated with this Datapoint
     @type _dptXlator: L{DPTXlator<pknyx.core.dptXlator>}
 
@@ -114,6 +117,9 @@ class Datapoint(object):
                           Params sent are datapoint name, old and new values.
     @type _signalChanged: L{Signal}
 
+    @ivar _jobs: notifier jobs bound to this Datapoint
+    @type _jobs: tuple of (callable, str, bool, tuple)
+
     @todo: add desc. param
     @todo: take 'access' into account when transmit/receive
     """
@@ -152,6 +158,7 @@ class Datapoint(object):
         self._access = access
         self._default = default
         self._data = None
+        self._frame = None
 
         self._dptXlator = DPTXlatorFactory().create(dptId)
         if dptId != dptId.generic:
@@ -162,6 +169,8 @@ class Datapoint(object):
         # Signals definition
         self._signalChanged = Signal()
 
+        self._jobs = ()
+
         # Set default value
         if default is not None:
             self._setValue(default)
@@ -200,6 +209,7 @@ class Datapoint(object):
     def _setData(self, data):
         self._dptXlator.checkData(data)
         self._data = data
+        self._frame = None
 
     @property
     def dptXlator(self):
@@ -213,6 +223,18 @@ class Datapoint(object):
     def signalChanged(self):
         return self._signalChanged
 
+    @property
+    def jobs(self):
+        return self._jobs
+
+    def addJob(self, job):
+        """ Bind a notifier job to the Datapoint
+
+        @param job: notifier job, as (method, condition, thread, fold)
+        @type job: tuple
+        """
+        self._jobs += (job,)
+
     @property
     def value(self):
         if self._data is None:
@@ -245,7 +267,14 @@ class Datapoint(object):
 
     @property
     def frame(self):
-        return (self._dptXlator.dataToFrame(self._data), self._dptXlator.typeSize)
+        """ Bus frame of the current data, with its size
+
+        The frame is encoded once per value change, so repeated reads are answered without the DPT translator.
+        """
+        frame = self._frame
+        if frame is None:
+            frame = self._frame = (self._dptXlator.dataToFrame(self._data), self._dptXlator.typeSize)
+        return frame
 
     @frame.setter
     def frame(self, frame):
@@ -281,5 +310,18 @@ if __name__ == '__main__':
                 DP = dict(name="dp", access="outpu", dptId="1.xxx", default=0.)
                 Datapoint(self, **DP)
 
+        def notify(self, dp, oldValue, newValue):
+            pass
+
+        def test_frame(self):
+            dp = Datapoint(self, name="dp", access="output", dptId="9.001", default=20.)
+            frame = dp.frame
+            self.assertIs(dp.frame, frame)  # not encoded again
+            dp.value = 21.
+            self.assertEqual(dp.frame, (bytearray("\x0c\x1a"), 2))
+            dp.frame = bytearray("\x07\xd0")
+            self.assertEqual(dp.value, 20.)
+            self.assertEqual(dp.frame, frame)
+
 
     unittest.main()
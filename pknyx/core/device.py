@@ -54,6 +54,8 @@ from pknyx.common import config
 from pknyx.common.exception import PKNyXValueError
 from pknyx.common.frozenDict import FrozenDict
 from pknyx.services.logger import Logger
+from pknyx.services.notifier import Notifier
+from pknyx.core.transmitPolicy import TransmitPolicyEngine
 from pknyx.stack.stack import Stack
 
 import time
@@ -117,14 +119,23 @@ class Device(object):
 
         return self
 
-    def __init__(self, individualAddress):
+    def __init__(self, individualAddress, eventLoop=None, host=None):
         """ Init Device object.
+
+        @param eventLoop: event loop running the device stack, which can be shared by several devices
+        @type eventLoop: L{EventLoop<pknyx.stack.eventLoop>}
+
+        @param host: device host sharing its link layer and transceiver (see L{DeviceHost.addDevice})
+        @type host: L{DeviceHost<pknyx.core.deviceHost>}
         """
         super(Device, self).__init__()
 
         self._individualAddress = individualAddress
 
-        self._stack = Stack(self._individualAddress)
+        if host is None:
+            self._stack = Stack(self._individualAddress, eventLoop=eventLoop)
+        else:
+            self._stack = host.createStack(self._individualAddress)
 
         self.init()
 
@@ -155,9 +166,15 @@ class Device(object):
 
     def start(self):
         """ Start device execution
+
+        Heartbeat and cyclic transmissions of the group objects start once the stack is running.
         """
         self._stack.start()
 
+        for fb in self._functionalBlocks.values():
+            for go in fb.go.values():
+                TransmitPolicyEngine().register(go)
+
     def mainLoop(self):
         """ Main loop of the device
 
@@ -168,9 +185,18 @@ class Device(object):
 
     def stop(self):
         """ Stop device execution
+
+        Pending threaded jobs of the functional blocks are dropped; running ones are waited for.
         """
+        for fb in self._functionalBlocks.values():
+            for go in fb.go.values():
+                TransmitPolicyEngine().unregister(go)
+
         self._stack.stop()
 
+        for fb in self._functionalBlocks.values():
+            Notifier().cancelJobs(fb, config.NOTIFIER_STOP_TIMEOUT)
+
     def shutdown(self):
         """ Additionnal user shutdown
         """
@@ -0,0 +1,295 @@
+# -*- coding: utf-8 -*-
+
+""" Python KNX framework
+
+License
+=======
+
+ - B{pKNyX} (U{http://www.pknyx.org}) is Copyright:
+  - (C) 2013-2015 Frédéric Mantegazza
+
+This program is free software; you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation; either version 2 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program; if not, write to the Free Software
+Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+
+or see:
+
+ - U{http://www.gnu.org/licenses/gpl.html}
+
+Module purpose
+==============
+
+Device (process) management.
+
+Implements
+==========
+
+ - B{DeviceHost}
+ - B{DeviceHostValueError}
+
+Documentation
+=============
+
+The DeviceHost runs several Devices in the same process, over a single link layer and transceiver (so a single
+pair of sockets, and a single set of threads).
+
+Each incoming frame is decoded once, and given to the stack of each device. All devices share the same transmit
+queue. Frames sent by a device are directly given to the other devices of the host; frames coming back from the
+bus with the Individual Address of a local device are ignored.
+
+Usage
+=====
+
+>>> host = DeviceHost()
+>>> host.addDevice(MyDevice1, "1.1.1")
+>>> host.addDevice(MyDevice2, "1.1.2")
+>>> host.start()
+>>> host.mainLoop()
+
+@author: Frédéric Mantegazza
+@copyright: (C) 2013-2015 Frédéric Mantegazza
+@license: GPL
+"""
+
+__revision__ = "$Id$"
+
+import time
+
+from pknyx.common.exception import PKNyXValueError
+from pknyx.services.logger import Logger
+from pknyx.core.ets import ETS
+from pknyx.stack.stack import Stack
+from pknyx.stack.individualAddress import IndividualAddress
+from pknyx.stack.layer2.l_dataService import L_DataService
+from pknyx.stack.transceiver.udpTransceiver import UDPTransceiver
+
+
+class DeviceHostValueError(PKNyXValueError):
+    """
+    """
+
+
+class DeviceHost(object):
+    """ DeviceHost class
+
+    @ivar _lds: link layer shared by all devices
+    @type _lds: L{L_DataService}
+
+    @ivar _tc: transceiver shared by all devices
+    @type _tc: L{Transceiver<pknyx.stack.transceiver.transceiver>}
+
+    @ivar _devices: hosted devices
+    @type _devices: list of L{Device<pknyx.core.device>}
+    """
+    def __init__(self, transCls=UDPTransceiver, transParams=dict(mcastAddr="224.0.23.12", mcastPort=3671),
+                 eventLoop=None):
+        """
+
+        @param transCls: transceiver class
+        @type transCls: class
+
+        @param transParams: transceiver parameters
+        @type transParams: dict
+
+        @param eventLoop: event loop running the link layer and the transceiver. If None, they run in their own
+                          threads
+        @type eventLoop: L{EventLoop<pknyx.stack.eventLoop>}
+        """
+        super(DeviceHost, self).__init__()
+
+        self._lds = L_DataService(Stack.PRIORITY_DISTRIBUTION, eventLoop=eventLoop, shared=True)
+        if eventLoop is not None:
+            transParams = dict(transParams, eventLoop=eventLoop)
+        self._tc = transCls(self._lds, **transParams)
+
+        self._devices = []
+
+    @property
+    def lds(self):
+        return self._lds
+
+    @property
+    def tc(self):
+        return self._tc
+
+    @property
+    def devices(self):
+        return tuple(self._devices)
+
+    def createStack(self, individualAddress, denseGroupTable=False):
+        """ Create a stack using the shared link layer
+
+        @param individualAddress: Individual Address of the device using the stack
+        @type individualAddress: str or L{IndividualAddress}
+
+        @return: new stack
+        @rtype: L{Stack}
+
+        raise DeviceHostValueError:
+        """
+        if not isinstance(individualAddress, IndividualAddress):
+            individualAddress = IndividualAddress(individualAddress)
+        if individualAddress in self._lds.localAddresses:
+            raise DeviceHostValueError("duplicated Individual Address (%s)" % individualAddress)
+
+        return Stack(individualAddress, denseGroupTable=denseGroupTable, lds=self._lds)
+
+    def addDevice(self, deviceCls, individualAddress):
+        """ Create, register and weave a device
+
+        @param deviceCls: device class
+        @type deviceCls: class
+
+        @param individualAddress: Individual Address of the device
+        @type individualAddress: str or L{IndividualAddress}
+
+        @return: new device
+        @rtype: L{Device<pknyx.core.device>}
+
+        raise DeviceHostValueError:
+        """
+        Logger().debug("DeviceHost.addDevice(): deviceCls=%s, individualAddress=%s" % (deviceCls.__name__, individualAddress))
+
+        device = deviceCls(individualAddress, host=self)
+
+        ETS().register(device)
+        ETS().weave(device)
+
+        self._devices.append(device)
+
+        return device
+
+    def start(self):
+        """ Start the shared link layer and transceiver, then all devices
+        """
+        Logger().trace("DeviceHost.start()")
+
+        self._lds.start()
+        self._tc.start()
+
+        time.sleep(0.25)
+
+        for device in self._devices:
+            device.start()
+
+        Logger().debug("DeviceHost.start(): running")
+
+    def mainLoop(self):
+        """ Main loop of the host
+
+        Blocking.
+        """
+        while True:
+            time.sleep(0.1)
+
+    def stop(self):
+        """ Stop all devices, then the shared link layer and transceiver
+        """
+        Logger().trace("DeviceHost.stop()")
+
+        for device in self._devices:
+            device.stop()
+
+        self._tc.stop()
+        self._lds.stop()
+        self._tc.join()
+        self._lds.join()
+
+        Logger().debug("DeviceHost.stop(): stopped")
+
+    def shutdown(self):
+        """ Additionnal user shutdown of all devices
+        """
+        for device in self._devices:
+            device.shutdown()
+
+
+if __name__ == '__main__':
+    import unittest
+
+    from pknyx.api import FunctionalBlock, Device
+    from pknyx.stack.groupAddress import GroupAddress
+    from pknyx.stack.priority import Priority
+    from pknyx.stack.transceiver.loopbackTransceiver import LoopbackBus, LoopbackTransceiver
+
+    # Mute logger
+    Logger().setLevel('error')
+
+
+    class TestFunctionalBlock(FunctionalBlock):
+        DP_01 = dict(name="dp_01", access="output", dptId="1.001", default="Off")
+
+        GO_01 = dict(dp="dp_01", flags="CWTU", priority="low")
+
+        DESC = "Test FB"
+
+
+    class TestDevice(Device):
+        FB_01 = dict(cls=TestFunctionalBlock, name="test", desc="test")
+
+        LNK_01 = dict(fb="test", dp="dp_01", gad="1/1/1")
+
+        DESC = "Test device"
+
+
+    class DeviceHostTestCase(unittest.TestCase):
+
+        def setUp(self):
+            bus = LoopbackBus()
+            self.host = DeviceHost(transCls=LoopbackTransceiver, transParams=dict(bus=bus))
+            self.device1 = self.host.addDevice(TestDevice, "1.1.1")
+            self.device2 = self.host.addDevice(TestDevice, "1.1.2")
+            self.stack = Stack("1.1.3", transCls=LoopbackTransceiver, transParams=dict(bus=bus))
+            self.host.start()
+            self.stack.start()
+
+        def tearDown(self):
+            self.stack.stop()
+            self.host.stop()
+
+        def _waitValue(self, device, value):
+            for i in xrange(100):
+                if device.fb["test"].dp["dp_01"].value == value:
+                    return True
+                time.sleep(0.01)
+            return False
+
+        def test_constructor(self):
+            self.assertEqual(self.host.devices, (self.device1, self.device2))
+            self.assertIs(self.device1.stack.tc, None)
+            self.assertEqual(self.host.lds.localAddresses,
+                             frozenset([IndividualAddress("1.1.1"), IndividualAddress("1.1.2")]))
+            with self.assertRaises(DeviceHostValueError):
+                self.host.createStack("1.1.1")
+
+        def test_receive(self):
+            self.stack.agds.groupValueWriteReq(GroupAddress("1/1/1"), Priority("low"), bytearray([0x01]), 1)
+            self.assertTrue(self._waitValue(self.device1, "On"))
+            self.assertTrue(self._waitValue(self.device2, "On"))
+
+        def test_receiveNullSource(self):
+            stack = Stack("0.0.0", transCls=LoopbackTransceiver, transParams=dict(bus=self.stack.tc.bus))
+            stack.start()
+            try:
+                stack.agds.groupValueWriteReq(GroupAddress("1/1/1"), Priority("low"), bytearray([0x01]), 1)
+                self.assertTrue(self._waitValue(self.device1, "On"))
+                self.assertTrue(self._waitValue(self.device2, "On"))
+            finally:
+                stack.stop()
+
+        def test_transmit(self):
+            self.device1.fb["test"].dp["dp_01"].value = "On"
+            self.assertTrue(self._waitValue(self.device2, "On"))
+
+
+    unittest.main()
@@ -35,6 +35,13 @@ Implements
 
  - B{DPTXlator2ByteFloat}
 
+Documentation
+=============
+
+Decoding can use a 65536 entries table, shared by all instances, and built on first use (see
+L{DPTXlator2ByteFloat.buildDecodeTable}). Once built, the table is used by all conversions from data to value;
+it is automatically built by L{DPTXlator2ByteFloat.dataToValues}.
+
 Usage
 =====
 
@@ -51,12 +58,13 @@ see L{DPTXlatorBoolean}
 
 __revision__ = "$Id$"
 
+import array
 import struct
 
 from pknyx.services.logger import Logger
 from pknyx.core.dptXlator.dptId import DPTID
 from pknyx.core.dptXlator.dpt import DPT
-from pknyx.core.dptXlator.dptXlatorBase import DPTXlatorBase, DPTXlatorValueError
+from pknyx.core.dptXlator.dptXlatorBase import DPTXlatorBase, DPTXlatorValueError, numpy
 
 
 class DPTXlator2ByteFloat(DPTXlatorBase):
@@ -68,7 +76,14 @@ class DPTXlator2ByteFloat(DPTXlatorBase):
      - M: Significand (Mantissa) [-2048:2047]
 
     For all Datapoint Types 9.xxx, the encoded value 7FFFh shall always be used to denote invalid data.
+
+    @cvar _decodeTable: values for all 65536 possible data (None until built)
+    @type _decodeTable: L{array<array>} of float
     """
+    _decodeTable = None
+
+    FRAME_DTYPE = ">u2"
+
     DPT_Generic = DPT("9.xxx", "Generic", (-671088.64, +670760.96))
 
     DPT_Value_Temp = DPT("9.001", "Temperature", (-273., +670760.), "°C")
@@ -94,39 +109,82 @@ class DPTXlator2ByteFloat(DPTXlatorBase):
     def __init__(self, dptId):
         super(DPTXlator2ByteFloat, self).__init__(dptId, 2)
 
-    def checkData(self, data):
-        if not 0x0000 <= data <= 0xffff:
-            raise DPTXlatorValueError("data %s not in (0x0000, 0xffff)" % hex(data))
+    @classmethod
+    def buildDecodeTable(cls):
+        """ Build the decode table, if not already done
 
-    def checkValue(self, value):
-        if not self._dpt.limits[0] <= value <= self._dpt.limits[1]:
-            raise DPTXlatorValueError("Value not in range %r" % repr(self._dpt.limits))
+        @return: values for all 65536 possible data
+        @rtype: L{array<array>} of float
+        """
+        if DPTXlator2ByteFloat._decodeTable is None:
+            DPTXlator2ByteFloat._decodeTable = array.array('d', [cls._decode(data) for data in xrange(0x10000)])
 
-    def dataToValue(self, data):
+        return DPTXlator2ByteFloat._decodeTable
+
+    @property
+    def decodeTable(self):
+        return self.buildDecodeTable()
+
+    @staticmethod
+    def _decode(data):
         sign = (data & 0x8000) >> 15
         exp = (data & 0x7800) >> 11
         mant = data & 0x07ff
         if sign <> 0:
             mant = -(~(mant - 1) & 0x07ff)
         value = (1 << exp) * 0.01 * mant
-        #Logger().debug("DPT2ByteFloat.dataToValue(): sign=%d, exp=%d, mant=%r" % (sign, exp, mant))
-        #Logger().debug("DPT2ByteFloat.dataToValue(): value=%.2f" % value)
         return value
 
+    def checkData(self, data):
+        if not 0x0000 <= data <= 0xffff:
+            raise DPTXlatorValueError("data %s not in (0x0000, 0xffff)" % hex(data))
+
+    def checkValue(self, value):
+        if not self._dpt.limits[0] <= value <= self._dpt.limits[1]:
+            raise DPTXlatorValueError("Value not in range %r" % repr(self._dpt.limits))
+
+    def dataToValue(self, data):
+        table = DPTXlator2ByteFloat._decodeTable
+        if table is not None:
+            return table[data]
+        return self._decode(data)
+
     def valueToData(self, value):
         sign = 0
-        exp = 0
         if value < 0:
             sign = 1
         mant = int(value * 100)
-        while not -2048 <= mant <= 2047:
-            mant = mant >> 1
-            exp += 1
+
+        # Number of right shifts needed for the mantissa to fit in 12 bits (same as shifting until it fits)
+        exp = (mant if mant >= 0 else ~mant).bit_length() - 11
+        if exp > 0:
+            mant >>= exp
+        else:
+            exp = 0
         #Logger().debug("DPT2ByteFloat.valueToData(): sign=%d, exp=%d, mant=%r" % (sign, exp, mant))
-        data = (sign << 15) | (exp << 11) | (int(mant) & 0x07ff)
+        data = (sign << 15) | (exp << 11) | (mant & 0x07ff)
         #Logger().debug("DPT2ByteFloat.valueToData(): data=%s" % hex(data))
         return data
 
+    def dataToValues(self, data):
+        table = self.buildDecodeTable()
+        return [table[data_] for data_ in data]
+
+    def _framesToValuesArray(self, frames):
+        return numpy.frombuffer(self.buildDecodeTable(), dtype=numpy.float64)[frames]
+
+    def _valuesArrayToFrames(self, values):
+        sign = (values < 0).astype(numpy.int64)
+        mant = numpy.trunc(values * 100).astype(numpy.int64)
+        exp = numpy.zeros_like(mant)
+        for i in xrange(16):
+            over = (mant < -2048) | (mant > 2047)
+            if not over.any():
+                break
+            mant[over] >>= 1
+            exp[over] += 1
+        return ((sign << 15) | (exp << 11) | (mant & 0x07ff)).astype(self.FRAME_DTYPE)
+
     def dataToFrame(self, data):
         return bytearray(struct.pack(">H", data))
 
@@ -180,6 +238,40 @@ if __name__ == '__main__':
                 self.assertEqual(data_, data, "Conversion failed (converted data for %.2f is %s, should be %s)" %
                                  (value, hex(data_), hex(data)))
 
+        def test_decodeTable(self):
+            table = self.dptXlator.decodeTable
+            self.assertEqual(len(table), 0x10000)
+            self.assertIs(DPTXlator2ByteFloat("9.001").decodeTable, table)
+            for data in xrange(0x10000):
+                self.assertEqual(table[data], DPTXlator2ByteFloat._decode(data))
+
+        def test_valueToDataShift(self):
+            def valueToData(value):  # reference implementation, with normalization loop
+                sign = 1 if value < 0 else 0
+                exp = 0
+                mant = int(value * 100)
+                while not -2048 <= mant <= 2047:
+                    mant = mant >> 1
+                    exp += 1
+                return (sign << 15) | (exp << 11) | (mant & 0x07ff)
+            for value in (-671088.64, -273., -20.48, -20.49, -0.5, 20.47, 20.48, 40.95, 40.96, 1234.56, 670760.96):
+                self.assertEqual(self.dptXlator.valueToData(value), valueToData(value))
+
+        def test_batch(self):
+            values = [value for value, data, frame in self.testTable]
+            data = [data for value, data, frame in self.testTable]
+            self.assertEqual(self.dptXlator.dataToValues(data), values)
+            self.assertEqual(self.dptXlator.valuesToData(values), data)
+
+        def test_bulk(self):
+            values = [value for value, data, frame in self.testTable]
+            frames = "".join([str(frame) for value, data, frame in self.testTable])
+            self.assertEqual(list(self.dptXlator.framesToValues(frames)), values)
+            self.assertEqual(self.dptXlator.valuesToFrames(values), frames)
+            values = (-671088.64, -273., -20.48, -20.49, -0.5, 0., 20.47, 20.48, 40.95, 40.96, 1234.56, 670760.96)
+            frames = self.dptXlator.valuesToFrames(values)
+            self.assertEqual(frames, "".join([str(self.dptXlator.dataToFrame(self.dptXlator.valueToData(value))) for value in values]))
+
         def test_dataToFrame(self):
             for value, data, frame in self.testTable:
                 frame_ = self.dptXlator.dataToFrame(data)
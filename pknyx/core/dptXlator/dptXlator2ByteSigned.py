@@ -54,7 +54,7 @@ import struct
 from pknyx.services.logger import Logger
 from pknyx.core.dptXlator.dptId import DPTID
 from pknyx.core.dptXlator.dpt import DPT
-from pknyx.core.dptXlator.dptXlatorBase import DPTXlatorBase, DPTXlatorValueError
+from pknyx.core.dptXlator.dptXlatorBase import DPTXlatorBase, DPTXlatorValueError, numpy
 
 
 class DPTXlator2ByteSigned(DPTXlatorBase):
@@ -65,6 +65,8 @@ class DPTXlator2ByteSigned(DPTXlatorBase):
 
     .
     """
+    FRAME_DTYPE = ">i2"
+
     DPT_Generic = DPT("8.xxx", "Generic", (-32768, 32767))
 
     DPT_Value_2_Count = DPT("8.001", "Signed count", (-32768, 32767), "pulses")
@@ -105,8 +107,6 @@ class DPTXlator2ByteSigned(DPTXlatorBase):
         return value
 
     def valueToData(self, value):
-        if value < 0:
-            value = (abs(value) ^ 0xffff) + 1  # twos complement
         if self._dpt is self.DPT_DeltaTime10Msec:
             data = int(round(value / 10.))
         elif self._dpt is self.DPT_DeltaTime100Msec:
@@ -115,9 +115,30 @@ class DPTXlator2ByteSigned(DPTXlatorBase):
             data = int(round(value * 100.))
         else:
             data = value
+        if data < 0:
+            data = (abs(data) ^ 0xffff) + 1  # twos complement
         #Logger().debug("DPTXlator2ByteSigned.valueToData(): data=%s" % hex(data))
         return data
 
+    def _framesToValuesArray(self, frames):
+        if self._dpt is self.DPT_DeltaTime10Msec:
+            return frames * 10.
+        elif self._dpt is self.DPT_DeltaTime100Msec:
+            return frames * 100.
+        elif self._dpt is self.DPT_Percent_V16:
+            return frames / 100.
+        else:
+            return frames.astype(int)
+
+    def _valuesArrayToFrames(self, values):
+        if self._dpt is self.DPT_DeltaTime10Msec:
+            values = self._round(values / 10.)
+        elif self._dpt is self.DPT_DeltaTime100Msec:
+            values = self._round(values / 100.)
+        elif self._dpt is self.DPT_Percent_V16:
+            values = self._round(values * 100.)
+        return values.astype(self.FRAME_DTYPE)
+
     def dataToFrame(self, data):
         return bytearray(struct.pack(">H", data))
 
@@ -170,6 +191,18 @@ if __name__ == '__main__':
                 self.assertEqual(data_, data, "Conversion failed (converted data for %d is %s, should be %s)" %
                                  (value, hex(data_), hex(data)))
 
+        def test_bulk(self):
+            values = [value for value, data, frame in self.testTable]
+            frames = "".join([frame for value, data, frame in self.testTable])
+            self.assertEqual(list(self.dptXlator.framesToValues(frames)), values)
+            self.assertEqual(self.dptXlator.framesToValues([bytearray(frame) for value, data, frame in self.testTable])[-1], values[-1])
+            self.assertEqual(self.dptXlator.valuesToFrames(values), frames)
+            for dptId in ("8.003", "8.004", "8.010"):
+                self.dptXlator.dpt = dptId
+                values = self.dptXlator.framesToValues(frames)
+                self.assertEqual(list(values), [self.dptXlator.dataToValue(data) for value, data, frame in self.testTable])
+                self.assertEqual(self.dptXlator.valuesToFrames(values), frames)
+
         def test_dataToFrame(self):
             for value, data, frame in self.testTable:
                 frame_ = self.dptXlator.dataToFrame(data)
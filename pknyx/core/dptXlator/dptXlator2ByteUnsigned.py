@@ -54,7 +54,7 @@ import struct
 from pknyx.services.logger import Logger
 from pknyx.core.dptXlator.dptId import DPTID
 from pknyx.core.dptXlator.dpt import DPT
-from pknyx.core.dptXlator.dptXlatorBase import DPTXlatorBase, DPTXlatorValueError
+from pknyx.core.dptXlator.dptXlatorBase import DPTXlatorBase, DPTXlatorValueError, numpy
 
 
 class DPTXlator2ByteUnsigned(DPTXlatorBase):
@@ -65,6 +65,8 @@ class DPTXlator2ByteUnsigned(DPTXlatorBase):
 
     .
     """
+    FRAME_DTYPE = ">u2"
+
     DPT_Generic = DPT("7.xxx", "Generic", (0, 65535))
 
     DPT_Value_2_Ucount = DPT("7.001", "Unsigned count", (0, 65535), "pulses")
@@ -110,6 +112,21 @@ class DPTXlator2ByteUnsigned(DPTXlatorBase):
         #Logger().debug("DPTXlator2ByteUnsigned.valueToData(): data=%s" % hex(data))
         return data
 
+    def _framesToValuesArray(self, frames):
+        if self._dpt is self.DPT_TimePeriod10Msec:
+            return frames * 10.
+        elif self._dpt is self.DPT_TimePeriod100Msec:
+            return frames * 100.
+        else:
+            return frames.astype(int)
+
+    def _valuesArrayToFrames(self, values):
+        if self._dpt is self.DPT_TimePeriod10Msec:
+            values = self._round(values / 10.)
+        elif self._dpt is self.DPT_TimePeriod100Msec:
+            values = self._round(values / 100.)
+        return values.astype(self.FRAME_DTYPE)
+
     def dataToFrame(self, data):
         return bytearray(struct.pack(">H", data))
 
@@ -159,6 +176,21 @@ if __name__ == '__main__':
                 self.assertEqual(data_, data, "Conversion failed (converted data for %d is %s, should be %s)" %
                                  (value, hex(data_), hex(data)))
 
+        def test_bulk(self):
+            values = [value for value, data, frame in self.testTable]
+            frames = "".join([frame for value, data, frame in self.testTable])
+            self.assertEqual(list(self.dptXlator.framesToValues(frames)), values)
+            self.assertEqual(self.dptXlator.framesToValues([bytearray(frame) for value, data, frame in self.testTable])[-1], values[-1])
+            self.assertEqual(self.dptXlator.valuesToFrames(values), frames)
+            self.assertEqual(list(self.dptXlator.framesToValues(memoryview(bytearray(frames))[2:])), values[1:])
+            with self.assertRaises(DPTXlatorValueError):
+                self.dptXlator.framesToValues(frames[1:])
+            for dptId in ("7.003", "7.004"):
+                self.dptXlator.dpt = dptId
+                values = self.dptXlator.framesToValues(frames)
+                self.assertEqual(list(values), [self.dptXlator.dataToValue(data) for value, data, frame in self.testTable])
+                self.assertEqual(self.dptXlator.valuesToFrames(values), frames)
+
         def test_dataToFrame(self):
             for value, data, frame in self.testTable:
                 frame_ = self.dptXlator.dataToFrame(data)
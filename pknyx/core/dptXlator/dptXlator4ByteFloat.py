@@ -56,7 +56,7 @@ import struct
 from pknyx.services.logger import Logger
 from pknyx.core.dptXlator.dptId import DPTID
 from pknyx.core.dptXlator.dpt import DPT
-from pknyx.core.dptXlator.dptXlatorBase import DPTXlatorBase, DPTXlatorValueError
+from pknyx.core.dptXlator.dptXlatorBase import DPTXlatorBase, DPTXlatorValueError, numpy
 
 
 class DPTXlator4ByteFloat(DPTXlatorBase):
@@ -69,6 +69,8 @@ class DPTXlator4ByteFloat(DPTXlatorBase):
 
     .
     """
+    FRAME_DTYPE = ">f4"
+
     DPT_Generic = DPT("14.xxx", "Generic", (-3.4028234663852886e+38, 3.4028234663852886e+38))
     #DPT_Generic = DPT("14.xxx", "Generic", (-340282346638528859811704183484516925440, 340282346638528859811704183484516925440))
 
@@ -174,6 +176,9 @@ class DPTXlator4ByteFloat(DPTXlatorBase):
         #Logger().debug("DPTXlator4ByteFloat.valueToData(): data=%s" % hex(data))
         return data
 
+    def _framesToValuesArray(self, frames):
+        return frames.astype(numpy.float64)
+
     def dataToFrame(self, data):
         return bytearray(struct.pack(">L", data))
 
@@ -225,6 +230,13 @@ if __name__ == '__main__':
                 self.assertEqual(data_, data, "Conversion failed (converted data for %.f is %s, should be %s)" %
                                  (value, hex(data_), hex(data)))
 
+        def test_bulk(self):
+            values = [value for value, data, frame in self.testTable]
+            frames = "".join([frame for value, data, frame in self.testTable])
+            self.assertEqual(list(self.dptXlator.framesToValues(frames)), values)
+            self.assertEqual(self.dptXlator.framesToValues([bytearray(frame) for value, data, frame in self.testTable])[-1], values[-1])
+            self.assertEqual(self.dptXlator.valuesToFrames(values), frames)
+
         def test_dataToFrame(self):
             for value, data, frame in self.testTable:
                 frame_ = self.dptXlator.dataToFrame(data)
@@ -54,7 +54,7 @@ import struct
 from pknyx.services.logger import Logger
 from pknyx.core.dptXlator.dptId import DPTID
 from pknyx.core.dptXlator.dpt import DPT
-from pknyx.core.dptXlator.dptXlatorBase import DPTXlatorBase, DPTXlatorValueError
+from pknyx.core.dptXlator.dptXlatorBase import DPTXlatorBase, DPTXlatorValueError, numpy
 
 
 class DPTXlator4ByteSigned(DPTXlatorBase):
@@ -65,6 +65,8 @@ class DPTXlator4ByteSigned(DPTXlatorBase):
 
     .
     """
+    FRAME_DTYPE = ">i4"
+
     DPT_Generic = DPT("13.xxx", "Generic", (-2147483648, 2147483647))
 
     DPT_Value_4_Count = DPT("13.001", "Signed count", (-2147483648, 2147483647), "pulses")
@@ -101,15 +103,26 @@ class DPTXlator4ByteSigned(DPTXlatorBase):
         return value
 
     def valueToData(self, value):
-        if value < 0:
-            value = (abs(value) ^ 0xffffffff) + 1  # twos complement
         if self._dpt is self.DPT_Value_FlowRate_m3h:
             data = int(round(value * 10000.))
         else:
             data = value
+        if data < 0:
+            data = (abs(data) ^ 0xffffffff) + 1  # twos complement
         #Logger().debug("DPTXlator4ByteSigned.valueToData(): data=%s" % hex(data))
         return data
 
+    def _framesToValuesArray(self, frames):
+        if self._dpt is self.DPT_Value_FlowRate_m3h:
+            return frames / 10000.
+        else:
+            return frames.astype(int)
+
+    def _valuesArrayToFrames(self, values):
+        if self._dpt is self.DPT_Value_FlowRate_m3h:
+            values = self._round(values * 10000.)
+        return values.astype(self.FRAME_DTYPE)
+
     def dataToFrame(self, data):
         return bytearray(struct.pack(">L", data))
 
@@ -162,6 +175,17 @@ if __name__ == '__main__':
                 self.assertEqual(data_, data, "Conversion failed (converted data for %d is %s, should be %s)" %
                                  (value, hex(data_), hex(data)))
 
+        def test_bulk(self):
+            values = [value for value, data, frame in self.testTable]
+            frames = "".join([frame for value, data, frame in self.testTable])
+            self.assertEqual(list(self.dptXlator.framesToValues(frames)), values)
+            self.assertEqual(self.dptXlator.framesToValues([bytearray(frame) for value, data, frame in self.testTable])[-1], values[-1])
+            self.assertEqual(self.dptXlator.valuesToFrames(values), frames)
+            self.dptXlator._dpt = self.dptXlator.DPT_Value_FlowRate_m3h  # shares its DPT ID with DPT_Value_4_Count
+            values = self.dptXlator.framesToValues(frames)
+            self.assertEqual(list(values), [self.dptXlator.dataToValue(data) for value, data, frame in self.testTable])
+            self.assertEqual(self.dptXlator.valuesToFrames(values), frames)
+
         def test_dataToFrame(self):
             for value, data, frame in self.testTable:
                 frame_ = self.dptXlator.dataToFrame(data)
@@ -54,7 +54,7 @@ import struct
 from pknyx.services.logger import Logger
 from pknyx.core.dptXlator.dptId import DPTID
 from pknyx.core.dptXlator.dpt import DPT
-from pknyx.core.dptXlator.dptXlatorBase import DPTXlatorBase, DPTXlatorValueError
+from pknyx.core.dptXlator.dptXlatorBase import DPTXlatorBase, DPTXlatorValueError, numpy
 
 
 class DPTXlator4ByteUnsigned(DPTXlatorBase):
@@ -65,6 +65,8 @@ class DPTXlator4ByteUnsigned(DPTXlatorBase):
 
     .
     """
+    FRAME_DTYPE = ">u4"
+
     DPT_Generic = DPT("12.xxx", "Generic", (0, 4294967295))
 
     DPT_Value_4_Ucount = DPT("12.001", "Unsigned count", (0, 4294967295), "pulses")
@@ -90,6 +92,9 @@ class DPTXlator4ByteUnsigned(DPTXlatorBase):
         #Logger().debug("DPTXlator4ByteUnsigned.valueToData(): data=%s" % hex(data))
         return data
 
+    def _framesToValuesArray(self, frames):
+        return frames.astype(numpy.int64)
+
     def dataToFrame(self, data):
         return bytearray(struct.pack(">L", data))
 
@@ -139,6 +144,13 @@ if __name__ == '__main__':
                 self.assertEqual(data_, data, "Conversion failed (converted data for %d is %s, should be %s)" %
                                  (value, hex(data_), hex(data)))
 
+        def test_bulk(self):
+            values = [value for value, data, frame in self.testTable]
+            frames = "".join([frame for value, data, frame in self.testTable])
+            self.assertEqual(list(self.dptXlator.framesToValues(frames)), values)
+            self.assertEqual(self.dptXlator.framesToValues([bytearray(frame) for value, data, frame in self.testTable])[-1], values[-1])
+            self.assertEqual(self.dptXlator.valuesToFrames(values), frames)
+
         def test_dataToFrame(self):
             for value, data, frame in self.testTable:
                 frame_ = self.dptXlator.dataToFrame(data)
@@ -54,7 +54,7 @@ import struct
 from pknyx.services.logger import Logger
 from pknyx.core.dptXlator.dptId import DPTID
 from pknyx.core.dptXlator.dpt import DPT
-from pknyx.core.dptXlator.dptXlatorBase import DPTXlatorBase, DPTXlatorValueError
+from pknyx.core.dptXlator.dptXlatorBase import DPTXlatorBase, DPTXlatorValueError, numpy
 
 
 def twos_comp(val, bits):
@@ -72,6 +72,8 @@ class DPTXlator8BitSigned(DPTXlatorBase):
 
     .
     """
+    FRAME_DTYPE = "i1"
+
     DPT_Generic = DPT("6.xxx", "Generic", (-128, 127))
 
     DPT_Percent_V8 = DPT("6.001", "Percent (8 bit)", (-128, 127), "%")
@@ -104,6 +106,9 @@ class DPTXlator8BitSigned(DPTXlatorBase):
         #Logger().debug("DPTXlator8BitSigned.valueToData(): data=%s" % hex(data))
         return data
 
+    def _framesToValuesArray(self, frames):
+        return frames.astype(int)
+
     def dataToFrame(self, data):
         return bytearray(struct.pack(">B", data))
 
@@ -156,6 +161,13 @@ if __name__ == '__main__':
                 self.assertEqual(data_, data, "Conversion failed (converted data for %d is %s, should be %s)" %
                                  (value, hex(data_), hex(data)))
 
+        def test_bulk(self):
+            values = [value for value, data, frame in self.testTable]
+            frames = "".join([frame for value, data, frame in self.testTable])
+            self.assertEqual(list(self.dptXlator.framesToValues(frames)), values)
+            self.assertEqual(self.dptXlator.framesToValues([bytearray(frame) for value, data, frame in self.testTable])[-1], values[-1])
+            self.assertEqual(self.dptXlator.valuesToFrames(values), frames)
+
         def test_dataToFrame(self):
             for value, data, frame in self.testTable:
                 frame_ = self.dptXlator.dataToFrame(data)
@@ -54,7 +54,7 @@ import struct
 from pknyx.services.logger import Logger
 from pknyx.core.dptXlator.dptId import DPTID
 from pknyx.core.dptXlator.dpt import DPT
-from pknyx.core.dptXlator.dptXlatorBase import DPTXlatorBase, DPTXlatorValueError
+from pknyx.core.dptXlator.dptXlatorBase import DPTXlatorBase, DPTXlatorValueError, numpy
 
 
 class DPTXlator8BitUnsigned(DPTXlatorBase):
@@ -65,6 +65,8 @@ class DPTXlator8BitUnsigned(DPTXlatorBase):
 
     .
     """
+    FRAME_DTYPE = "u1"
+
     DPT_Generic = DPT("5.xxx", "Generic", (0, 255))
 
     DPT_Scaling = DPT("5.001", "Scaling", (0, 100), "%")
@@ -108,6 +110,25 @@ class DPTXlator8BitUnsigned(DPTXlatorBase):
         #Logger().debug("DPTXlator8BitUnsigned.valueToData(): data=%s" % hex(data))
         return data
 
+    def _framesToValuesArray(self, frames):
+        if self._dpt is self.DPT_Scaling:
+            return frames * 100. / 255.
+        elif self._dpt is self.DPT_Angle:
+            return frames * 360. / 255.
+        elif self._dpt is self.DPT_DecimalFactor:
+            return frames / 255.
+        else:
+            return frames.astype(int)
+
+    def _valuesArrayToFrames(self, values):
+        if self._dpt is self.DPT_Scaling:
+            values = self._round(values * 255 / 100.)
+        elif self._dpt is self.DPT_Angle:
+            values = self._round(values * 255 / 360.)
+        elif self._dpt is self.DPT_DecimalFactor:
+            values = self._round(values * 255)
+        return values.astype(self.FRAME_DTYPE)
+
     def dataToFrame(self, data):
         return bytearray(struct.pack(">B", data))
 
@@ -157,6 +178,19 @@ if __name__ == '__main__':
                 self.assertEqual(data_, data, "Conversion failed (converted data for %d is %s, should be %s)" %
                                  (value, hex(data_), hex(data)))
 
+        def test_bulk(self):
+            values = [value for value, data, frame in self.testTable]
+            frames = "".join([frame for value, data, frame in self.testTable])
+            self.assertEqual(list(self.dptXlator.framesToValues(frames)), values)
+            self.assertEqual(self.dptXlator.framesToValues([bytearray(frame) for value, data, frame in self.testTable])[-1], values[-1])
+            self.assertEqual(self.dptXlator.valuesToFrames(values), frames)
+            for dptId in ("5.001", "5.003", "5.005"):
+                self.dptXlator.dpt = dptId
+                frames = "".join([chr(data) for data in xrange(256)])
+                values = self.dptXlator.framesToValues(frames)
+                self.assertEqual(list(values), [self.dptXlator.dataToValue(data) for data in xrange(256)])
+                self.assertEqual(self.dptXlator.valuesToFrames(values), frames)
+
         def test_dataToFrame(self):
             for value, data, frame in self.testTable:
                 frame_ = self.dptXlator.dataToFrame(data)
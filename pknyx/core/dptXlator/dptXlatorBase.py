@@ -39,6 +39,10 @@ Implements
 Documentation
 =============
 
+Bulk codecs (L{DPTXlatorBase.framesToValues}/L{DPTXlatorBase.valuesToFrames}) convert many frames in one call.
+They use NumPy, if available, for the DPTXlators defining a B{FRAME_DTYPE}; otherwise, they fall back to the
+scalar conversions.
+
 Usage
 =====
 
@@ -51,6 +55,11 @@ Usage
 
 __revision__ = "$Id$"
 
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
 from pknyx.common.exception import PKNyXValueError
 from pknyx.common.utils import reprStr
 from pknyx.services.logger import Logger
@@ -83,19 +92,26 @@ class DPTXlatorBase(object):
     @ivar _data: KNX encoded data
     @type _data: depends on sub-class
 
+    @cvar FRAME_DTYPE: NumPy type of a frame, used by bulk codecs (None if the DPTXlator has no NumPy codecs)
+    @type FRAME_DTYPE: str
+
     @todo: remove the strValue stuff
     """
+    FRAME_DTYPE = None
+
     def __new__(cls, *args, **kwargs):
         """ Init the class with all available types for this DPT
 
         All class objects defined in sub-classes name B{DPT_xxx}, will be treated as DPT objects and added to the
-        B{_handledDPT} dict.
+        B{_handledDPT} dict. This dict is only built once per class.
         """
         self = super(DPTXlatorBase, cls).__new__(cls)
-        cls._handledDPT = {}
-        for key, value in cls.__dict__.iteritems():
-            if key.startswith("DPT_"):
-                self._handledDPT[value.id] = value
+        if "_handledDPT" not in cls.__dict__:
+            handledDPT = {}
+            for key, value in cls.__dict__.iteritems():
+                if key.startswith("DPT_"):
+                    handledDPT[value.id] = value
+            cls._handledDPT = handledDPT
 
         return self
 
@@ -210,6 +226,114 @@ class DPTXlatorBase(object):
         """
         raise NotImplementedError
 
+    def dataToValues(self, data):
+        """ Conversion from several KNX encoded data to python values
+
+        Default implementation relies on L{dataToValue}; sub-classes may override it with a faster implementation.
+
+        @param data: KNX encoded data
+        @type data: iterable of int
+
+        @return: python values
+        @rtype: list
+        """
+        dataToValue = self.dataToValue
+        return [dataToValue(data_) for data_ in data]
+
+    def valuesToData(self, values):
+        """ Conversion from several python values to KNX encoded data
+
+        Default implementation relies on L{valueToData}; sub-classes may override it with a faster implementation.
+
+        @param values: python values
+        @type values: iterable
+
+        @return: KNX encoded data
+        @rtype: list
+        """
+        valueToData = self.valueToData
+        return [valueToData(value) for value in values]
+
+    @property
+    def frameSize(self):
+        return max(self._typeSize, 1)
+
+    @staticmethod
+    def _round(values):
+        """ Round a NumPy array half away from zero, as python round()
+        """
+        return numpy.sign(values) * numpy.floor(numpy.abs(values) + 0.5)
+
+    def _framesToValuesArray(self, frames):
+        """ Conversion from NumPy array of frames to NumPy array of python values
+
+        @param frames: frames, as B{FRAME_DTYPE}
+        @type frames: L{ndarray<numpy>}
+
+        @return: values
+        @rtype: L{ndarray<numpy>}
+        """
+        return frames
+
+    def _valuesArrayToFrames(self, values):
+        """ Conversion from NumPy array of python values to NumPy array of frames
+
+        @param values: values
+        @type values: L{ndarray<numpy>}
+
+        @return: frames, as B{FRAME_DTYPE}
+        @rtype: L{ndarray<numpy>}
+        """
+        return values.astype(self.FRAME_DTYPE)
+
+    def framesToValues(self, frames):
+        """ Conversion from several bus frames to python values
+
+        @param frames: contiguous buffer of frames (L{frameSize} bytes each), or sequence of frames
+        @type frames: str, bytearray, memoryview, L{ndarray<numpy>}, or list of bytearray
+
+        @return: python values
+        @rtype: L{ndarray<numpy>} if NumPy is available, list otherwise
+
+        raise DPTXlatorValueError:
+        """
+        if isinstance(frames, (list, tuple)):
+            frames = "".join([str(frame) for frame in frames])
+        elif isinstance(frames, memoryview):
+            frames = frames.tobytes()
+
+        frameSize = self.frameSize
+        if numpy is not None and self.FRAME_DTYPE is not None:
+            try:
+                frames = numpy.frombuffer(frames, dtype=self.FRAME_DTYPE)
+            except ValueError:
+                raise DPTXlatorValueError("buffer size is not a multiple of frame size (%d)" % frameSize)
+            return self._framesToValuesArray(frames)
+
+        frames = str(bytearray(frames))
+        if len(frames) % frameSize:
+            raise DPTXlatorValueError("buffer size is not a multiple of frame size (%d)" % frameSize)
+        frameToData = self.frameToData
+        return self.dataToValues([frameToData(frames[i:i+frameSize]) for i in xrange(0, len(frames), frameSize)])
+
+    def valuesToFrames(self, values):
+        """ Conversion from several python values to bus frames
+
+        @param values: python values
+        @type values: iterable, or L{ndarray<numpy>}
+
+        @return: contiguous buffer of frames (L{frameSize} bytes each)
+        @rtype: bytearray
+        """
+        if numpy is not None and self.FRAME_DTYPE is not None:
+            return bytearray(self._valuesArrayToFrames(numpy.asarray(values)).tostring())
+
+        dataToFrame = self.dataToFrame
+        frames = bytearray()
+        for data in self.valuesToData(values):
+            frames += dataToFrame(data)
+        return frames
+
     def dataToFrame(self, data):
         """ Conversion from KNX encoded data to bus frame
 
@@ -236,6 +360,8 @@ class DPTXlatorBase(object):
 if __name__ == '__main__':
     import unittest
 
+    from pknyx.core.dptXlator.dpt import DPT
+
     # Mute logger
     Logger().setLevel('error')
 
@@ -255,4 +381,12 @@ if __name__ == '__main__':
             with self.assertRaises(DPTXlatorValueError):
                 DPTXlatorBase("1.001", 0)
 
+        def test_handledDPT(self):
+            class DPTXlatorTest(DPTXlatorBase):
+                DPT_Generic = DPT("1.xxx", "Generic", (0, 1))
+
+            handledDPT = DPTXlatorTest("1.xxx", 0)._handledDPT
+            self.assertEqual(handledDPT.keys(), [DPTID("1.xxx")])
+            self.assertIs(DPTXlatorTest("1.xxx", 0)._handledDPT, handledDPT)
+
     unittest.main()
@@ -75,7 +75,7 @@ import struct
 
 from pknyx.services.logger import Logger
 from pknyx.core.dptXlator.dpt import DPT
-from pknyx.core.dptXlator.dptXlatorBase import DPTXlatorBase, DPTXlatorValueError
+from pknyx.core.dptXlator.dptXlatorBase import DPTXlatorBase, DPTXlatorValueError, numpy
 
 
 class DPTXlatorBoolean(DPTXlatorBase):
@@ -86,6 +86,8 @@ class DPTXlatorBoolean(DPTXlatorBase):
 
     .
     """
+    FRAME_DTYPE = "u1"
+
     DPT_Generic = DPT("1.xxx", "Generic", (0, 1))
 
     DPT_Switch = DPT("1.001", "Switch", ("Off", "On"))
@@ -137,6 +139,17 @@ class DPTXlatorBoolean(DPTXlatorBase):
         #Logger().debug("DPTXlatorBoolean.valueToData(): data=%s" % hex(data))
         return data
 
+    def _framesToValuesArray(self, frames):
+        if (frames > 0x01).any():
+            raise DPTXlatorValueError("data not in (0x00, 0x01)")
+        return numpy.array(self._dpt.limits)[frames]
+
+    def _valuesArrayToFrames(self, values):
+        limits = self._dpt.limits
+        if not ((values == limits[0]) | (values == limits[1])).all():
+            raise DPTXlatorValueError("value not in %s" % str(limits))
+        return (values != limits[0]).astype(self.FRAME_DTYPE)
+
     def dataToFrame(self, data):
         return bytearray(struct.pack(">B", data))
 
@@ -190,6 +203,21 @@ if __name__ == '__main__':
                 self.assertEqual(data_, data, "Conversion failed (converted data for %d is %s, should be %s)" %
                                  (value, hex(data_), hex(data)))
 
+        def test_bulk(self):
+            values = [value for value, data, frame in self.testTable]
+            frames = "".join([frame for value, data, frame in self.testTable])
+            self.assertEqual(list(self.dptXlator.framesToValues(frames)), values)
+            self.assertEqual(self.dptXlator.framesToValues([bytearray(frame) for value, data, frame in self.testTable])[-1], values[-1])
+            self.assertEqual(self.dptXlator.valuesToFrames(values), frames)
+            self.dptXlator.dpt = "1.001"
+            self.assertEqual(list(self.dptXlator.framesToValues("\x01\x00")), ["On", "Off"])
+            self.assertEqual(self.dptXlator.valuesToFrames(["On", "Off"]), "\x01\x00")
+            with self.assertRaises(DPTXlatorValueError):
+                self.dptXlator.valuesToFrames(["On", "Foo"])
+            if numpy is not None:
+                with self.assertRaises(DPTXlatorValueError):
+                    self.dptXlator.framesToValues("\x02")
+
         def test_dataToFrame(self):
             for value, data, frame in self.testTable:
                 frame_ = self.dptXlator.dataToFrame(data)
@@ -163,8 +163,14 @@ class DPTXlatorFactoryObject(object):
     enforced - way of naming a dptID is using the expression I{main number}.I{sub number}.
     In short, a datapoint type has a dptID and standardizes one combination of format, encoding, range and unit.
 
+    DPTXlators are stateless: the factory creates them once per Datapoint Type ID, and shares them. So, the
+    B{dpt} of a DPTXlator returned by the factory must not be changed.
+
     @ivar _handledMainDPTMappers: table containing all main Datapoint Type mappers
     @type _handledMainDPTMappers: dict
+
+    @ivar _dptXlators: created DPTXlators, by Datapoint Type ID
+    @type _dptXlators: dict of str: L{DPTXlatorBase}
     """
     TYPE_Boolean = DPTMainTypeMapper("1.xxx", DPTXlatorBoolean, "Boolean (main type 1)")
     TYPE_3BitControlled = DPTMainTypeMapper("3.xxx", DPTXlator3BitControl, "3-Bit-Control (main type 3)")
@@ -189,13 +195,15 @@ class DPTXlatorFactoryObject(object):
         """ Init the class with all available main Types
 
         All class objects name B{TYPE_xxx}, will be treated as MainTypeMapper objects and added to the
-        B{_handledDPT} dict.
+        B{_handledDPT} dict. This dict is only built once per class.
         """
         self = super(DPTXlatorFactoryObject, cls).__new__(cls)
-        cls._handledMainDPTMappers = {}
-        for key, value in cls.__dict__.iteritems():
-            if key.startswith("TYPE_"):
-                cls._handledMainDPTMappers[value.id] = value
+        if "_handledMainDPTMappers" not in cls.__dict__:
+            handledMainDPTMappers = {}
+            for key, value in cls.__dict__.iteritems():
+                if key.startswith("TYPE_"):
+                    handledMainDPTMappers[value.id] = value
+            cls._handledMainDPTMappers = handledMainDPTMappers
 
         return self
 
@@ -204,6 +212,8 @@ class DPTXlatorFactoryObject(object):
         """
         super(DPTXlatorFactoryObject, self).__init__()
 
+        self._dptXlators = {}
+
     @property
     def handledMainDPTIDs(self):
         """ Return all handled main Datapoint Type IDs the factory can create
@@ -215,14 +225,22 @@ class DPTXlatorFactoryObject(object):
     def create(self, dptId):
         """ Create the Datapoint Type for the given dptId
 
-        The creation is delegated to the main type mapper.
+        The creation is delegated to the main type mapper, on first call for this dptId; the same DPTXlator is then
+        returned by next calls.
 
         @param dptId: Datapoint Type ID
-        @type dptId: str
+        @type dptId: str or L{DPTID}
+
+        @return: shared DPTXlator
+        @rtype: L{DPTXlatorBase}
         """
-        if not isinstance(dptId, DPTID):
-            dptId = DPTID(dptId)
-        return self._handledMainDPTMappers[dptId.generic].createXlator(dptId)
+        try:
+            return self._dptXlators[str(dptId)]
+        except KeyError:
+            if not isinstance(dptId, DPTID):
+                dptId = DPTID(dptId)
+            dptXlator = self._handledMainDPTMappers[dptId.generic].createXlator(dptId)
+            return self._dptXlators.setdefault(str(dptId), dptXlator)
 
 
 def DPTXlatorFactory():
@@ -270,4 +288,13 @@ if __name__ == '__main__':
         #def test_constructor(self):
             #print DPTXlatorFactory().handledMainDPTIDs
 
+        def test_create(self):
+            dptXlator = DPTXlatorFactory().create("9.001")
+            self.assertIsInstance(dptXlator, DPTXlator2ByteFloat)
+            self.assertEqual(dptXlator.dpt.id, DPTID("9.001"))
+            self.assertIs(DPTXlatorFactory().create("9.001"), dptXlator)
+            self.assertIs(DPTXlatorFactory().create(DPTID("9.001")), dptXlator)
+            self.assertIsNot(DPTXlatorFactory().create("9.xxx"), dptXlator)
+            self.assertEqual(DPTXlatorFactory().create("9.xxx").dpt.id, DPTID("9.xxx"))
+
     unittest.main()
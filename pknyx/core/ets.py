@@ -198,7 +198,7 @@ class ETS(object):
                         output +=  u" │    ├── %3d %-21s" % (gad.sub, "")
                     gadSub = gad.sub
 
-                for i, go in enumerate(device.stack.agds.groups[gad.address].listeners):
+                for i, go in enumerate(device.stack.agds.groups[gad.raw].listeners):
                     dp = go.datapoint
                     fb = dp.owner
                     if not i:
@@ -229,7 +229,7 @@ class ETS(object):
                         #output +=  "%-30s" % ""
                     gads_ = []
                     for gad in gads:
-                        if go in device.stack.agds.groups[gad.address].listeners:
+                        if go in device.stack.agds.groups[gad.raw].listeners:
                             gads_.append(gad.address)
                     if gads_:
                         output +=  "%-30s %-10s %-30s %-10s %-10s" % (go.name, dp.dptId, ", ".join(gads_), go.flags, go.priority)
@@ -208,9 +208,10 @@ class FunctionalBlock(object):
 
         @todo: use an Event as param
         """
-        Logger().debug("FunctionalBlock.notify(): dp=%s, oldValue=%s, newValue=%s" % (dp, oldValue, newValue))
+        Logger().debug("FunctionalBlock.notify(): dp=%s, oldValue=%s, newValue=%s", dp, oldValue, newValue)
 
-        Notifier().datapointNotify(self, dp, oldValue, newValue)
+        if self._datapoints[dp].jobs:
+            Notifier().datapointNotify(self, dp, oldValue, newValue)
 
 
 if __name__ == '__main__':
@@ -54,6 +54,7 @@ Usage
 
 __revision__ = "$Id$"
 
+from pknyx.common import config
 from pknyx.common.exception import PKNyXValueError
 from pknyx.services.logger import Logger
 from pknyx.stack.layer7.a_groupDataListener import A_GroupDataListener
@@ -90,6 +91,8 @@ class Group(A_GroupDataListener):
         """
         super(Group, self).__init__()
 
+        self._logger = Logger()
+
         if not isinstance(gad, GroupAddress):
             gad = GroupAddress(gad)
         self._gad = gad
@@ -105,28 +108,28 @@ class Group(A_GroupDataListener):
         return "<Group('%s')>" % self._gad
 
     def groupValueWriteInd(self, src, priority, data):
-        Logger().debug("Group.groupValueWriteInd(): src=%s, priority=%s, data=%s" % (src, priority, repr(data)))
+        self._logger.debug("Group.groupValueWriteInd(): src=%s, priority=%s, data=%r", src, priority, data)
         for listener in self._listeners:
             try:
                 listener.onWrite(src, data)
             except PKNyXValueError:
-                Logger().exception("Group.groupValueWriteInd()")
+                self._logger.exception("Group.groupValueWriteInd()")
 
     def groupValueReadInd(self, src, priority):
-        Logger().debug("Group.groupValueReadInd(): src=%s, priority=%s" % (src, priority))
+        self._logger.debug("Group.groupValueReadInd(): src=%s, priority=%s", src, priority)
         for listener in self._listeners:
             try:
                 listener.onRead(src)
             except PKNyXValueError:
-                Logger().exception("Group.groupValueReadInd()")
+                self._logger.exception("Group.groupValueReadInd()")
 
     def groupValueReadCon(self, src, priority, data):
-        Logger().debug("Group.groupValueReadCon(): src=%s, priority=%s, data=%s" % (src, priority, repr(data)))
+        self._logger.debug("Group.groupValueReadCon(): src=%s, priority=%s, data=%r", src, priority, data)
         for listener in self._listeners:
             try:
                 listener.onResponse(src, data)
             except PKNyXValueError:
-                Logger().exception("Group.groupValueReadCon()")
+                self._logger.exception("Group.groupValueReadCon()")
 
     @property
     def gad(self):
@@ -146,17 +149,66 @@ class Group(A_GroupDataListener):
 
         @todo: check listener type
         """
-        self._listeners.add(listener)
+        listeners = set(self._listeners)
+        listeners.add(listener)
+        self._listeners = listeners
+
+    def removeListener(self, listener):
+        """ Remove a listener from this group
+
+        Listeners can be added/removed while the group dispatches a telegram (the set is copied on change).
 
-    def write(self, priority, data, size):
+        @param listener: Listener
+        @type listener: L{GroupListener<pknyx.core.groupListener>}
+        """
+        listeners = set(self._listeners)
+        listeners.discard(listener)
+        self._listeners = listeners
+
+    def write(self, priority, data, size, wait=True, coalesce=False):
         """ Write data request on the GAD associated with this group
+
+        @param wait: if True, block until the transmission is confirmed. If False, return immediately
+                     the pending L{Transmission<pknyx.stack.transceiver.transmission>}, which can be waited for later
+        @type wait: bool
+
+        @param coalesce: if True, and a previous write on the GAD is still pending (not yet sent), replace its
+                         value instead of queueing a new transmission (latest value wins)
+        @type coalesce: bool
+
+        @return: transmission result if wait is True, pending transmission otherwise
+        @rtype: int or L{Transmission<pknyx.stack.transceiver.transmission>}
         """
-        self._agds.groupValueWriteReq(self._gad, priority, data, size)
+        return self._agds.groupValueWriteReq(self._gad, priority, data, size, wait, coalesce)
 
-    def read(self, priority):
+    def read(self, priority, wait=True):
         """ Read data request on the GAD associated with this group
+
+        @param wait: if True, block until the transmission is confirmed. If False, return immediately
+                     the pending L{Transmission<pknyx.stack.transceiver.transmission>}
+        @type wait: bool
         """
-        self._agds.groupValueReadReq(self._gad, priority)
+        return self._agds.groupValueReadReq(self._gad, priority, wait)
+
+    def readValue(self, priority, maxAge=None, timeout=None):
+        """ Read the value of the GAD associated with this group, using the stack cache if possible
+
+        A cached value not older than maxAge is returned without bus traffic; otherwise, a read request is sent
+        and its answer is waited for. Must not be called from the stack thread.
+
+        @param maxAge: max age of the cached value, in s (None for no limit, 0 to always read the bus)
+        @type maxAge: float
+
+        @param timeout: max time to wait for the answer, in s (default to config.STACK_READ_TIMEOUT)
+        @type timeout: float
+
+        @return: value (raw frame, source and time), or None if no answer has been received
+        @rtype: L{GroupValue<pknyx.stack.groupValueCache>}
+        """
+        if timeout is None:
+            timeout = config.STACK_READ_TIMEOUT
+
+        return self._agds.groupValueReadCached(self._gad, priority, maxAge, timeout)
 
     def response(self, priority, data, size):
         """ Response data request on the GAD associated with this group
@@ -83,6 +83,8 @@ class GroupMonitor(A_GroupDataListener):
         """
         super(GroupMonitor, self).__init__()
 
+        self._logger = Logger()
+
         self._agds = agds
 
         self._listeners = set()
@@ -94,30 +96,30 @@ class GroupMonitor(A_GroupDataListener):
         return "<GroupMonitor()>" % self._gad
 
     def groupValueWriteInd(self, src, gad, priority, data):
-        Logger().debug("GroupMonitor.groupValueWriteInd(): src=%s, gad=%s, priority=%s, data=%s" % \
-                       (src, gad, priority, repr(data)))
+        self._logger.debug("GroupMonitor.groupValueWriteInd(): src=%s, gad=%s, priority=%s, data=%r",
+                       src, gad, priority, data)
         for listener in self._listeners:
             try:
                 listener.onWrite(src, gad, priority, data)
             except PKNyXValueError:
-                Logger().exception("GroupMonitor.groupValueWriteInd()")
+                self._logger.exception("GroupMonitor.groupValueWriteInd()")
 
     def groupValueReadInd(self, src, gad, priority):
-        Logger().debug("GroupMonitor.groupValueReadInd(): src=%s, gad=%s, priority=%s" % (src, gad, priority))
+        self._logger.debug("GroupMonitor.groupValueReadInd(): src=%s, gad=%s, priority=%s", src, gad, priority)
         for listener in self._listeners:
             try:
                 listener.onRead(src, gad, priority)
             except PKNyXValueError:
-                Logger().exception("GroupMonitor.groupValueReadInd()")
+                self._logger.exception("GroupMonitor.groupValueReadInd()")
 
     def groupValueReadCon(self, src, gad, priority, data):
-        Logger().debug("GroupMonitor.groupValueReadCon(): src=%s, gad=%s, priority=%s, data=%s" % \
-                       (src, gad, priority, repr(data)))
+        self._logger.debug("GroupMonitor.groupValueReadCon(): src=%s, gad=%s, priority=%s, data=%r",
+                       src, gad, priority, data)
         for listener in self._listeners:
             try:
                 listener.onResponse(src, gad, priority, data)
             except PKNyXValueError:
-                Logger().exception("GroupMonitor.groupValueReadCon()")
+                self._logger.exception("GroupMonitor.groupValueReadCon()")
 
     @property
     def listeners(self):
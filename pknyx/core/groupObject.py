@@ -53,6 +53,7 @@ __revision__ = "$Id$"
 from pknyx.common.exception import PKNyXValueError
 from pknyx.services.logger import Logger
 from pknyx.core.groupListener import GroupListener
+from pknyx.core.transmitPolicy import TransmitPolicy, TransmitPolicyEngine
 from pknyx.stack.flags import Flags
 from pknyx.stack.priority import Priority
 
@@ -74,13 +75,22 @@ class GroupObject(GroupListener):
     @ivar _priority: bus message priority
     @type _priority: str or L{Priority}
 
+    @ivar _wait: if False, don't wait for bus writes to be confirmed
+    @type _wait: bool
+
+    @ivar _coalesce: if True, a new value replaces the previous one if it is not sent yet (latest value wins)
+    @type _coalesce: bool
+
+    @ivar _policy: transmit policy (send-on-delta, min/max interval, cyclic transmission)
+    @type _policy: L{TransmitPolicy<pknyx.core.transmitPolicy>}
+
     @ivar _group: group to use to communicate on the bus
     @type _group: L{Group<pknyx.core.group>}
 
     @todo: take 'access' into account when managing flags
     @todo: add lock for user
     """
-    def __init__(self, datapoint, flags=Flags(), priority=Priority()):
+    def __init__(self, datapoint, flags=Flags(), priority=Priority(), wait=True, coalesce=False, policy=None):
         """
 
         @param datapoint: associated datapoint
@@ -92,10 +102,23 @@ class GroupObject(GroupListener):
         @param priority: bus message priority
         @type priority: str or L{Priority}
 
+        @param wait: if False, don't wait for bus writes to be confirmed (fire-and-forget)
+        @type wait: bool
+
+        @param coalesce: if True, a new value replaces the previous one if it is still pending in the output queue,
+                         instead of being sent after it (for fast changing values, like dimmer ramps). Usually used
+                         with wait=False
+        @type coalesce: bool
+
+        @param policy: transmit policy (None to send all changes immediately)
+        @type policy: dict or L{TransmitPolicy<pknyx.core.transmitPolicy>}
+
         raise GroupObjectValueError:
         """
         super(GroupObject, self).__init__()
 
+        self._logger = Logger()
+
         self._datapoint = datapoint
         if not isinstance(flags, Flags):
             flags = Flags(flags)
@@ -103,6 +126,11 @@ class GroupObject(GroupListener):
         if not isinstance(priority, Priority):
             priority = Priority(priority)
         self._priority = priority
+        self._wait = wait
+        self._coalesce = coalesce
+        if isinstance(policy, dict):
+            policy = TransmitPolicy(**policy)
+        self._policy = policy
 
         self._group = None
 
@@ -126,13 +154,14 @@ class GroupObject(GroupListener):
 
         @todo: transmit a more generic object, like SignalEvent? Or a dict?
         """
-        Logger().debug("GroupObject._slotChanged(): dp=%s, oldValue=%s, newValue=%s" % (self._datapoint.name, repr(oldValue), repr(newValue)))
+        self._logger.debug("GroupObject._slotChanged(): dp=%s, oldValue=%r, newValue=%r", self._datapoint.name, oldValue, newValue)
 
         if self._group is not None and self._flags.communicate:
             if (oldValue != newValue and self._flags.transmit) or self._flags.stateless:
-                frame, size = self._datapoint.frame
-                self._group.write(self._priority, frame, size)
-        # @todo: add a param to set refresh max delay
+                if self._policy is None:
+                    self.transmit()
+                else:
+                    TransmitPolicyEngine().changed(self, self._flags.stateless)
 
     @property
     def datapoint(self):
@@ -158,6 +187,14 @@ class GroupObject(GroupListener):
             priority = Priority(priority)
         self._priority = priority
 
+    @property
+    def coalesce(self):
+        return self._coalesce
+
+    @property
+    def policy(self):
+        return self._policy
+
     @property
     def group(self):
         return self._group
@@ -177,15 +214,31 @@ class GroupObject(GroupListener):
     def name(self):
         return self._datapoint.name
 
+    def transmit(self, wait=None):
+        """ Send the datapoint value on the bus
+
+        Does nothing if the group object is not bound, or can't communicate.
+
+        @param wait: if False, don't wait for the write to be confirmed (default to the group object setting)
+        @type wait: bool
+        """
+        if self._group is None or not self._flags.communicate:
+            return
+
+        if wait is None:
+            wait = self._wait
+        frame, size = self._datapoint.frame
+        self._group.write(self._priority, frame, size, wait, self._coalesce)
+
     def onWrite(self, src, data):
-        Logger().debug("GroupObject.onWrite(): src=%s, data=%s" % (src, repr(data)))
+        self._logger.debug("GroupObject.onWrite(): src=%s, data=%r", src, data)
 
         # Check if datapoint should be updated
         if self._flags.write:  # and data != self.datapoint.data:
             self.datapoint.frame = data
 
     def onRead(self, src):
-        Logger().debug("GroupObject.onRead(): src=%s" % src)
+        self._logger.debug("GroupObject.onRead(): src=%s", src)
 
         # Check if data should be send over the bus
         if self._flags.communicate:
@@ -194,7 +247,7 @@ class GroupObject(GroupListener):
                 self._group.response(self._priority, frame, size)
 
     def onResponse(self, src, data):
-        Logger().debug("GroupObject.onResponse(): src=%s, data=%s" % (src, repr(data)))
+        self._logger.debug("GroupObject.onResponse(): src=%s, data=%r", src, data)
 
         # Check if datapoint should be updated
         if self._flags.update:  # and data != self.datapoint.data:
@@ -204,20 +257,45 @@ class GroupObject(GroupListener):
 if __name__ == '__main__':
     import unittest
 
+    from pknyx.core.datapoint import Datapoint
+
     # Mute logger
     Logger().setLevel('error')
 
 
+    class OwnerTest(object):
+        def notify(self, dp, oldValue, newValue):
+            pass
+
+
+    class GroupTest(object):
+        def __init__(self):
+            self.writes = []
+
+        def write(self, priority, data, size, wait=True, coalesce=False):
+            self.writes.append((data, wait, coalesce))
+
+
     class GroupObjectTestCase(unittest.TestCase):
 
         def setUp(self):
-            pass
+            self.datapoint = Datapoint(OwnerTest(), "dp", "output", "1.001", default="Off")
 
         def tearDown(self):
             pass
 
         def test_constructor(self):
-            pass
+            groupObject = GroupObject(self.datapoint)
+            self.assertFalse(groupObject.coalesce)
+            self.assertIs(groupObject.policy, None)
+            groupObject = GroupObject(self.datapoint, policy=dict(minInterval=10.))
+            self.assertEqual(groupObject.policy.minInterval, 10.)
+
+        def test_coalesce(self):
+            groupObject = GroupObject(self.datapoint, flags="CWT", wait=False, coalesce=True)
+            groupObject.group = GroupTest()
+            self.datapoint.value = "On"
+            self.assertEqual(groupObject.group.writes, [(bytearray([0x01]), False, True)])
 
 
     unittest.main()
@@ -0,0 +1,533 @@
+# -*- coding: utf-8 -*-
+
+""" Python KNX framework
+
+License
+=======
+
+ - B{pKNyX} (U{http://www.pknyx.org}) is Copyright:
+  - (C) 2013-2015 Frédéric Mantegazza
+
+This program is free software; you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation; either version 2 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program; if not, write to the Free Software
+Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+
+or see:
+
+ - U{http://www.gnu.org/licenses/gpl.html}
+
+Module purpose
+==============
+
+Group data service management
+
+Implements
+==========
+
+ - B{TransmitPolicy}
+ - B{TransmitPolicyEngine}
+ - B{TransmitPolicyValueError}
+
+Documentation
+=============
+
+A L{TransmitPolicy} tells when a L{GroupObject<pknyx.core.groupObject>} sends its Datapoint value on the bus:
+ - delta: the value is sent only if it differs from the last sent value by at least delta (in the Datapoint unit);
+ - relDelta: same, relative to the last sent value (0.05 means 5 %); if both delta and relDelta are given,
+   exceeding one of them is enough. Non numerical values are sent as soon as they change;
+ - minInterval: min time between 2 transmissions, in s; a change occurring sooner is sent (with the latest value)
+   when the interval is over;
+ - maxInterval: heartbeat; the value is sent again if it has not been sent for maxInterval, in s;
+ - cycle: the value is sent every cycle, in s, whatever its changes.
+
+Policies are given in the GO_xxx dicts of L{FunctionalBlock<pknyx.core.functionalBlock>}s, with the 'policy' key.
+
+All policies are run by the L{TransmitPolicyEngine} singleton: a single timer thread (an
+L{EventLoop<pknyx.stack.eventLoop>}, started on first use) handles the delayed, heartbeat and cyclic transmissions
+of all GroupObjects. These transmissions don't wait for their confirmation.
+
+Heartbeat and cyclic transmissions of a GroupObject start when it is registered (done by
+L{Device.start()<pknyx.core.device>}), and stop when it is unregistered.
+
+Usage
+=====
+
+>>> class MyFB(FunctionalBlock):
+...     DP_01 = dict(name="temperature", access="output", dptId="9.001", default=19.)
+...     GO_01 = dict(dp="temperature", flags="CRT", priority="low",
+...                  policy=dict(delta=0.2, minInterval=10., maxInterval=600.))
+
+@author: Frédéric Mantegazza
+@copyright: (C) 2013-2015 Frédéric Mantegazza
+@license: GPL
+"""
+
+__revision__ = "$Id$"
+
+import threading
+import time
+
+from pknyx.common.exception import PKNyXValueError
+from pknyx.common.singleton import Singleton
+from pknyx.services.logger import Logger
+from pknyx.stack.eventLoop import EventLoop
+
+
+class TransmitPolicyValueError(PKNyXValueError):
+    """
+    """
+
+
+class TransmitPolicy(object):
+    """ TransmitPolicy class
+
+    Policies are immutable, and can be shared by several GroupObjects.
+
+    @ivar _delta: absolute delta threshold
+    @type _delta: float
+
+    @ivar _relDelta: relative delta threshold
+    @type _relDelta: float
+
+    @ivar _minInterval: min time between 2 transmissions, in s
+    @type _minInterval: float
+
+    @ivar _maxInterval: max time without transmission (heartbeat), in s
+    @type _maxInterval: float
+
+    @ivar _cycle: cyclic transmission period, in s
+    @type _cycle: float
+    """
+    def __init__(self, delta=None, relDelta=None, minInterval=None, maxInterval=None, cycle=None):
+        """
+
+        @param delta: absolute delta threshold (None to send all changes)
+        @type delta: float
+
+        @param relDelta: relative delta threshold (None to send all changes)
+        @type relDelta: float
+
+        @param minInterval: min time between 2 transmissions, in s (None for no limit)
+        @type minInterval: float
+
+        @param maxInterval: max time without transmission, in s (None for no heartbeat)
+        @type maxInterval: float
+
+        @param cycle: cyclic transmission period, in s (None for no cyclic transmission)
+        @type cycle: float
+
+        raise TransmitPolicyValueError:
+        """
+        super(TransmitPolicy, self).__init__()
+
+        for name, value in (("delta", delta), ("relDelta", relDelta), ("minInterval", minInterval),
+                            ("maxInterval", maxInterval), ("cycle", cycle)):
+            if value is not None and value <= 0:
+                raise TransmitPolicyValueError("invalid %s (%r)" % (name, value))
+        if None not in (minInterval, maxInterval) and maxInterval <= minInterval:
+            raise TransmitPolicyValueError("maxInterval (%r) must be greater than minInterval (%r)" %
+                                           (maxInterval, minInterval))
+
+        self._delta = delta
+        self._relDelta = relDelta
+        self._minInterval = minInterval
+        self._maxInterval = maxInterval
+        self._cycle = cycle
+
+    def __repr__(self):
+        return "<TransmitPolicy(delta=%r, relDelta=%r, minInterval=%r, maxInterval=%r, cycle=%r)>" % \
+               (self._delta, self._relDelta, self._minInterval, self._maxInterval, self._cycle)
+
+    @property
+    def delta(self):
+        return self._delta
+
+    @property
+    def relDelta(self):
+        return self._relDelta
+
+    @property
+    def minInterval(self):
+        return self._minInterval
+
+    @property
+    def maxInterval(self):
+        return self._maxInterval
+
+    @property
+    def cycle(self):
+        return self._cycle
+
+    @property
+    def timed(self):
+        """ True if the policy needs timers when the GroupObject is idle (heartbeat or cyclic transmissions)
+        """
+        return self._maxInterval is not None or self._cycle is not None
+
+    def exceeds(self, lastValue, value):
+        """ Check if a value differs enough from the last sent value to be sent
+
+        @param lastValue: last sent value (None if nothing has been sent yet)
+
+        @param value: new value
+
+        @rtype: bool
+        """
+        if lastValue is None or (self._delta is None and self._relDelta is None):
+            return True
+
+        try:
+            diff = abs(value - lastValue)
+        except TypeError:
+            return value != lastValue
+
+        if self._delta is not None and diff >= self._delta:
+            return True
+        if self._relDelta is not None and diff and diff >= self._relDelta * abs(lastValue):
+            return True
+
+        return False
+
+
+class _TransmitState(object):
+    """ Transmission state of a GroupObject
+
+    Timers get the state they have been scheduled for: once the GroupObject is unregistered, its state is dropped,
+    and pending timers end, even if the GroupObject is registered again.
+    """
+    __slots__ = ("lastTime", "lastValue", "deferred", "registered")
+
+    def __init__(self):
+        self.lastTime = None
+        self.lastValue = None
+        self.deferred = False
+        self.registered = False
+
+
+class TransmitPolicyEngine(object):
+    """ TransmitPolicyEngine class
+
+    @ivar _states: transmission state of the GroupObjects having a policy
+    @type _states: dict of L{GroupObject<pknyx.core.groupObject>}: L{_TransmitState}
+
+    @ivar _lock: lock protecting the states
+    @type _lock: L{Lock<threading>}
+
+    @ivar _timerLoop: loop running the timers of all GroupObjects (started on first use)
+    @type _timerLoop: L{EventLoop<pknyx.stack.eventLoop>}
+    """
+    __metaclass__ = Singleton
+
+    def __init__(self):
+        """
+        """
+        super(TransmitPolicyEngine, self).__init__()
+
+        self._logger = Logger()
+
+        self._states = {}
+        self._lock = threading.Lock()
+        self._timerLoop = EventLoop(name="Transmit policy timer", daemon=True)
+
+    def _callLater(self, delay, callback, *args):
+        if not self._timerLoop.running:
+            self._timerLoop.start()
+        self._timerLoop.callLater(delay, callback, *args)
+
+    def _state(self, groupObject):
+        """ Get the state of a GroupObject, created if needed
+
+        Must be called with the lock acquired.
+        """
+        try:
+            return self._states[groupObject]
+        except KeyError:
+            state = self._states[groupObject] = _TransmitState()
+            return state
+
+    def _sent(self, state, value, now):
+        """ Record a transmission
+
+        Must be called with the lock acquired.
+        """
+        state.lastTime = now
+        state.lastValue = value
+
+    def register(self, groupObject):
+        """ Start heartbeat and cyclic transmissions of a GroupObject
+
+        Does nothing if the GroupObject policy does not need timers, or if it is already registered.
+
+        @param groupObject: GroupObject
+        @type groupObject: L{GroupObject<pknyx.core.groupObject>}
+        """
+        policy = groupObject.policy
+        if policy is None or not policy.timed:
+            return
+
+        with self._lock:
+            state = self._state(groupObject)
+            if state.registered:
+                return
+            state.registered = True
+            if state.lastTime is None:
+                state.lastTime = time.time()
+
+        self._logger.debug("TransmitPolicyEngine.register(): groupObject=%s, policy=%r", groupObject, policy)
+
+        if policy.maxInterval is not None:
+            self._callLater(policy.maxInterval, self._heartbeat, groupObject, state)
+        if policy.cycle is not None:
+            self._callLater(policy.cycle, self._cycle, groupObject, state, time.time() + policy.cycle)
+
+    def unregister(self, groupObject):
+        """ Stop all pending transmissions of a GroupObject
+
+        Its pending timers end when they expire.
+
+        @param groupObject: GroupObject
+        @type groupObject: L{GroupObject<pknyx.core.groupObject>}
+        """
+        with self._lock:
+            self._states.pop(groupObject, None)
+
+    def changed(self, groupObject, stateless=False):
+        """ Handle a change of the GroupObject Datapoint value
+
+        The value is sent now, later, or not at all, according to the GroupObject policy.
+
+        @param groupObject: GroupObject
+        @type groupObject: L{GroupObject<pknyx.core.groupObject>}
+
+        @param stateless: if True, send the value even if it does not differ from the last sent one
+        @type stateless: bool
+
+        @return: True if the value has been sent now
+        @rtype: bool
+        """
+        policy = groupObject.policy
+        value = groupObject.datapoint.value
+        now = time.time()
+        with self._lock:
+            state = self._state(groupObject)
+            if not stateless and not policy.exceeds(state.lastValue, value):
+                return False
+
+            if policy.minInterval is not None and state.lastTime is not None:
+                remaining = state.lastTime + policy.minInterval - now
+                if remaining > 0:
+                    if not state.deferred:
+                        state.deferred = True
+                        self._callLater(remaining, self._deferred, groupObject, state, stateless)
+                    return False
+
+            self._sent(state, value, now)
+
+        groupObject.transmit()
+
+        return True
+
+    def _deferred(self, groupObject, state, stateless):
+        """ Send the latest value of a GroupObject, once its min interval is over
+        """
+        policy = groupObject.policy
+        value = groupObject.datapoint.value
+        now = time.time()
+        with self._lock:
+            if self._states.get(groupObject) is not state or not state.deferred:
+                return
+            state.deferred = False
+            if not stateless and not policy.exceeds(state.lastValue, value):
+                return
+            self._sent(state, value, now)
+
+        groupObject.transmit(wait=False)
+
+    def _heartbeat(self, groupObject, state):
+        """ Send the value of a GroupObject if it has not been sent for its max interval
+        """
+        policy = groupObject.policy
+        now = time.time()
+        with self._lock:
+            if self._states.get(groupObject) is not state:
+                return
+            nextTime = state.lastTime + policy.maxInterval
+            send = nextTime <= now
+            if send:
+                self._sent(state, groupObject.datapoint.value, now)
+                nextTime = now + policy.maxInterval
+
+        self._callLater(nextTime - now, self._heartbeat, groupObject, state)
+        if send:
+            groupObject.transmit(wait=False)
+
+    def _cycle(self, groupObject, state, dueTime):
+        """ Send the value of a GroupObject, and schedule the next cyclic transmission
+        """
+        policy = groupObject.policy
+        now = time.time()
+        with self._lock:
+            if self._states.get(groupObject) is not state:
+                return
+            self._sent(state, groupObject.datapoint.value, now)
+
+        # Keep the period, unless late by more than one period
+        dueTime += policy.cycle
+        if dueTime <= now:
+            dueTime = now + policy.cycle
+        self._callLater(dueTime - now, self._cycle, groupObject, state, dueTime)
+        groupObject.transmit(wait=False)
+
+
+if __name__ == '__main__':
+    import unittest
+
+    from pknyx.core.datapoint import Datapoint
+    from pknyx.core.groupObject import GroupObject
+
+    # GroupObject uses the engine of the imported module, not the one of __main__
+    from pknyx.core.transmitPolicy import TransmitPolicyEngine
+
+    # Mute logger
+    Logger().setLevel('error')
+
+
+    class OwnerTest(object):
+        def notify(self, dp, oldValue, newValue):
+            pass
+
+
+    class GroupTest(object):
+        def __init__(self):
+            self.writes = []
+            self.event = threading.Event()
+
+        def write(self, priority, data, size, wait=True, coalesce=False):
+            self.writes.append((time.time(), data, wait))
+            self.event.set()
+
+
+    class TransmitPolicyTestCase(unittest.TestCase):
+
+        def setUp(self):
+            pass
+
+        def tearDown(self):
+            pass
+
+        def test_constructor(self):
+            with self.assertRaises(TransmitPolicyValueError):
+                TransmitPolicy(delta=0.)
+            with self.assertRaises(TransmitPolicyValueError):
+                TransmitPolicy(cycle=-1.)
+            with self.assertRaises(TransmitPolicyValueError):
+                TransmitPolicy(minInterval=10., maxInterval=5.)
+            self.assertFalse(TransmitPolicy(delta=1.).timed)
+            self.assertTrue(TransmitPolicy(maxInterval=1.).timed)
+
+        def test_exceeds(self):
+            policy = TransmitPolicy(delta=0.5)
+            self.assertTrue(policy.exceeds(None, 20.))
+            self.assertFalse(policy.exceeds(20., 20.4))
+            self.assertTrue(policy.exceeds(20., 19.5))
+            self.assertTrue(policy.exceeds("On", "Off"))
+            self.assertFalse(policy.exceeds("On", "On"))
+            policy = TransmitPolicy(relDelta=0.1)
+            self.assertFalse(policy.exceeds(100, 109))
+            self.assertTrue(policy.exceeds(100, 110))
+            self.assertTrue(policy.exceeds(0, 1))
+            self.assertFalse(policy.exceeds(0, 0))
+            policy = TransmitPolicy(delta=5, relDelta=0.1)
+            self.assertTrue(policy.exceeds(10, 12))
+            self.assertTrue(policy.exceeds(1000, 1005))
+            self.assertFalse(policy.exceeds(1000, 1004))
+
+
+    class TransmitPolicyEngineTestCase(unittest.TestCase):
+
+        def setUp(self):
+            self.datapoint = Datapoint(OwnerTest(), "dp", "output", "9.001", default=20.)
+            self.group = GroupTest()
+
+        def tearDown(self):
+            pass
+
+        def _groupObject(self, **policy):
+            groupObject = GroupObject(self.datapoint, flags="CRT", policy=policy)
+            groupObject.group = self.group
+            return groupObject
+
+        def test_delta(self):
+            groupObject = self._groupObject(delta=0.5)
+            self.datapoint.value = 20.2
+            self.datapoint.value = 20.5
+            self.datapoint.value = 20.6
+            self.datapoint.value = 20.8
+            self.datapoint.value = 21.
+            self.assertEqual(len(self.group.writes), 2)  # 20.2 and 20.8
+            TransmitPolicyEngine().unregister(groupObject)
+
+        def test_minInterval(self):
+            groupObject = self._groupObject(minInterval=0.05)
+            startTime = time.time()
+            self.datapoint.value = 21.
+            self.datapoint.value = 22.
+            self.datapoint.value = 23.
+            self.assertEqual(len(self.group.writes), 1)
+            self.group.event.clear()
+            self.assertTrue(self.group.event.wait(1.))
+            self.assertEqual(len(self.group.writes), 2)
+            sendTime, data, wait = self.group.writes[1]
+            self.assertGreaterEqual(sendTime - startTime, 0.05)
+            self.assertFalse(wait)
+            self.assertEqual(self.datapoint.dptXlator.frameToData(data), self.datapoint.dptXlator.valueToData(23.))
+            TransmitPolicyEngine().unregister(groupObject)
+
+        def test_heartbeat(self):
+            groupObject = self._groupObject(maxInterval=0.05)
+            TransmitPolicyEngine().register(groupObject)
+            time.sleep(0.03)
+            self.datapoint.value = 21.
+            time.sleep(0.04)
+            self.assertEqual(len(self.group.writes), 1)
+            time.sleep(0.05)
+            TransmitPolicyEngine().unregister(groupObject)
+            self.assertEqual(len(self.group.writes), 2)
+            self.assertGreaterEqual(self.group.writes[1][0] - self.group.writes[0][0], 0.05)
+
+        def test_cycle(self):
+            groupObject = self._groupObject(cycle=0.02)
+            TransmitPolicyEngine().register(groupObject)
+            TransmitPolicyEngine().register(groupObject)  # already registered
+            time.sleep(0.11)
+            TransmitPolicyEngine().unregister(groupObject)
+            count = len(self.group.writes)
+            self.assertTrue(4 <= count <= 6)
+            time.sleep(0.05)
+            self.assertEqual(len(self.group.writes), count)
+
+        def test_registerAgain(self):
+            groupObject = self._groupObject(cycle=0.05, maxInterval=0.1)
+            for i in xrange(3):
+                TransmitPolicyEngine().register(groupObject)
+                time.sleep(0.01)
+                TransmitPolicyEngine().unregister(groupObject)
+            TransmitPolicyEngine().register(groupObject)
+            time.sleep(0.23)
+            TransmitPolicyEngine().unregister(groupObject)
+
+            # Only the last registration sends: 4 cyclic transmissions (heartbeat never needed)
+            self.assertTrue(4 <= len(self.group.writes) <= 5)
+
+
+    unittest.main()
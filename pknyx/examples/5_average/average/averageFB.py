@@ -17,18 +17,18 @@ class AverageFB(FunctionalBlock):
 
     DESC = "Average FB"
 
-    @notify.datapoint(dp="temp_1", condition="change")
-    @notify.datapoint(dp="temp_2", condition="change")
-    @notify.datapoint(dp="temp_3", condition="change")
+    @notify.datapoint(dp="temp_1", condition="change", debounce=0.1)
+    @notify.datapoint(dp="temp_2", condition="change", debounce=0.1)
+    @notify.datapoint(dp="temp_3", condition="change", debounce=0.1)
     def tempChanged(self, event):
         """ Method called when any of the 'temp_x' Datapoint change
+
+        Changes occuring within 100ms are handled at once.
         """
         logger.debug("%s: event=%s" % (self.name, repr(event)))
 
-        dpName = event['dp']
-        newValue = event['newValue']
-        oldValue = event['oldValue']
-        logger.info("%s: '%s' value changed from %s to %s" % (self.name, dpName, oldValue, newValue))
+        for dpName in event['dps']:
+            logger.info("%s: '%s' value changed to %s" % (self.name, dpName, event['values'][dpName]))
 
         # Compute new average
         average = 0.
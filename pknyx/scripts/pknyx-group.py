@@ -226,23 +226,19 @@ def read(gad, timeout=1, wait=True, dptId="1.xxx", src="0.0.0", priority="low",
 
     stack.start()
     try:
-        group.read(priority)
-
         if wait:
-            groupObject.queue.acquire()
-            try:
-                groupObject.queue.wait(timeout)  # Find a wait to know if timeout expired
-                try:
-                    data = groupObject.queue.pop()
-                except IndexError:
-                    Logger().warning("No answer from %s" % gad)
-                    sys.exit(1)
-            finally:
-                groupObject.queue.release()
+
+            # The stack has just been started, so its cache is empty: always read the bus
+            groupValue = group.readValue(priority, maxAge=0, timeout=timeout)
+            if groupValue is None:
+                Logger().warning("No answer from %s" % gad)
+                sys.exit(1)
 
             dptXlator = DPTXlatorFactory().create(dptId)
-            value = dptXlator.dataToValue(dptXlator.frameToData(data))
+            value = dptXlator.dataToValue(dptXlator.frameToData(groupValue.data))
             Logger().info(repr(value))
+        else:
+            group.read(priority)
 
     finally:
         stack.stop()
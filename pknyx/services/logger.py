@@ -72,6 +72,17 @@ class LoggerValueError(PKNyXValueError):
 
 class Logger(object):
     """ Logger object.
+
+    Messages can be given with args, which are only merged (using the % operator) if the message is actually
+    logged, so it is cheap to log at a disabled level:
+
+        Logger().debug("Group.groupValueWriteInd(): src=%s, data=%r", src, data)
+
+    Callers on hot paths can keep a reference on the Logger, to avoid the Singleton lookup, and use L{isEnabledFor}
+    to skip expensive computations.
+
+    @ivar _enabledFor: enabled state of each level, updated on level change
+    @type _enabledFor: dict
     """
     __metaclass__ = Singleton
 
@@ -90,6 +101,7 @@ class Logger(object):
         logging.addLevelName(logging.EXCEPTION, "EXCEPTION")
 
         # Logger
+        self._enabledFor = {}
         self._logger = logging.getLogger(config.APP_NAME)
         self._logger.propagate = False
 
@@ -134,6 +146,7 @@ class Logger(object):
         if level not in LEVELS.keys():
             raise LoggerValueError("Logger level must be in %s" % LEVELS.keys())
         self._logger.setLevel(LEVELS[level])
+        self._enabledFor = dict([(name, value >= LEVELS[level]) for name, value in LEVELS.iteritems()])
 
         if self._logger.level >= logging.INFO:
             streamFormatter = SpaceColorFormatter("")
@@ -141,13 +154,27 @@ class Logger(object):
             streamFormatter = SpaceColorFormatter(config.LOGGER_STREAM_FORMAT)
         self._stdoutStreamHandler.setFormatter(streamFormatter)
 
+    def isEnabledFor(self, level):
+        """ Check if a level is enabled.
+
+        Uses a cached value, updated by L{setLevel}.
+
+        @param level: level to check, in ('trace', 'debug', 'info', 'warning', 'error', 'exception', 'critical')
+        @type level: str
+
+        @return: True if messages of that level are logged
+        @rtype: bool
+        """
+        return self._enabledFor[level]
+
     def trace(self, message, *args, **kwargs):
         """ Logs a message with level TRACE.
 
         @param message: message to log
         @type message: string
         """
-        self._logger.log(logging.TRACE, message, *args, **kwargs)
+        if self._enabledFor['trace']:
+            self._logger.log(logging.TRACE, message, *args, **kwargs)
 
     def debug(self, message, *args, **kwargs):
         """ Logs a message with level DEBUG.
@@ -155,7 +182,8 @@ class Logger(object):
         @param message: message to log
         @type message: string
         """
-        self._logger.debug(message, *args, **kwargs)
+        if self._enabledFor['debug']:
+            self._logger.debug(message, *args, **kwargs)
 
     def info(self, message, *args, **kwargs):
         """ Logs a message with level INFO.
@@ -86,12 +86,19 @@ Idem for scheduler.
 __revision__ = "$Id$"
 
 
-import thread
+import inspect
+import itertools
+import threading
+import time
+import types
 
+from pknyx.common import config
 from pknyx.common.exception import PKNyXValueError
 from pknyx.common.utils import reprStr
 from pknyx.common.singleton import Singleton
 from pknyx.services.logger import Logger
+from pknyx.services.workerPool import WorkerPool
+from pknyx.stack.eventLoop import EventLoop
 
 scheduler = None
 
@@ -104,11 +111,34 @@ class NotifierValueError(PKNyXValueError):
 class Notifier(object):
     """ Notifier class
 
-    @ivar _pendingFuncs:
-    @type _pendingFuncs: list
+    Jobs are resolved once per FunctionalBlock class, then bound to the Datapoints of each registered instance, so
+    a notification only loops over the jobs of the changed Datapoint.
 
-    @ivar _datapointJobs:
-    @type _registeredJobs: dict
+    Jobs registered with a B{debounce}, B{throttle} or B{coalesce} option fold bursts of changes (of all the
+    datapoints they watch) into a single call. Their event also contains:
+     - B{dps}: names of the changed datapoints, in change order;
+     - B{values}: latest values of the changed datapoints, by name;
+     - B{count}: number of folded changes.
+    B{dp}, B{oldValue} and B{newValue} refer to the last changed datapoint (B{oldValue} being its value before the
+    burst). Folded jobs are called from the notifier timer thread (or from a worker, if threaded).
+
+    @ivar _pendingFuncs: pending datapoint jobs, as (sequence, dp, condition, thread, fold), by function
+    @type _pendingFuncs: dict of callable: list of tuple
+
+    @ivar _classJobs: datapoint jobs, as (method name, dp, condition, thread, fold), by class
+    @type _classJobs: dict of class: list of tuple
+
+    @ivar _bursts: pending folded changes, by method
+    @type _bursts: dict of callable: dict
+
+    @ivar _lastCalls: last call time of throttled methods
+    @type _lastCalls: dict of callable: float
+
+    @ivar _timerLoop: loop running delayed calls of folded jobs (started on first use)
+    @type _timerLoop: L{EventLoop<pknyx.stack.eventLoop>}
+
+    @ivar _workerPool: pool running threaded jobs
+    @type _workerPool: L{WorkerPool<pknyx.services.workerPool>}
     """
     __metaclass__ = Singleton
 
@@ -119,10 +149,50 @@ class Notifier(object):
         """
         super(Notifier, self).__init__()
 
-        self._pendingFuncs = []
-        self._datapointJobs = {}
+        self._pendingFuncs = {}
+        self._sequence = itertools.count()
+        self._classJobs = {}
         #self._groupJobs = {}
 
+        self._workerPool = WorkerPool(size=config.NOTIFIER_WORKERS, maxPending=config.NOTIFIER_MAX_PENDING,
+                                      overflow=config.NOTIFIER_OVERFLOW, maxPerOwner=config.NOTIFIER_MAX_PER_FB,
+                                      name="Notifier worker")
+
+        self._bursts = {}
+        self._lastCalls = {}
+        self._burstsLock = threading.Lock()
+        self._timerLoop = EventLoop(name="Notifier timer", daemon=True)
+
+    @property
+    def workerPool(self):
+        return self._workerPool
+
+    def configureWorkerPool(self, size=config.NOTIFIER_WORKERS, maxPending=config.NOTIFIER_MAX_PENDING,
+                            overflow=config.NOTIFIER_OVERFLOW, maxPerFB=config.NOTIFIER_MAX_PER_FB):
+        """ Configure the pool running threaded jobs
+
+        Pending jobs of the previous pool are dropped.
+
+        @param size: number of worker threads
+        @type size: int
+
+        @param maxPending: max number of pending jobs
+        @type maxPending: int
+
+        @param overflow: overflow policy, in ("dropOldest", "coalesce", "block"). With "coalesce", a pending job is
+                         replaced by the new notification of the same datapoint
+        @type overflow: str
+
+        @param maxPerFB: max number of running jobs of the same FunctionalBlock (None for no limit)
+        @type maxPerFB: int
+
+        raise WorkerPoolValueError:
+        """
+        workerPool = WorkerPool(size=size, maxPending=maxPending, overflow=overflow, maxPerOwner=maxPerFB,
+                                name="Notifier worker")
+        self._workerPool.shutdown()
+        self._workerPool = workerPool
+
     def _execute(self, method, event):
         """ Execute given method
 
@@ -135,9 +205,11 @@ class Notifier(object):
         except:
             Logger().exception("Notifier._execute()")
 
-    def addDatapointJob(self, func, dp, condition="change", thread=False):
+    def addDatapointJob(self, func, dp, condition="change", thread=False, debounce=None, throttle=None, coalesce=False):
         """ Add a job for a datapoint change
 
+        Only one of debounce, throttle and coalesce can be used.
+
         @param func: job to register
         @type func: callable
 
@@ -149,18 +221,40 @@ class Notifier(object):
 
         @param thread: flag to execute job in a thread
         @type thread: bool
+
+        @param debounce: call the job once changes stop for this delay, in s
+        @type debounce: float
+
+        @param throttle: call the job at most once per this delay, in s (first change is handled without delay)
+        @type throttle: float
+
+        @param coalesce: call the job as soon as possible, with all changes occured until then
+        @type coalesce: bool
+
+        raise NotifierValueError:
         """
-        Logger().debug("Notifier.addDatapointJob(): func=%s, dp=%s" % (repr(func), repr(dp)))
+        Logger().debug("Notifier.addDatapointJob(): func=%r, dp=%r", func, dp)
 
         if condition not in ("change", "always"):
             raise NotifierValueError("invalid condition (%s)" % repr(condition))
 
-        self._pendingFuncs.append(("datapoint", func, (dp, condition, thread)))
+        folds = [(mode, delay) for mode, delay in (("debounce", debounce), ("throttle", throttle)) if delay is not None]
+        if coalesce:
+            folds.append(("coalesce", 0.))
+        if len(folds) > 1:
+            raise NotifierValueError("only one of debounce, throttle and coalesce can be used")
+        for mode, delay in folds:
+            if delay < 0:
+                raise NotifierValueError("invalid %s delay (%r)" % (mode, delay))
+        fold = folds[0] if folds else None
+
+        self._pendingFuncs.setdefault(func, []).append((next(self._sequence), dp, condition, thread, fold))
+        self._classJobs.clear()
 
     def datapoint(self, dp, *args, **kwargs):
         """ Decorator for addDatapointJob()
         """
-        Logger().debug("Notifier.datapoint(): dp=%s, args=%s, kwargs=%s" % (repr(dp), repr(args), repr(kwargs)))
+        Logger().debug("Notifier.datapoint(): dp=%r, args=%r, kwargs=%r", dp, args, kwargs)
 
         def decorated(func):
             """ We don't wrap the decorated function!
@@ -198,39 +292,119 @@ class Notifier(object):
 
         #return decorated
 
+    def _getClassJobs(self, cls):
+        """ Return the datapoint jobs of a class
+
+        Only the methods really used by the class instances are taken into account (overloaded methods are ignored).
+        Jobs are sorted in registration order.
+
+        @param cls: class to scan
+        @type cls: class
+
+        @return: jobs, as (method name, dp, condition, thread, fold)
+        @rtype: list of tuple
+        """
+        try:
+            return self._classJobs[cls]
+        except KeyError:
+            jobs = []
+            names = set()
+            for cls_ in inspect.getmro(cls):
+                for name, value in cls_.__dict__.iteritems():
+                    if name in names:
+                        continue
+                    names.add(name)
+                    if isinstance(value, types.FunctionType):
+                        for sequence, dp, condition, thread, fold in self._pendingFuncs.get(value, ()):
+                            jobs.append((sequence, name, dp, condition, thread, fold))
+            jobs = [job[1:] for job in sorted(jobs)]
+            self._classJobs[cls] = jobs
+
+            return jobs
+
     def doRegisterJobs(self, obj):
         """ Really register jobs
 
+        Jobs are bound to the datapoints of the given instance.
+
         @param obj: instance for which a method may have been pre-registered
-        @type obj: object
+        @type obj: L{FunctionalBlock<pknyx.core.functionalBlock>}
+
+        raise NotifierValueError:
         """
-        Logger().debug("Notifier.doRegisterJobs(): obj=%s" % repr(obj))
-
-        for type_, func, args in self._pendingFuncs:
-            Logger().debug("Notifier.doRegisterJobs(): type_=\"%s\", func=%s, args=%s" % (type_, func.func_name, repr(args)))
-
-            method = getattr(obj, func.func_name, None)
-            if method is not None:
-                Logger().debug("Notifier.doRegisterJobs(): add method %s() of %s" % (method.im_func.func_name, method.im_self))
-
-                if method.im_func is func:  # avoid name clash between FB methods
-
-                    if type_ == "datapoint":
-                        dp, condition, thread = args
-                        try:
-                            self._datapointJobs[obj][dp].append((method, condition, thread))
-                        except KeyError:
-                            try:
-                                self._datapointJobs[obj][dp] = [(method, condition, thread)]
-                            except KeyError:
-                                self._datapointJobs[obj] = {dp: [(method, condition, thread)]}
-
-                    #elif type_ == "group":
-                        #gad = args
-                        #try:
-                            #self._groupJobs[gad].append(method)
-                        #except KeyError:
-                            #self._groupJobs[gad] = [method]
+        Logger().debug("Notifier.doRegisterJobs(): obj=%r", obj)
+
+        for name, dp, condition, thread, fold in self._getClassJobs(obj.__class__):
+            method = getattr(obj, name)
+            Logger().debug("Notifier.doRegisterJobs(): add method %s() of %s for dp %s", name, obj, dp)
+            try:
+                datapoint = obj.dp[dp]
+            except KeyError:
+                raise NotifierValueError("unknown datapoint (%s)" % dp)
+            datapoint.addJob((method, condition, thread, fold))
+
+    def _fold(self, method, dp, oldValue, newValue, condition, thread_, fold):
+        """ Fold a change into the pending burst of a method, and schedule its call
+
+        @param fold: fold mode and delay
+        @type fold: tuple of (str, float)
+        """
+        mode, delay = fold
+        now = time.time()
+        with self._burstsLock:
+            burst = self._bursts.get(method)
+            if burst is None:
+                burst = self._bursts[method] = dict(dps=[], values={}, count=0, deadline=now)
+                if mode == "throttle":
+                    delay = max(0., self._lastCalls.get(method, 0.) + delay - now)
+                schedule = True
+            else:
+                schedule = False
+
+            if dp in burst['values']:
+                burst['dps'].remove(dp)
+                burst['values'][dp][1] = newValue
+            else:
+                burst['values'][dp] = [oldValue, newValue]
+            burst['dps'].append(dp)
+            burst['count'] += 1
+            burst['condition'] = condition
+            burst['thread'] = thread_
+            if mode == "debounce":
+                burst['deadline'] = now + delay
+
+        if schedule:
+            if not self._timerLoop.running:
+                self._timerLoop.start()
+            self._timerLoop.callLater(delay, self._fire, method)
+
+    def _fire(self, method):
+        """ Call a method with its pending burst of changes
+
+        Runs in the timer thread.
+        """
+        now = time.time()
+        with self._burstsLock:
+            burst = self._bursts.get(method)
+            if burst is None:  # cancelled
+                return
+            if burst['deadline'] > now:  # debounced: changes occured since scheduling
+                self._timerLoop.callLater(burst['deadline'] - now, self._fire, method)
+                return
+            del self._bursts[method]
+            self._lastCalls[method] = now
+
+        dp = burst['dps'][-1]
+        oldValue, newValue = burst['values'][dp]
+        event = dict(name="datapoint", dp=dp, oldValue=oldValue, newValue=newValue, condition=burst['condition'],
+                     thread=burst['thread'], dps=tuple(burst['dps']),
+                     values=dict([(dp_, values[1]) for dp_, values in burst['values'].iteritems()]), count=burst['count'])
+        Logger().debug("Notifier._fire(): trigger method %s() of %s (%d changes)", method.im_func.func_name, method.im_self, burst['count'])
+
+        if burst['thread']:
+            self._workerPool.submit(self._execute, (method, event), owner=method.im_self, key=(method, None))
+        else:
+            self._execute(method, event)
 
     def datapointNotify(self, obj, dp, oldValue, newValue):
         """ Notification of a datapoint change
@@ -249,23 +423,55 @@ class Notifier(object):
         @param newValue: new value of the datapoint
         @type newValue: depends on datapoint type
         """
-        Logger().debug("Notifier.datapointNotify(): obj=%s, dp=%s, oldValue=%s, newValue=%s" % (obj.name, dp, repr(oldValue), repr(newValue)))
-
-        if obj in self._datapointJobs.keys():
-            if dp in self._datapointJobs[obj].keys():
-                for method, condition, thread_ in self._datapointJobs[obj][dp]:
-                    if oldValue != newValue and condition == "change" or condition == "always":
-                        try:
-                            Logger().debug("Notifier.datapointNotify(): trigger method %s() of %s" % (method.im_func.func_name, method.im_self))
-                            event = dict(name="datapoint", dp=dp, oldValue=oldValue, newValue=newValue, condition=condition, thread=thread_)
-
-                            if thread_:
-                                thread.start_new_thread(self._execute, (method, event))
-                                #TODO: register threads, so they can be killed (how?) when stopping the device
-                            else:
-                                self._execute(method, event)
-                        except:
-                            Logger().exception("Notifier.datapointNotify()")
+        Logger().debug("Notifier.datapointNotify(): obj=%s, dp=%s, oldValue=%r, newValue=%r", obj.name, dp, oldValue, newValue)
+
+        changed = oldValue != newValue
+        for method, condition, thread_, fold in obj.dp[dp].jobs:
+            if changed and condition == "change" or condition == "always":
+                try:
+                    if fold is not None:
+                        self._fold(method, dp, oldValue, newValue, condition, thread_, fold)
+                        continue
+
+                    Logger().debug("Notifier.datapointNotify(): trigger method %s() of %s", method.im_func.func_name, method.im_self)
+                    event = dict(name="datapoint", dp=dp, oldValue=oldValue, newValue=newValue, condition=condition, thread=thread_)
+
+                    if thread_:
+                        self._workerPool.submit(self._execute, (method, event), owner=obj, key=(method, dp))
+                    else:
+                        self._execute(method, event)
+                except:
+                    Logger().exception("Notifier.datapointNotify()")
+
+    def cancelJobs(self, obj, timeout=None):
+        """ Drop pending threaded and folded jobs of an instance, and wait for its running threaded ones
+
+        @param obj: instance owning the jobs
+        @type obj: L{FunctionalBlock<pknyx.core.functionalBlock>}
+
+        @param timeout: max time to wait for running jobs, in s (None to wait until they end)
+        @type timeout: float
+
+        @return: True if no job of the instance is still running
+        @rtype: bool
+        """
+        with self._burstsLock:
+            for method in self._bursts.keys():
+                if method.im_self is obj:
+                    del self._bursts[method]
+
+        return self._workerPool.cancel(obj, timeout)
+
+    def shutdown(self, timeout=None):
+        """ Drop all pending threaded and folded jobs, and stop the worker threads
+
+        @param timeout: max time to wait for each worker thread, in s (None to wait until they end)
+        @type timeout: float
+        """
+        with self._burstsLock:
+            self._bursts.clear()
+
+        self._workerPool.shutdown(timeout)
 
     def printJobs(self):
         """ Print registered jobs
@@ -274,6 +480,10 @@ class Notifier(object):
 
 if __name__ == '__main__':
     import unittest
+    import threading
+    import time
+
+    from pknyx.services.workerPool import WorkerPoolValueError
 
     # Mute logger
     Logger().setLevel('error')
@@ -282,13 +492,163 @@ if __name__ == '__main__':
     class NotifierTestCase(unittest.TestCase):
 
         def setUp(self):
-            pass
+            from pknyx.core.functionalBlock import FunctionalBlock
+
+            notifier = Notifier()
+
+            class TestFunctionalBlock(FunctionalBlock):
+                DP_01 = dict(name="dp_01", access="output", dptId="9.001", default=19.)
+                DP_02 = dict(name="dp_02", access="output", dptId="9.001", default=19.)
+
+                def init(self):
+                    self.events = []
+
+                @notifier.datapoint(dp="dp_01")
+                def dp01Changed(self, event):
+                    self.events.append(("dp01Changed", event['newValue']))
+
+                @notifier.datapoint(dp="dp_01", condition="always")
+                @notifier.datapoint(dp="dp_02", condition="always")
+                def dpAlways(self, event):
+                    self.events.append(("dpAlways", event['dp']))
+
+                @notifier.datapoint(dp="dp_02", thread=True)
+                def dp02Threaded(self, event):
+                    self.events.append(("dp02Threaded", threading.current_thread().name))
+
+            class OverloadedFunctionalBlock(TestFunctionalBlock):
+                def dp01Changed(self, event):
+                    pass
+
+            self.notifier = notifier
+            self.fb = TestFunctionalBlock(name="test")
+            self.overloadedFb = OverloadedFunctionalBlock(name="overloaded")
+            notifier.doRegisterJobs(self.fb)
+            notifier.doRegisterJobs(self.overloadedFb)
 
         def tearDown(self):
             pass
 
         def test_constructor(self):
-            pass
+            with self.assertRaises(NotifierValueError):
+                self.notifier.addDatapointJob(lambda event: None, "dp_01", condition="dummy")
+
+        def test_doRegisterJobs(self):
+            self.assertEqual([job[0] for job in self.fb.dp["dp_01"].jobs], [self.fb.dp01Changed, self.fb.dpAlways])
+            self.assertEqual([job[0] for job in self.fb.dp["dp_02"].jobs], [self.fb.dpAlways, self.fb.dp02Threaded])
+            self.assertEqual([job[0] for job in self.overloadedFb.dp["dp_01"].jobs], [self.overloadedFb.dpAlways])
+
+        def test_datapointNotify(self):
+            self.notifier.datapointNotify(self.fb, "dp_01", 19., 20.)
+            self.assertEqual(self.fb.events, [("dp01Changed", 20.), ("dpAlways", "dp_01")])
+            self.notifier.datapointNotify(self.fb, "dp_01", 20., 20.)
+            self.assertEqual(self.fb.events[2:], [("dpAlways", "dp_01")])
+            self.notifier.datapointNotify(self.fb, "dp_02", 20., 20.)
+            self.assertEqual(self.fb.events[3:], [("dpAlways", "dp_02")])
+            self.assertEqual(self.overloadedFb.events, [])
+
+        def test_threaded(self):
+            self.notifier.datapointNotify(self.fb, "dp_02", 20., 21.)
+            for i in xrange(100):
+                if len(self.fb.events) == 2:
+                    break
+                time.sleep(0.01)
+            self.assertTrue(self.notifier.cancelJobs(self.fb, 1.))
+            self.assertEqual(self.fb.events[0], ("dpAlways", "dp_02"))
+            self.assertTrue(self.fb.events[1][1].startswith("Notifier worker"))
+            self.notifier.shutdown()
+
+        def test_configureWorkerPool(self):
+            with self.assertRaises(WorkerPoolValueError):
+                self.notifier.configureWorkerPool(overflow="dummy")
+            self.notifier.configureWorkerPool(size=1, maxPending=4, overflow="coalesce", maxPerFB=1)
+            self.assertEqual(self.notifier.workerPool.overflow, "coalesce")
+            self.assertEqual(self.notifier.workerPool.maxPerOwner, 1)
+            self.notifier.configureWorkerPool()
+
+
+    class NotifierFoldTestCase(unittest.TestCase):
+
+        def setUp(self):
+            from pknyx.core.functionalBlock import FunctionalBlock
+
+            notifier = Notifier()
+
+            class FoldFunctionalBlock(FunctionalBlock):
+                DP_01 = dict(name="dp_01", access="output", dptId="9.001", default=19.)
+                DP_02 = dict(name="dp_02", access="output", dptId="9.001", default=19.)
+                DP_03 = dict(name="dp_03", access="output", dptId="9.001", default=19.)
+
+                def init(self):
+                    self.events = []
+
+                @notifier.datapoint(dp="dp_01", debounce=0.1)
+                @notifier.datapoint(dp="dp_02", debounce=0.1)
+                def debounced(self, event):
+                    self.events.append(("debounced", event))
+
+                @notifier.datapoint(dp="dp_03", throttle=0.1)
+                def throttled(self, event):
+                    self.events.append(("throttled", event))
+
+                @notifier.datapoint(dp="dp_01", coalesce=True, thread=True)
+                def coalesced(self, event):
+                    self.events.append(("coalesced", event))
+
+            self.notifier = notifier
+            self.fb = FoldFunctionalBlock(name="fold")
+            notifier.doRegisterJobs(self.fb)
+
+        def tearDown(self):
+            self.notifier.cancelJobs(self.fb)
+
+        def _events(self, name, count, timeout=1.):
+            for i in xrange(int(timeout / 0.01) + 1):
+                events = [event for name_, event in self.fb.events if name_ == name]
+                if len(events) >= count:
+                    break
+                time.sleep(0.01)
+            return events
+
+        def test_constructor(self):
+            with self.assertRaises(NotifierValueError):
+                self.notifier.addDatapointJob(lambda event: None, "dp_01", debounce=1., coalesce=True)
+            with self.assertRaises(NotifierValueError):
+                self.notifier.addDatapointJob(lambda event: None, "dp_01", throttle=-1.)
+
+        def test_debounce(self):
+            self.notifier.datapointNotify(self.fb, "dp_01", 19., 20.)
+            self.notifier.datapointNotify(self.fb, "dp_02", 19., 21.)
+            time.sleep(0.05)
+            self.notifier.datapointNotify(self.fb, "dp_01", 20., 22.)
+            time.sleep(0.07)
+            self.assertEqual(self._events("debounced", 1, 0.), [])  # still debounced
+            events = self._events("debounced", 1)
+            self.assertEqual(len(events), 1)
+            event = events[0]
+            self.assertEqual((event['dp'], event['oldValue'], event['newValue']), ("dp_01", 19., 22.))
+            self.assertEqual(event['dps'], ("dp_02", "dp_01"))
+            self.assertEqual(event['values'], {"dp_01": 22., "dp_02": 21.})
+            self.assertEqual(event['count'], 3)
+
+        def test_throttle(self):
+            for value in (20., 21., 22.):
+                self.notifier.datapointNotify(self.fb, "dp_03", value - 1., value)
+                time.sleep(0.02)
+            events = self._events("throttled", 2)
+            self.assertEqual([(event['newValue'], event['count']) for event in events], [(20., 1), (22., 2)])
+
+        def test_coalesce(self):
+            for value in (20., 21., 22.):
+                self.notifier.datapointNotify(self.fb, "dp_01", value - 1., value)
+            events = self._events("coalesced", 1)
+            self.assertEqual(events[-1]['newValue'], 22.)
+            self.assertEqual(sum([event['count'] for event in events]), 3)
+
+        def test_cancelJobs(self):
+            self.notifier.datapointNotify(self.fb, "dp_02", 19., 20.)
+            self.notifier.cancelJobs(self.fb)
+            self.assertEqual(self._events("debounced", 1, 0.2), [])
 
 
     unittest.main()
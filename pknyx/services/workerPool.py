@@ -0,0 +1,516 @@
+# -*- coding: utf-8 -*-
+
+""" Python KNX framework
+
+License
+=======
+
+ - B{pKNyX} (U{http://www.pknyx.org}) is Copyright:
+  - (C) 2013-2015 Frédéric Mantegazza
+
+This program is free software; you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation; either version 2 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program; if not, write to the Free Software
+Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+
+or see:
+
+ - U{http://www.gnu.org/licenses/gpl.html}
+
+Module purpose
+==============
+
+Bounded worker pool
+
+Implements
+==========
+
+ - B{WorkerPool}
+ - B{WorkerPoolValueError}
+
+Documentation
+=============
+
+Fixed size thread pool, with a bounded queue of pending jobs. Workers are started on first submission, and can be
+restarted after a shutdown.
+
+When the queue is full, the overflow policy applies:
+ - B{dropOldest}: the oldest pending job is dropped;
+ - B{coalesce}: a job with the same key as a pending job replaces its arguments (the latest wins, the pending job
+   keeps its place); otherwise, the oldest pending job is dropped;
+ - B{block}: the caller waits for a free place.
+
+Each job may have an owner; the number of jobs of the same owner running at the same time can be limited.
+
+Usage
+=====
+
+>>> pool = WorkerPool(size=2, maxPending=16, overflow="coalesce", maxPerOwner=1)
+>>> pool.submit(func, (1, 2), owner=fb, key=("dp_01", func))
+>>> pool.shutdown()
+
+@author: Frédéric Mantegazza
+@copyright: (C) 2013-2015 Frédéric Mantegazza
+@license: GPL
+"""
+
+__revision__ = "$Id$"
+
+import collections
+import threading
+import time
+
+from pknyx.common.exception import PKNyXValueError
+from pknyx.services.logger import Logger
+
+
+class WorkerPoolValueError(PKNyXValueError):
+    """
+    """
+
+
+class WorkerPool(object):
+    """ WorkerPool class
+
+    @ivar _pending: pending jobs, as [owner, key, func, args]
+    @type _pending: L{deque<collections>} of list
+
+    @ivar _keys: pending jobs, by key (coalesce policy only)
+    @type _keys: dict
+
+    @ivar _running: number of running jobs, by owner
+    @type _running: dict
+
+    @ivar _condition: condition protecting the queue, and used to wake up workers and blocked callers
+    @type _condition: L{Condition<threading>}
+
+    @ivar _workers: worker threads
+    @type _workers: list of L{Thread<threading>}
+
+    @ivar _generation: incremented on each shutdown; workers of a previous generation end after their current job,
+                       even if they could not be joined in time
+    @type _generation: int
+
+    @ivar _local: thread local data, telling if the current thread is a worker of this pool
+    @type _local: L{local<threading>}
+    """
+    OVERFLOW_POLICIES = ("dropOldest", "coalesce", "block")
+
+    def __init__(self, size=4, maxPending=64, overflow="dropOldest", maxPerOwner=None, name="Worker"):
+        """
+
+        @param size: number of worker threads
+        @type size: int
+
+        @param maxPending: max number of pending jobs
+        @type maxPending: int
+
+        @param overflow: overflow policy, in ("dropOldest", "coalesce", "block")
+        @type overflow: str
+
+        @param maxPerOwner: max number of running jobs of the same owner (None for no limit)
+        @type maxPerOwner: int
+
+        @param name: name of the worker threads
+        @type name: str
+
+        raise WorkerPoolValueError:
+        """
+        super(WorkerPool, self).__init__()
+
+        self._logger = Logger()
+
+        if size < 1:
+            raise WorkerPoolValueError("invalid size (%r)" % size)
+        if maxPending < 1:
+            raise WorkerPoolValueError("invalid max pending (%r)" % maxPending)
+        if overflow not in WorkerPool.OVERFLOW_POLICIES:
+            raise WorkerPoolValueError("invalid overflow policy (%r)" % overflow)
+        if maxPerOwner is not None and maxPerOwner < 1:
+            raise WorkerPoolValueError("invalid max per owner (%r)" % maxPerOwner)
+
+        self._size = size
+        self._maxPending = maxPending
+        self._overflow = overflow
+        self._maxPerOwner = maxPerOwner
+        self._name = name
+
+        self._pending = collections.deque()
+        self._keys = {}
+        self._running = {}
+        self._dropped = 0
+        self._condition = threading.Condition()
+        self._workers = []
+        self._stopping = False
+        self._generation = 0
+        self._local = threading.local()
+
+    @property
+    def size(self):
+        return self._size
+
+    @property
+    def maxPending(self):
+        return self._maxPending
+
+    @property
+    def overflow(self):
+        return self._overflow
+
+    @property
+    def maxPerOwner(self):
+        return self._maxPerOwner
+
+    @property
+    def pending(self):
+        return len(self._pending)
+
+    @property
+    def dropped(self):
+        return self._dropped
+
+    def _popPending(self, index=0):
+        """ Remove a pending job
+
+        Must be called with the condition acquired.
+
+        @param index: index of the job in the queue
+        @type index: int
+
+        @return: job
+        @rtype: list
+        """
+        job = self._pending[index]
+        del self._pending[index]
+        if job[1] is not None:
+            self._keys.pop(job[1], None)
+
+        return job
+
+    def _next(self):
+        """ Get the next job which can be run
+
+        Must be called with the condition acquired.
+
+        @return: job, or None if no job can be run
+        @rtype: list
+        """
+        if self._maxPerOwner is None:
+            if self._pending:
+                return self._popPending()
+        else:
+            for index, job in enumerate(self._pending):
+                if self._running.get(job[0], 0) < self._maxPerOwner:
+                    return self._popPending(index)
+
+        return None
+
+    def _run(self, generation):
+        """ Worker main loop
+
+        @param generation: pool generation the worker belongs to
+        @type generation: int
+        """
+        self._local.worker = True
+        while True:
+            with self._condition:
+                if generation != self._generation:
+                    return
+                job = self._next()
+                while job is None:
+                    if self._stopping or generation != self._generation:
+                        return
+                    self._condition.wait()
+                    job = self._next()
+                owner, key, func, args = job
+                self._running[owner] = self._running.get(owner, 0) + 1
+                self._condition.notify_all()
+
+            try:
+                func(*args)
+            except:
+                self._logger.exception("WorkerPool._run()")
+            finally:
+                with self._condition:
+                    count = self._running[owner] - 1
+                    if count:
+                        self._running[owner] = count
+                    else:
+                        del self._running[owner]
+                    self._condition.notify_all()
+
+    def submit(self, func, args=(), owner=None, key=None):
+        """ Submit a job
+
+        @param func: function to call
+        @type func: callable
+
+        @param args: function arguments
+        @type args: tuple
+
+        @param owner: owner of the job (used by the max per owner limit)
+        @type owner: hashable
+
+        @param key: key of the job (used by the coalesce policy)
+        @type key: hashable
+        """
+        with self._condition:
+            if self._stopping:
+                self._logger.debug("WorkerPool.submit(): pool is stopping; job %r dropped", func)
+                return
+
+            if self._overflow == "coalesce" and key is not None:
+                job = self._keys.get(key)
+                if job is not None:
+                    job[3] = args
+                    return
+
+            while len(self._pending) >= self._maxPending:
+                if self._overflow == "block":
+                    generation = self._generation
+                    self._condition.wait()
+
+                    # The queue has been cleared by a shutdown meanwhile
+                    if self._stopping or generation != self._generation:
+                        self._logger.debug("WorkerPool.submit(): pool has been stopped; job %r dropped", func)
+                        return
+                else:
+                    job = self._popPending()
+                    self._dropped += 1
+                    self._logger.warning("WorkerPool.submit(): queue full; job %r dropped", job[2])
+
+            job = [owner, key, func, args]
+            self._pending.append(job)
+            if self._overflow == "coalesce" and key is not None:
+                self._keys[key] = job
+
+            if not self._workers:
+                for i in xrange(self._size):
+                    worker = threading.Thread(target=self._run, args=(self._generation,),
+                                              name="%s %d" % (self._name, i + 1))
+                    worker.setDaemon(True)
+                    worker.start()
+                    self._workers.append(worker)
+
+            self._condition.notify_all()
+
+    def cancel(self, owner, timeout=None):
+        """ Drop pending jobs of an owner, and wait for its running jobs to end
+
+        @param owner: owner of the jobs
+        @type owner: hashable
+
+        @param timeout: max time to wait for running jobs, in s (None to wait until they end)
+        @type timeout: float
+
+        @return: True if no job of the owner is still running
+        @rtype: bool
+        """
+        with self._condition:
+            for index in reversed(xrange(len(self._pending))):
+                if self._pending[index][0] == owner:
+                    self._popPending(index)
+            self._condition.notify_all()
+
+            # Don't wait for ourself (even from a worker of a previous generation)
+            if getattr(self._local, "worker", False):
+                return False
+
+            if timeout is not None:
+                endTime = time.time() + timeout
+            while owner in self._running:
+                if timeout is None:
+                    self._condition.wait()
+                else:
+                    remaining = endTime - time.time()
+                    if remaining <= 0.:
+                        return False
+                    self._condition.wait(remaining)
+
+            return True
+
+    def shutdown(self, timeout=None):
+        """ Drop all pending jobs, and stop the workers
+
+        The pool is restarted on next submission. Workers still running a job after timeout are not waited for,
+        but end with their job.
+
+        @param timeout: max time to wait for each worker, in s (None to wait until they end)
+        @type timeout: float
+        """
+        with self._condition:
+            self._pending.clear()
+            self._keys.clear()
+            self._stopping = True
+            self._generation += 1
+            self._condition.notify_all()
+            workers = self._workers
+
+        for worker in workers:
+            if worker is not threading.current_thread():
+                worker.join(timeout)
+
+        with self._condition:
+            self._workers = []
+            self._stopping = False
+
+
+if __name__ == '__main__':
+    import unittest
+
+    # Mute logger
+    Logger().setLevel('error')
+
+
+    class WorkerPoolTestCase(unittest.TestCase):
+
+        def setUp(self):
+            self.calls = []
+            self.gate = threading.Event()
+
+        def tearDown(self):
+            self.gate.set()
+
+        def _job(self, *args):
+            self.gate.wait(1.)
+            self.calls.append((threading.current_thread().name, args))
+
+        def _waitCalls(self, count):
+            for i in xrange(100):
+                if len(self.calls) >= count:
+                    return True
+                time.sleep(0.01)
+            return False
+
+        def test_constructor(self):
+            with self.assertRaises(WorkerPoolValueError):
+                WorkerPool(size=0)
+            with self.assertRaises(WorkerPoolValueError):
+                WorkerPool(maxPending=0)
+            with self.assertRaises(WorkerPoolValueError):
+                WorkerPool(overflow="dummy")
+            with self.assertRaises(WorkerPoolValueError):
+                WorkerPool(maxPerOwner=0)
+
+        def test_submit(self):
+            pool = WorkerPool(size=2)
+            self.gate.set()
+            for i in xrange(10):
+                pool.submit(self._job, (i,))
+            self.assertTrue(self._waitCalls(10))
+            self.assertEqual(sorted([args for name, args in self.calls]), [(i,) for i in xrange(10)])
+            self.assertEqual(len(pool._workers), 2)
+            pool.shutdown()
+            self.assertEqual(pool._workers, [])
+
+        def test_dropOldest(self):
+            pool = WorkerPool(size=1, maxPending=2)
+            pool.submit(self._job, (0,))
+            time.sleep(0.05)  # job 0 is running
+            for i in xrange(1, 5):
+                pool.submit(self._job, (i,))
+            self.assertEqual(pool.pending, 2)
+            self.assertEqual(pool.dropped, 2)
+            self.gate.set()
+            self.assertTrue(self._waitCalls(3))
+            self.assertEqual([args for name, args in self.calls], [(0,), (3,), (4,)])
+            pool.shutdown()
+
+        def test_coalesce(self):
+            pool = WorkerPool(size=1, overflow="coalesce")
+            pool.submit(self._job, (0,), key="a")
+            time.sleep(0.05)  # job 0 is running
+            pool.submit(self._job, (1,), key="a")
+            pool.submit(self._job, (2,), key="b")
+            pool.submit(self._job, (3,), key="a")
+            self.assertEqual(pool.pending, 2)
+            self.gate.set()
+            self.assertTrue(self._waitCalls(3))
+            self.assertEqual([args for name, args in self.calls], [(0,), (3,), (2,)])
+            pool.shutdown()
+
+        def test_block(self):
+            pool = WorkerPool(size=1, maxPending=1, overflow="block")
+            pool.submit(self._job, (0,))
+            time.sleep(0.05)  # job 0 is running
+            pool.submit(self._job, (1,))
+            threading.Timer(0.1, self.gate.set).start()
+            startTime = time.time()
+            pool.submit(self._job, (2,))
+            self.assertGreaterEqual(time.time() - startTime, 0.05)
+            self.assertTrue(self._waitCalls(3))
+            self.assertEqual(pool.dropped, 0)
+            pool.shutdown()
+
+        def test_maxPerOwner(self):
+            pool = WorkerPool(size=3, maxPerOwner=1)
+            for i in xrange(3):
+                pool.submit(self._job, (i,), owner="a")
+            pool.submit(self._job, (3,), owner="b")
+            time.sleep(0.05)
+            self.assertEqual(pool._running, {"a": 1, "b": 1})
+            self.gate.set()
+            self.assertTrue(self._waitCalls(4))
+            pool.shutdown()
+
+        def test_cancel(self):
+            pool = WorkerPool(size=1)
+            pool.submit(self._job, (0,), owner="a")
+            time.sleep(0.05)  # job 0 is running
+            pool.submit(self._job, (1,), owner="a")
+            pool.submit(self._job, (2,), owner="b")
+            self.assertFalse(pool.cancel("a", timeout=0.05))
+            self.assertEqual(pool.pending, 1)
+            self.gate.set()
+            self.assertTrue(pool.cancel("a"))
+            self.assertTrue(self._waitCalls(2))
+            self.assertEqual([args for name, args in self.calls], [(0,), (2,)])
+            pool.shutdown()
+
+        def test_shutdown(self):
+            pool = WorkerPool(size=1)
+            self.gate.set()
+            pool.shutdown()
+            pool.submit(self._job, (0,))
+            self.assertTrue(self._waitCalls(1))
+            pool.shutdown()
+            self.assertEqual(pool._workers, [])
+
+        def test_shutdownTimeout(self):
+            pool = WorkerPool(size=2, name="Worker test")
+            pool.submit(self._job, (0,))
+            time.sleep(0.05)  # job 0 is running
+            pool.shutdown(0.05)
+            self.gate.set()
+            pool.submit(self._job, (1,))
+            self.assertTrue(self._waitCalls(2))
+            time.sleep(0.05)
+            self.assertEqual(len([thread for thread in threading.enumerate() if thread.name.startswith("Worker test")]), 2)
+            pool.shutdown()
+
+        def test_blockShutdown(self):
+            pool = WorkerPool(size=1, maxPending=1, overflow="block")
+            pool.submit(self._job, (0,))
+            time.sleep(0.05)  # job 0 is running
+            pool.submit(self._job, (1,))
+            blocked = threading.Thread(target=pool.submit, args=(self._job, (2,)))
+            blocked.start()
+            time.sleep(0.05)
+            threading.Timer(0.05, self.gate.set).start()
+            pool.shutdown()
+            blocked.join(1.)
+            self.assertFalse(blocked.is_alive())
+            self.assertEqual(pool.pending, 0)
+            self.assertEqual([args for name, args in self.calls], [(0,)])
+
+
+    unittest.main()
@@ -101,8 +101,8 @@ class CEMILData(CEMI):
     def __init__(self, frame=None):
         """ Create a new cEMI L-Data message
 
-        @param frame: raw frame
-        @type frame: str or bytearray
+        @param frame: raw frame (copied)
+        @type frame: str, bytearray or memoryview
         """
         super(CEMILData, self).__init__()
 
@@ -306,6 +306,10 @@ class CEMILData(CEMI):
     def npdu(self, npdu):
         self._frame.npdu = npdu
 
+    @property
+    def nsdu(self):
+        return self._frame.nsdu
+
     @property
     def l(self):
         #return self._frame.l
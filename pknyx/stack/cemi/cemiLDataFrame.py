@@ -95,8 +95,8 @@ class CEMILDataFrame(object):
     def __init__(self, frame=None, addIL=0):
         """ Init frame
 
-        @param frame: raw frame
-        @type frame: str or bytearray
+        @param frame: raw frame (copied)
+        @type frame: str, bytearray or memoryview
 
         @param addIL: additional info length
         @type addIL: int
@@ -235,6 +235,12 @@ class CEMILDataFrame(object):
     def npdu(self, npdu):
         self._raw[8+self.addIL:] = npdu
 
+    @property
+    def nsdu(self):
+        """ NPDU without its length byte, extracted with a single copy
+        """
+        return self._raw[9+self.addIL:]
+
     #@property
     #def l(self):
         #return self._raw[8]
@@ -360,4 +366,16 @@ if __name__ == '__main__':
             self.assertEqual(self.frame2.npdu, '\x01\x00\x80')
             self.assertEqual(self.frame3.npdu, '\x03\x00\x80\x19,')
 
+        def test_nsdu(self):
+            self.assertEqual(self.frame2.nsdu, '\x00\x80')
+            self.assertEqual(self.frame3.nsdu, '\x00\x80\x19,')
+            self.assertEqual(self.frame5.nsdu, '\x00\x80\x19,')
+
+        def test_memoryview(self):
+            buffer = bytearray("\x06\x10\x05\x30\x00\x11)\x00\xbc\xd0\x11\x0e\x19\x02\x01\x00\x80")
+            frame = CEMILDataFrame(memoryview(buffer)[6:])
+            buffer[6] = 0
+            self.assertEqual(frame.mc, 0x29)
+            self.assertEqual(frame.da, 6402)
+
     unittest.main()
@@ -0,0 +1,193 @@
+# -*- coding: utf-8 -*-
+
+""" Python KNX framework
+
+License
+=======
+
+ - B{pKNyX} (U{http://www.pknyx.org}) is Copyright:
+  - (C) 2013-2015 Frédéric Mantegazza
+
+This program is free software; you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation; either version 2 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program; if not, write to the Free Software
+Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+
+or see:
+
+ - U{http://www.gnu.org/licenses/gpl.html}
+
+Module purpose
+==============
+
+cEMI message management
+
+Implements
+==========
+
+ - B{CEMILDataTelegram}
+
+Documentation
+=============
+
+Incoming cEMI L_Data frames are decoded in a single pass, using one precompiled struct, into an immutable
+telegram record. All fields are decoded once, and the record is passed along the stack layers.
+
+Only standard frames without additional informations are supported, as for L{CEMILData}.
+
+Usage
+=====
+
+>>> from cemiLDataTelegram import CEMILDataTelegram
+>>> t = CEMILDataTelegram.decode(")\x00\xbc\xd0\x11\x0e\x19\x02\x01\x00\x80")
+>>> t.sourceAddress
+<IndividualAddress('1.1.14')>
+>>> t.destinationAddress
+<GroupAddress('3/1/2')>
+>>> t.priority
+<Priority('low')>
+>>> t.nsdu
+bytearray(b'\x00\x80')
+
+@author: Frédéric Mantegazza
+@copyright: (C) 2013-2015 Frédéric Mantegazza
+@license: GPL
+"""
+
+__revision__ = "$Id$"
+
+import collections
+import struct
+
+from pknyx.services.logger import Logger
+from pknyx.stack.cemi.cemi import CEMIValueError
+from pknyx.stack.cemi.cemiLData import CEMILData
+from pknyx.stack.individualAddress import IndividualAddress
+from pknyx.stack.groupAddress import GroupAddress
+from pknyx.stack.priority import Priority
+
+
+class CEMILDataTelegram(collections.namedtuple("CEMILDataTelegram",
+                                               "messageCode priority hopCount sourceAddress destinationAddress nsdu")):
+    """ Decoded cEMI L_Data message
+
+    @ivar messageCode: cEMI message code
+    @type messageCode: int
+
+    @ivar priority: message priority
+    @type priority: L{Priority}
+
+    @ivar hopCount: routing hop count
+    @type hopCount: int
+
+    @ivar sourceAddress: source address
+    @type sourceAddress: L{IndividualAddress}
+
+    @ivar destinationAddress: destination address
+    @type destinationAddress: L{GroupAddress} or L{IndividualAddress}
+
+    @ivar nsdu: NPDU without its length byte
+    @type nsdu: bytearray
+    """
+    __slots__ = ()
+
+    # mc, addIL, ctrl1, ctrl2, sa, da, npdu length
+    HEADER_STRUCT = struct.Struct(">BBBBHHB")
+
+    PRIORITIES = tuple([Priority(level) for level in xrange(4)])
+
+    @classmethod
+    def decode(cls, frame):
+        """ Decode a raw cEMI L_Data frame
+
+        @param frame: raw frame
+        @type frame: str, bytearray or memoryview
+
+        @return: decoded telegram
+        @rtype: L{CEMILDataTelegram}
+
+        raise CEMIValueError:
+        """
+        if len(frame) < cls.HEADER_STRUCT.size:
+            raise CEMIValueError("data too short (%d)" % len(frame))
+
+        mc, addIL, ctrl1, ctrl2, sa, da, length = cls.HEADER_STRUCT.unpack_from(frame)
+        if mc not in CEMILData.MESSAGE_CODES:
+            raise CEMIValueError("invalid Message Code (%d)" % mc)
+        elif addIL:
+            raise CEMIValueError("Additional Informations not supported")
+        elif not ctrl1 & 0x80:
+            raise CEMIValueError("only standard frame supported")
+
+        if ctrl2 & 0x80:
+            destinationAddress = GroupAddress(da)
+        else:
+            destinationAddress = IndividualAddress(da)
+
+        return cls(mc, cls.PRIORITIES[(ctrl1 >> 2) & 0x03], (ctrl2 >> 4) & 0x07,
+                   IndividualAddress(sa), destinationAddress, bytearray(frame[cls.HEADER_STRUCT.size:]))
+
+
+if __name__ == '__main__':
+    import unittest
+
+    # Mute logger
+    Logger().setLevel('error')
+
+
+    class CEMILDataTelegramTestCase(unittest.TestCase):
+
+        def setUp(self):
+            self.telegram = CEMILDataTelegram.decode(")\x00\xbc\xd0\x11\x0e\x19\x02\x01\x00\x80")
+
+        def tearDown(self):
+            pass
+
+        def test_constructor(self):
+            with self.assertRaises(CEMIValueError):
+                CEMILDataTelegram.decode(bytearray(5))  # frame too short
+            with self.assertRaises(CEMIValueError):
+                CEMILDataTelegram.decode("\x00\x00\xbc\xd0\x11\x0e\x19\x02\x01\x00\x80")  # message code
+            with self.assertRaises(CEMIValueError):
+                CEMILDataTelegram.decode(")\x01\xff\xbc\xd0\x11\x0e\x19\x02\x01\x00\x80")  # additional infos
+            with self.assertRaises(CEMIValueError):
+                CEMILDataTelegram.decode(")\x00\x3c\xd0\x11\x0e\x19\x02\x01\x00\x80")  # extended frame
+
+        def test_fields(self):
+            self.assertEqual(self.telegram.messageCode, CEMILData.MC_LDATA_IND)
+            self.assertEqual(self.telegram.priority.level, 0x03)
+            self.assertEqual(self.telegram.hopCount, 5)
+            self.assertEqual(self.telegram.sourceAddress, IndividualAddress("1.1.14"))
+            self.assertIsInstance(self.telegram.destinationAddress, GroupAddress)
+            self.assertEqual(self.telegram.destinationAddress, GroupAddress("3/1/2"))
+            self.assertEqual(self.telegram.nsdu, "\x00\x80")
+
+        def test_cEMI(self):
+            cEMI = CEMILData(")\x00\xbc\xd0\x11\x0e\x19\x02\x01\x00\x80")
+            self.assertEqual(self.telegram.priority.level, cEMI.priority.level)
+            self.assertEqual(self.telegram.hopCount, cEMI.hopCount)
+            self.assertEqual(self.telegram.sourceAddress, cEMI.sourceAddress)
+            self.assertEqual(self.telegram.destinationAddress, cEMI.destinationAddress)
+            self.assertEqual(self.telegram.nsdu, cEMI.nsdu)
+
+        def test_memoryview(self):
+            buffer = bytearray("\x06\x10\x05\x30\x00\x11)\x00\xbc\xd0\x11\x0e\x19\x02\x01\x00\x80")
+            telegram = CEMILDataTelegram.decode(memoryview(buffer)[6:])
+            buffer[-1] = 0
+            self.assertEqual(telegram.nsdu, "\x00\x80")
+
+        def test_immutable(self):
+            with self.assertRaises(AttributeError):
+                self.telegram.hopCount = 6
+
+
+    unittest.main()
@@ -0,0 +1,442 @@
+# -*- coding: utf-8 -*-
+
+""" Python KNX framework
+
+License
+=======
+
+ - B{pKNyX} (U{http://www.pknyx.org}) is Copyright:
+  - (C) 2013-2015 Frédéric Mantegazza
+
+This program is free software; you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation; either version 2 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program; if not, write to the Free Software
+Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+
+or see:
+
+ - U{http://www.gnu.org/licenses/gpl.html}
+
+Module purpose
+==============
+
+Stack engine
+
+Implements
+==========
+
+ - B{EventLoop}
+ - B{EventLoopValueError}
+
+Documentation
+=============
+
+Single thread, select-based, event loop. It can run the lower layers (L_DataService and transceivers) of any
+number of L{Stack<pknyx.stack.stack>}s, instead of the default thread-per-layer model (one L_DataService
+thread, plus one receiver and one transmitter thread, for each stack).
+
+In loop mode:
+ - the transceiver sockets are watched by the loop, and incoming frames are decoded in the loop thread;
+ - incoming frames are still queued by priority, and dispatched to the upper layers in the loop thread;
+ - pending transmissions are sent by the loop, as soon as they are queued.
+
+Callbacks run in the loop thread, so they must not block. Transmissions requested from the loop thread (for
+example from a GroupObject callback) are sent immediately if the traffic shaper allows it, later otherwise; they
+are never waited for, as only the loop can send delayed frames.
+
+Usage
+=====
+
+>>> loop = EventLoop()
+>>> stack1 = Stack("1.1.1", eventLoop=loop)
+>>> stack2 = Stack("1.1.2", eventLoop=loop)
+>>> stack1.start()  # also starts the loop
+>>> stack2.start()
+
+@author: Frédéric Mantegazza
+@copyright: (C) 2013-2015 Frédéric Mantegazza
+@license: GPL
+"""
+
+__revision__ = "$Id$"
+
+import collections
+import errno
+import heapq
+import itertools
+import os
+import select
+import threading
+import time
+
+from pknyx.common.exception import PKNyXValueError
+from pknyx.services.logger import Logger
+
+
+class EventLoopValueError(PKNyXValueError):
+    """
+    """
+
+
+class EventLoop(object):
+    """ EventLoop class
+
+    @ivar _readers: watched file objects, with their callback, by file descriptor
+    @type _readers: dict of int: (file object, callable)
+
+    @ivar _ready: callbacks to run as soon as possible, with their arguments
+    @type _ready: L{deque<collections>} of (callable, tuple)
+
+    @ivar _timers: delayed callbacks (heap of (time, sequence, callable, args))
+    @type _timers: list
+
+    @ivar _lock: lock protecting ready callbacks and timers
+    @type _lock: L{Lock<threading>}
+
+    @ivar _wakeupReader: read end of the pipe used to wake up the loop (None when the loop is not running)
+    @type _wakeupReader: int
+
+    @ivar _wakeupWriter: write end of the pipe used to wake up the loop (None when the loop is not running)
+    @type _wakeupWriter: int
+
+    @ivar _thread: loop thread
+    @type _thread: L{Thread<threading>}
+    """
+    def __init__(self, name="Event loop", daemon=False):
+        """
+
+        @param name: name of the loop thread
+        @type name: str
+
+        @param daemon: if True, the loop thread does not prevent the process to exit
+        @type daemon: bool
+        """
+        super(EventLoop, self).__init__()
+
+        self._name = name
+        self._daemon = daemon
+
+        self._logger = Logger()
+
+        self._readers = {}
+        self._ready = collections.deque()
+        self._timers = []
+        self._sequence = itertools.count()
+        self._lock = threading.Lock()
+
+        self._wakeupReader = self._wakeupWriter = None
+        self._wakeupPending = False
+
+        self._running = False
+        self._thread = None
+
+    @property
+    def running(self):
+        return self._running
+
+    def inLoop(self):
+        """ Check if the caller runs in the loop thread
+
+        @rtype: bool
+        """
+        return threading.current_thread() is self._thread
+
+    def _openWakeup(self):
+        """ Create the wake up pipe, if needed
+
+        Must be called with the lock acquired.
+        """
+        if self._wakeupReader is None:
+            self._wakeupReader, self._wakeupWriter = os.pipe()
+            self._wakeupPending = False
+
+    def _closeWakeup(self):
+        """ Close the wake up pipe
+
+        Must be called with the lock acquired.
+        """
+        if self._wakeupReader is not None:
+            os.close(self._wakeupReader)
+            os.close(self._wakeupWriter)
+            self._wakeupReader = self._wakeupWriter = None
+            self._wakeupPending = False
+
+    def _wakeup(self):
+        """ Wake up the loop, if it waits in another thread
+
+        The pipe is written with the lock acquired, so it can't be closed (and its fd re-used) meanwhile.
+        """
+        if self.inLoop():
+            return
+
+        with self._lock:
+            if not self._wakeupPending and self._wakeupWriter is not None:
+                self._wakeupPending = True
+                try:
+                    os.write(self._wakeupWriter, '\0')
+                except OSError:
+                    self._logger.exception("EventLoop._wakeup()", debug=True)
+
+    def callSoon(self, callback, *args):
+        """ Run a callback in the loop thread, as soon as possible
+
+        Thread-safe.
+
+        @param callback: function to call
+        @type callback: callable
+        """
+        with self._lock:
+            self._ready.append((callback, args))
+        self._wakeup()
+
+    def callLater(self, delay, callback, *args):
+        """ Run a callback in the loop thread, after the given delay
+
+        Thread-safe.
+
+        @param delay: delay, in s
+        @type delay: float
+
+        @param callback: function to call
+        @type callback: callable
+        """
+        with self._lock:
+            heapq.heappush(self._timers, (time.time() + delay, next(self._sequence), callback, args))
+        self._wakeup()
+
+    def addReader(self, fileObj, callback):
+        """ Watch a file object, and call callback (in the loop thread) each time it is readable
+
+        @param fileObj: object to watch (must have a fileno() method)
+        @type fileObj: socket or file
+
+        @param callback: function to call
+        @type callback: callable
+        """
+        readers = dict(self._readers)
+        readers[fileObj.fileno()] = (fileObj, callback)
+        self._readers = readers
+        self._wakeup()
+
+    def removeReader(self, fileObj):
+        """ Stop watching a file object
+
+        @param fileObj: watched object
+        @type fileObj: socket or file
+        """
+        readers = dict(self._readers)
+        readers.pop(fileObj.fileno(), None)
+        self._readers = readers
+        self._wakeup()
+
+    def _runOnce(self):
+        """ Wait for events, and run all callbacks which are ready
+        """
+        with self._lock:
+            if self._ready:
+                timeout = 0.
+            elif self._timers:
+                timeout = max(0., self._timers[0][0] - time.time())
+            else:
+                timeout = None
+
+        readers = self._readers
+        fds = readers.keys()
+        wakeupReader = self._wakeupReader
+        fds.append(wakeupReader)
+        try:
+            readable = select.select(fds, [], [], timeout)[0]
+        except select.error, (code, msg):
+            if code == errno.EINTR:
+                return
+            raise
+
+        for fd in readable:
+            if fd == wakeupReader:
+                with self._lock:
+                    os.read(wakeupReader, 4096)
+                    self._wakeupPending = False
+                continue
+            try:
+                fileObj, callback = readers[fd]
+                callback()
+            except:
+                self._logger.exception("EventLoop._runOnce()")
+
+        # Only run callbacks which are ready now; new ones will be run on next iteration
+        now = time.time()
+        with self._lock:
+            while self._timers and self._timers[0][0] <= now:
+                dueTime, sequence, callback, args = heapq.heappop(self._timers)
+                self._ready.append((callback, args))
+            count = len(self._ready)
+
+        for i in xrange(count):
+            callback, args = self._ready.popleft()
+            try:
+                callback(*args)
+            except:
+                self._logger.exception("EventLoop._runOnce()")
+
+    def run(self):
+        """ Loop main method
+
+        Blocks until the loop is stopped. The wake up pipe is closed when the loop ends.
+        """
+        self._logger.trace("EventLoop.run()")
+
+        with self._lock:
+            self._openWakeup()
+
+        try:
+            while self._running:
+                self._runOnce()
+        finally:
+            with self._lock:
+
+                # Keep the pipe if the loop has been restarted meanwhile
+                if not self._running:
+                    self._closeWakeup()
+
+        self._logger.trace("EventLoop.run(): ended")
+
+    def start(self):
+        """ Start the loop thread
+
+        Does nothing if the loop is already running. Thread-safe.
+        """
+        self._logger.trace("EventLoop.start()")
+
+        # Let a stopping loop thread end, so that 2 threads never run the loop
+        thread = self._thread
+        if not self._running and thread is not None and thread is not threading.current_thread():
+            thread.join()
+
+        with self._lock:
+            if self._running:
+                return
+
+            self._openWakeup()
+            self._running = True
+            self._thread = threading.Thread(target=self.run, name=self._name)
+            self._thread.setDaemon(self._daemon)
+            self._thread.start()
+
+    def stop(self):
+        """ Stop the loop thread
+        """
+        self._logger.trace("EventLoop.stop()")
+
+        self._running = False
+        with self._lock:
+            self._wakeupPending = False
+        self._wakeup()
+
+    def join(self):
+        """ Wait for the loop thread to end
+        """
+        self._logger.trace("EventLoop.join()")
+
+        if self._thread is not None:
+            self._thread.join()
+
+
+if __name__ == '__main__':
+    import unittest
+    import socket
+
+    # Mute logger
+    Logger().setLevel('error')
+
+
+    class EventLoopTestCase(unittest.TestCase):
+
+        def setUp(self):
+            self.loop = EventLoop()
+            self.loop.start()
+            self.calls = []
+            self.event = threading.Event()
+
+        def tearDown(self):
+            self.loop.stop()
+            self.loop.join()
+
+        def _callback(self, *args):
+            self.calls.append((threading.current_thread(), args))
+            self.event.set()
+
+        def test_constructor(self):
+            self.assertTrue(self.loop.running)
+            self.assertFalse(self.loop.inLoop())
+
+        def test_callSoon(self):
+            self.loop.callSoon(self._callback, 1, 2)
+            self.assertTrue(self.event.wait(1.))
+            self.assertEqual(self.calls, [(self.loop._thread, (1, 2))])
+
+        def test_callLater(self):
+            startTime = time.time()
+            self.loop.callLater(0.05, self._callback, 2)
+            self.loop.callLater(0.01, self._callback, 1)
+            self.loop.callLater(0.05, self.event.set)
+            self.event.wait(1.)
+            self.event.clear()
+            self.event.wait(1.)
+            self.assertGreaterEqual(time.time() - startTime, 0.05)
+            self.assertEqual([args for thread_, args in self.calls], [(1,), (2,)])
+
+        def test_reader(self):
+            sock1, sock2 = socket.socketpair()
+            try:
+                self.loop.addReader(sock1, lambda: self._callback(sock1.recv(16)))
+                sock2.send("abc")
+                self.assertTrue(self.event.wait(1.))
+                self.assertEqual(self.calls[0][1], ("abc",))
+                self.loop.removeReader(sock1)
+            finally:
+                sock1.close()
+                sock2.close()
+
+        def test_stop(self):
+            self.loop.stop()
+            self.loop.join()
+            self.assertFalse(self.loop.running)
+
+        def test_close(self):
+            reader, writer = self.loop._wakeupReader, self.loop._wakeupWriter
+            self.loop.stop()
+            self.loop.join()
+            self.assertIs(self.loop._wakeupReader, None)
+            for fd in (reader, writer):
+                with self.assertRaises(OSError):
+                    os.fstat(fd)
+
+            # Restart
+            self.loop.start()
+            self.loop.callSoon(self._callback)
+            self.assertTrue(self.event.wait(1.))
+
+        def test_startThreads(self):
+            loop = EventLoop(name="Event loop test")
+            threads = [threading.Thread(target=loop.start) for i in xrange(10)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            try:
+                self.assertEqual(len([thread for thread in threading.enumerate() if thread.name == "Event loop test"]), 1)
+            finally:
+                loop.stop()
+                loop.join()
+
+
+    unittest.main()
@@ -39,6 +39,8 @@ Implements
 Documentation
 =============
 
+Group addresses are immutable, and interned: creating a group address returns a shared instance for
+a given (address, outFormatLevel) pair, with its string representation computed once.
 
 Usage
 =====
@@ -63,17 +65,19 @@ GroupAddressValueError: group address out of range
 2
 >>> groupAddr.sub
 3
->>> groupAddr.outFormatLevel = 2
->>> groupAddr.address
+>>> groupAddr2 = GroupAddress("1/2/3", outFormatLevel=2)
+>>> groupAddr2.address
 '1/515'
->>> groupAddr.main
+>>> groupAddr2.main
 1
->>> groupAddr.middle
+>>> groupAddr2.middle
 0
->>> groupAddr.sub
+>>> groupAddr2.sub
 515
->>> groupAddr.outFormatLevel = 4
+>>> groupAddr2 = GroupAddress("1/2/3", outFormatLevel=4)
 GroupAddressValueError: outFormatLevel 4 must be 2 or 3
+>>> GroupAddress(2563) is groupAddr
+True
 >>> groupAddr.frame
 '\n\x03'
 
@@ -99,52 +103,90 @@ class GroupAddress(KnxAddress):
 
     @ivar _outFormatLevel: output format level representation, in (2, 3).
     @type _outFormatLevel: int
-    """
-    def __init__(self, address="0/0/0", outFormatLevel=3):
-        """ Create a group address
 
-        @param address: group address
-        @type address: str or tuple of int
+    @ivar _address: precomputed string representation
+    @type _address: str
+    """
+    __slots__ = ("_outFormatLevel", "_address")
 
-        @param outFormatLevel: output format level representation, in (2, 3)
-                               Note that the format is only used for output; the address can always be entered as
-                               level 2 or level 3, whatever the value of outFormatLevel is.
-        @type outFormatLevel: int
+    _instances = {}
 
-        @raise GroupAddressValueError:
+    def __new__(cls, address="0/0/0", outFormatLevel=3):
+        """ Return the shared group address instance
 
-        @todo: add constructor with simple int
+        Instances are interned by (raw address, outFormatLevel); str and tuple representations are also
+        cached, so they are only parsed once.
         """
-        #Logger().debug("GroupAddress.__init__(): address=%s" % repr(address))
+        try:
+            return cls._instances[(address, outFormatLevel)]
+        except (KeyError, TypeError):
+            pass
 
-        if isinstance(address, str):
-            address = address.strip().split('/')
+        if outFormatLevel not in (2, 3):
+            raise GroupAddressValueError("outFormatLevel %d must be 2 or 3" % outFormatLevel)
+
+        raw = address
+        if isinstance(raw, str):
+            raw = raw.strip().split('/')
             try:
-                address = [int(val) for val in address]
+                raw = [int(val) for val in raw]
             except ValueError:
-                Logger().exception("GroupAddress.__init__()", debug=True)
+                Logger().exception("GroupAddress.__new__()", debug=True)
                 raise GroupAddressValueError("invalid group address")
         try:
-            if len(address) == 2:
-                if not 0 <= address[0] <= 0x1f or not 0 <= address[1] <= 0x7ff:
+            if len(raw) == 2:
+                if not 0 <= raw[0] <= 0x1f or not 0 <= raw[1] <= 0x7ff:
                     raise GroupAddressValueError("group address out of range")
-                address = address[0] << 11 | address[1]
-            elif len(address) == 3:
-                if not 0 <= address[0] <= 0x1f or not 0 <= address[1] <= 0x7 or not 0 <= address[2] <= 0xff:
+                raw = raw[0] << 11 | raw[1]
+            elif len(raw) == 3:
+                if not 0 <= raw[0] <= 0x1f or not 0 <= raw[1] <= 0x7 or not 0 <= raw[2] <= 0xff:
                     raise GroupAddressValueError("group address out of range")
-                address = address[0] << 11 | address[1] << 8 | address[2]
+                raw = raw[0] << 11 | raw[1] << 8 | raw[2]
             else:
                 raise GroupAddressValueError("invalid group address")
         except TypeError:
-            if not isinstance(address, int):
-                Logger().exception("GroupAddress.__init__()", debug=True)
+            if not isinstance(raw, int):
+                Logger().exception("GroupAddress.__new__()", debug=True)
                 raise GroupAddressValueError("invalid group address")
 
-        if outFormatLevel not in (2, 3):
-            raise GroupAddressValueError("outFormatLevel %d must be 2 or 3" % outFormatLevel)
-        self._outFormatLevel = outFormatLevel
+        try:
+            self = cls._instances[(raw, outFormatLevel)]
+        except KeyError:
+            self = super(GroupAddress, cls).__new__(cls)
+            KnxAddress.__init__(self, raw)
+            self._outFormatLevel = outFormatLevel
+            self._address = self._format()
+            cls._instances[(raw, outFormatLevel)] = self
+
+        if isinstance(address, (str, tuple)):
+            cls._instances[(address, outFormatLevel)] = self
 
-        super(GroupAddress, self).__init__(address)
+        return self
+
+    def __init__(self, address="0/0/0", outFormatLevel=3):
+        """ Create a group address
+
+        Nothing to do here: the shared instance is built by L{__new__}.
+
+        @param address: group address
+        @type address: str, tuple of int or int (raw)
+
+        @param outFormatLevel: output format level representation, in (2, 3)
+                               Note that the format is only used for output; the address can always be entered as
+                               level 2 or level 3, whatever the value of outFormatLevel is.
+        @type outFormatLevel: int
+
+        @raise GroupAddressValueError:
+        """
+
+    def __reduce__(self):
+        return (GroupAddress, (self._raw, self._outFormatLevel))
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
 
     def __repr__(self):
         return "<GroupAddress('%s')>" % self.address
@@ -152,8 +194,9 @@ class GroupAddress(KnxAddress):
     def __str__(self):
         return self.address
 
-    @property
-    def address(self):
+    def _format(self):
+        """ Build the string representation of the address
+        """
         address = []
         address.append("%d" % self.main)
         if self._outFormatLevel == 3:
@@ -162,6 +205,10 @@ class GroupAddress(KnxAddress):
 
         return '/'.join(address)
 
+    @property
+    def address(self):
+        return self._address
+
     @property
     def main(self):
         return self._raw >> 11 & 0x1f
@@ -184,14 +231,10 @@ class GroupAddress(KnxAddress):
     def outFormatLevel(self):
         return self._outFormatLevel
 
-    @outFormatLevel.setter
-    def outFormatLevel(self, level):
-        if level not in (2, 3):
-            raise GroupAddressValueError("outFormatLevel %d must be 2 or 3" % level)
-        self._outFormatLevel = level
-
 
 if __name__ == '__main__':
+    import copy
+    import pickle
     import unittest
 
     # Mute logger
@@ -207,6 +250,10 @@ if __name__ == '__main__':
             self.ad3 = GroupAddress((1, 2, 3))
             self.ad4 = GroupAddress((1, 2))
             self.ad5 = GroupAddress(4321)
+            self.ad6 = GroupAddress("1/2/3", outFormatLevel=2)
+            self.ad7 = GroupAddress("1/2", outFormatLevel=2)
+            self.ad8 = GroupAddress((1, 2, 3), outFormatLevel=2)
+            self.ad9 = GroupAddress((1, 2), outFormatLevel=2)
 
         def tearDown(self):
             pass
@@ -278,14 +325,10 @@ if __name__ == '__main__':
             self.assertEqual(self.ad4.address, "1/0/2")
 
         def test_address2(self):
-            self.ad1.outFormatLevel = 2
-            self.ad2.outFormatLevel = 2
-            self.ad3.outFormatLevel = 2
-            self.ad4.outFormatLevel = 2
-            self.assertEqual(self.ad1.address, "1/515")
-            self.assertEqual(self.ad2.address, "1/2")
-            self.assertEqual(self.ad3.address, "1/515")
-            self.assertEqual(self.ad4.address, "1/2")
+            self.assertEqual(self.ad6.address, "1/515")
+            self.assertEqual(self.ad7.address, "1/2")
+            self.assertEqual(self.ad8.address, "1/515")
+            self.assertEqual(self.ad9.address, "1/2")
 
         def test_main(self):
             self.assertEqual(self.ad1.main, 1)
@@ -300,14 +343,10 @@ if __name__ == '__main__':
             self.assertEqual(self.ad4.middle, 0)
 
         def test_middle2(self):
-            self.ad1.outFormatLevel = 2
-            self.ad2.outFormatLevel = 2
-            self.ad3.outFormatLevel = 2
-            self.ad4.outFormatLevel = 2
-            self.assertEqual(self.ad1.middle, 0)
-            self.assertEqual(self.ad2.middle, 0)
-            self.assertEqual(self.ad3.middle, 0)
-            self.assertEqual(self.ad4.middle, 0)
+            self.assertEqual(self.ad6.middle, 0)
+            self.assertEqual(self.ad7.middle, 0)
+            self.assertEqual(self.ad8.middle, 0)
+            self.assertEqual(self.ad9.middle, 0)
 
         def test_sub3(self):
             self.assertEqual(self.ad1.sub, 3)
@@ -316,21 +355,32 @@ if __name__ == '__main__':
             self.assertEqual(self.ad4.sub, 2)
 
         def test_sub2(self):
-            self.ad1.outFormatLevel = 2
-            self.ad2.outFormatLevel = 2
-            self.ad3.outFormatLevel = 2
-            self.ad4.outFormatLevel = 2
-            self.assertEqual(self.ad1.sub, 515)
-            self.assertEqual(self.ad2.sub, 2)
-            self.assertEqual(self.ad3.sub, 515)
-            self.assertEqual(self.ad4.sub, 2)
+            self.assertEqual(self.ad6.sub, 515)
+            self.assertEqual(self.ad7.sub, 2)
+            self.assertEqual(self.ad8.sub, 515)
+            self.assertEqual(self.ad9.sub, 2)
 
         def test_outFormatLevel(self):
             self.assertEqual(self.ad1.outFormatLevel, 3)
+            self.assertEqual(self.ad6.outFormatLevel, 2)
             with self.assertRaises(GroupAddressValueError):
-                self.ad1.outFormatLevel = 1
+                GroupAddress("1/2/3", outFormatLevel=1)
             with self.assertRaises(GroupAddressValueError):
-                self.ad1.outFormatLevel = 4
+                GroupAddress("1/2/3", outFormatLevel=4)
+            with self.assertRaises(AttributeError):
+                self.ad1.outFormatLevel = 2
+
+        def test_interning(self):
+            self.assertIs(self.ad1, self.ad3)
+            self.assertIs(self.ad1, GroupAddress(2563))
+            self.assertIs(self.ad6, self.ad8)
+            self.assertIsNot(self.ad1, self.ad6)
+            self.assertEqual(self.ad1, self.ad6)
+            self.assertEqual(hash(self.ad1), hash(self.ad6))
+            self.assertIs(copy.deepcopy(self.ad1), self.ad1)
+            self.assertIs(pickle.loads(pickle.dumps(self.ad6)), self.ad6)
+            with self.assertRaises(AttributeError):
+                self.ad1.foo = 1
 
 
     unittest.main()
@@ -0,0 +1,311 @@
+# -*- coding: utf-8 -*-
+
+""" Python KNX framework
+
+License
+=======
+
+ - B{pKNyX} (U{http://www.pknyx.org}) is Copyright:
+  - (C) 2013-2015 Frédéric Mantegazza
+
+This program is free software; you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation; either version 2 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program; if not, write to the Free Software
+Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+
+or see:
+
+ - U{http://www.gnu.org/licenses/gpl.html}
+
+Module purpose
+==============
+
+Group data service management
+
+Implements
+==========
+
+ - B{GroupValue}
+ - B{GroupValueCache}
+ - B{GroupValueCacheValueError}
+
+Documentation
+=============
+
+Last known value of group addresses, as seen by the stack: the L{A_GroupDataService<pknyx.stack.layer7.a_groupDataService>}
+stores the raw frame, source and timestamp of each GroupValue_Write and GroupValue_Response, received from the bus
+or sent by the stack itself (source is None for local telegrams).
+
+Local reads (L{Group.readValue()<pknyx.core.group>}, pknyx-group tool) can accept a cached value not older than a
+given max age, instead of doing a bus round trip.
+
+Usage
+=====
+
+>>> cache = GroupValueCache()
+>>> cache.update(GroupAddress("1/1/1"), IndividualAddress("1.1.1"), bytearray("\\x01"))
+>>> cache.get(GroupAddress("1/1/1"), maxAge=10.)
+<GroupValue(src='1.1.1', data=bytearray(b'\\x01'), age=0.00s)>
+
+@author: Frédéric Mantegazza
+@copyright: (C) 2013-2015 Frédéric Mantegazza
+@license: GPL
+"""
+
+__revision__ = "$Id$"
+
+import threading
+import time
+
+from pknyx.common.exception import PKNyXValueError
+from pknyx.services.logger import Logger
+from pknyx.stack.groupAddress import GroupAddress
+
+
+class GroupValueCacheValueError(PKNyXValueError):
+    """
+    """
+
+
+class GroupValue(object):
+    """ GroupValue class
+
+    Cached value of a group address (immutable).
+    """
+    __slots__ = ("_src", "_data", "_time")
+
+    def __init__(self, src, data, time_):
+        """
+
+        @param src: source of the telegram (None for local telegrams)
+        @type src: L{IndividualAddress<pknyx.stack.individualAddress>}
+
+        @param data: raw frame
+        @type data: bytearray
+
+        @param time_: time the value has been seen
+        @type time_: float
+        """
+        super(GroupValue, self).__init__()
+
+        self._src = src
+        self._data = data
+        self._time = time_
+
+    def __repr__(self):
+        return "<GroupValue(src='%s', data=%r, age=%.2fs)>" % (self._src, self._data, self.age)
+
+    @property
+    def src(self):
+        return self._src
+
+    @property
+    def data(self):
+        return self._data
+
+    @property
+    def time(self):
+        return self._time
+
+    @property
+    def age(self):
+        return time.time() - self._time
+
+
+class GroupValueCache(object):
+    """ GroupValueCache class
+
+    @ivar _values: last known values, by raw GAD
+    @type _values: dict of int: L{GroupValue}
+
+    @ivar _condition: condition used to wait for new values
+    @type _condition: L{Condition<threading>}
+
+    @ivar _waiters: number of threads waiting for a new value
+    @type _waiters: int
+    """
+    def __init__(self):
+        """
+        """
+        super(GroupValueCache, self).__init__()
+
+        self._logger = Logger()
+
+        self._values = {}
+        self._condition = threading.Condition()
+        self._waiters = 0
+
+        self._hits = 0
+        self._misses = 0
+
+    def __len__(self):
+        return len(self._values)
+
+    @property
+    def hits(self):
+        """ Number of get() calls answered from the cache
+        """
+        return self._hits
+
+    @property
+    def misses(self):
+        """ Number of get() calls not answered from the cache (unknown or too old value)
+        """
+        return self._misses
+
+    def update(self, gad, src, data):
+        """ Store the last known value of a group address
+
+        @param gad: group address
+        @type gad: L{GroupAddress}
+
+        @param src: source of the telegram (None for local telegrams)
+        @type src: L{IndividualAddress<pknyx.stack.individualAddress>}
+
+        @param data: raw frame
+        @type data: bytearray
+        """
+        self._values[gad.raw] = GroupValue(src, bytearray(data), time.time())
+
+        # Only take the lock if someone waits for a value
+        if self._waiters:
+            with self._condition:
+                self._condition.notifyAll()
+
+    def get(self, gad, maxAge=None):
+        """ Get the last known value of a group address
+
+        @param gad: group address
+        @type gad: L{GroupAddress}
+
+        @param maxAge: max age of the value, in s (None for no limit)
+        @type maxAge: float
+
+        @return: last known value, or None if unknown or too old
+        @rtype: L{GroupValue}
+        """
+        if not isinstance(gad, GroupAddress):
+            gad = GroupAddress(gad)
+
+        value = self._values.get(gad.raw)
+        if value is None or (maxAge is not None and value.age > maxAge):
+            self._misses += 1
+            return None
+
+        self._hits += 1
+        return value
+
+    def wait(self, gad, since, timeout):
+        """ Wait for a value of a group address seen after a given time
+
+        Must not be called from the thread feeding the cache (stack or event loop thread).
+
+        @param gad: group address
+        @type gad: L{GroupAddress}
+
+        @param since: min time of the value
+        @type since: float
+
+        @param timeout: max time to wait, in s
+        @type timeout: float
+
+        @return: value, or None if timeout expired
+        @rtype: L{GroupValue}
+
+        raise GroupValueCacheValueError:
+        """
+        if timeout < 0:
+            raise GroupValueCacheValueError("invalid timeout (%r)" % timeout)
+        if not isinstance(gad, GroupAddress):
+            gad = GroupAddress(gad)
+
+        endTime = time.time() + timeout
+        with self._condition:
+            self._waiters += 1
+            try:
+                while True:
+                    value = self._values.get(gad.raw)
+                    if value is not None and value.time >= since:
+                        return value
+                    remaining = endTime - time.time()
+                    if remaining <= 0:
+                        return None
+                    self._condition.wait(remaining)
+            finally:
+                self._waiters -= 1
+
+    def invalidate(self, gad=None):
+        """ Forget the last known value of a group address
+
+        @param gad: group address (None to forget all values)
+        @type gad: L{GroupAddress}
+        """
+        if gad is None:
+            self._values = {}
+        else:
+            if not isinstance(gad, GroupAddress):
+                gad = GroupAddress(gad)
+            self._values.pop(gad.raw, None)
+
+
+if __name__ == '__main__':
+    import unittest
+
+    from pknyx.stack.individualAddress import IndividualAddress
+
+    # Mute logger
+    Logger().setLevel('error')
+
+
+    class GroupValueCacheTestCase(unittest.TestCase):
+
+        def setUp(self):
+            self.cache = GroupValueCache()
+            self.gad = GroupAddress("1/1/1")
+
+        def tearDown(self):
+            pass
+
+        def test_display(self):
+            self.cache.update(self.gad, IndividualAddress("1.1.1"), bytearray("\x01"))
+            print repr(self.cache.get(self.gad))
+
+        def test_get(self):
+            self.assertIs(self.cache.get(self.gad), None)
+            data = bytearray("\x01")
+            self.cache.update(self.gad, IndividualAddress("1.1.1"), data)
+            data[0] = 0x00  # the cache keeps its own copy
+            value = self.cache.get("1/1/1")
+            self.assertEqual(value.data, bytearray("\x01"))
+            self.assertEqual(value.src, IndividualAddress("1.1.1"))
+            self.assertIs(self.cache.get(self.gad, maxAge=10.), value)
+            time.sleep(0.02)
+            self.assertIs(self.cache.get(self.gad, maxAge=0.01), None)
+            self.assertEqual((self.cache.hits, self.cache.misses), (2, 2))
+            self.assertEqual(len(self.cache), 1)
+            self.cache.invalidate(self.gad)
+            self.assertIs(self.cache.get(self.gad), None)
+
+        def test_wait(self):
+            with self.assertRaises(GroupValueCacheValueError):
+                self.cache.wait(self.gad, time.time(), -1.)
+            since = time.time()
+            self.assertIs(self.cache.wait(self.gad, since, 0.01), None)
+            timer = threading.Timer(0.02, self.cache.update, (self.gad, None, bytearray("\x02")))
+            timer.start()
+            value = self.cache.wait(self.gad, since, 1.)
+            self.assertEqual(value.data, bytearray("\x02"))
+            self.assertIs(value.src, None)
+            self.assertEqual(self.cache.wait(self.gad, since, 0.), value)
+
+
+    unittest.main()
@@ -39,6 +39,8 @@ Implements
 Documentation
 =============
 
+Individual addresses are immutable, and interned: creating an individual address returns a shared
+instance, with its string representation computed once.
 
 Usage
 =====
@@ -61,6 +63,8 @@ IndividualAddressValueError: individual address out of range
 2
 >>> indAddr.device
 3
+>>> IndividualAddress(4611) is indAddr
+True
 >>> indAddr.frame
 '\x12\x03'
 
@@ -83,39 +87,77 @@ class IndividualAddressValueError(KnxAddressValueError):
 
 class IndividualAddress(KnxAddress):
     """ Individual address hanlding class
+
+    @ivar _address: precomputed string representation
+    @type _address: str
     """
-    def __init__(self, address="0.0.0"):
-        """ Create an individual address
+    __slots__ = ("_address",)
 
-        @param address: individual address
-        @type address: str or tuple of int
+    _instances = {}
 
-        raise IndividualAddressValueError: invalid address
+    def __new__(cls, address="0.0.0"):
+        """ Return the shared individual address instance
 
-        @todo: add constructor with simple int
+        Instances are interned by raw address; str and tuple representations are also cached, so they
+        are only parsed once.
         """
-        #Logger().debug("IndividualAddress.__init__(): address=%s" % repr(address))
+        try:
+            return cls._instances[address]
+        except (KeyError, TypeError):
+            pass
 
-        if isinstance(address, str):
-            address = address.strip().split('.')
+        raw = address
+        if isinstance(raw, str):
+            raw = raw.strip().split('.')
             try:
-                address = [int(val) for val in address]
+                raw = [int(val) for val in raw]
             except ValueError:
-                Logger().exception("IndividualAddress.__init__()", debug=True)
+                Logger().exception("IndividualAddress.__new__()", debug=True)
                 raise IndividualAddressValueError("invalid individual address")
         try:
-            if len(address) == 3:
-                if not 0 <= address[0] <= 0xf or not 0 <= address[1] <= 0xf or not 0 <= address[2] <= 0xff:
+            if len(raw) == 3:
+                if not 0 <= raw[0] <= 0xf or not 0 <= raw[1] <= 0xf or not 0 <= raw[2] <= 0xff:
                     raise IndividualAddressValueError("individual address out of range")
-                address = address[0] << 12 | address[1] << 8 | address[2]
+                raw = raw[0] << 12 | raw[1] << 8 | raw[2]
             else:
                 raise IndividualAddressValueError("invalid individual address")
         except TypeError:
-            if not isinstance(address, int):
-                Logger().exception("IndividualAddress.__init__()", debug=True)
+            if not isinstance(raw, int):
+                Logger().exception("IndividualAddress.__new__()", debug=True)
                 raise IndividualAddressValueError("invalid individual address")
 
-        super(IndividualAddress, self).__init__(address)
+        try:
+            self = cls._instances[raw]
+        except KeyError:
+            self = super(IndividualAddress, cls).__new__(cls)
+            KnxAddress.__init__(self, raw)
+            self._address = self._format()
+            cls._instances[raw] = self
+
+        if isinstance(address, (str, tuple)):
+            cls._instances[address] = self
+
+        return self
+
+    def __init__(self, address="0.0.0"):
+        """ Create an individual address
+
+        Nothing to do here: the shared instance is built by L{__new__}.
+
+        @param address: individual address
+        @type address: str, tuple of int or int (raw)
+
+        raise IndividualAddressValueError: invalid address
+        """
+
+    def __reduce__(self):
+        return (IndividualAddress, (self._raw,))
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
 
     def __repr__(self):
         return "<IndividualAddress('%s')>" % self.address
@@ -123,8 +165,9 @@ class IndividualAddress(KnxAddress):
     def __str__(self):
         return self.address
 
-    @property
-    def address(self):
+    def _format(self):
+        """ Build the string representation of the address
+        """
         address = []
         address.append("%d" % self.area)
         address.append("%d" % self.line)
@@ -132,6 +175,10 @@ class IndividualAddress(KnxAddress):
 
         return '.'.join(address)
 
+    @property
+    def address(self):
+        return self._address
+
     @property
     def area(self):
         return self._raw >> 12 & 0xf
@@ -146,6 +193,8 @@ class IndividualAddress(KnxAddress):
 
 
 if __name__ == '__main__':
+    import copy
+    import pickle
     import unittest
 
     # Mute logger
@@ -226,5 +275,14 @@ if __name__ == '__main__':
             self.assertEqual(self.ad1.device, 3)
             self.assertEqual(self.ad2.device, 3)
 
+        def test_interning(self):
+            self.assertIs(self.ad1, self.ad2)
+            self.assertIs(self.ad1, IndividualAddress(4611))
+            self.assertIsNot(self.ad1, self.ad3)
+            self.assertIs(copy.deepcopy(self.ad1), self.ad1)
+            self.assertIs(pickle.loads(pickle.dumps(self.ad1)), self.ad1)
+            with self.assertRaises(AttributeError):
+                self.ad1.foo = 1
+
 
     unittest.main()
@@ -0,0 +1,454 @@
+# -*- coding: utf-8 -*-
+
+""" Python KNX framework
+
+License
+=======
+
+ - B{pKNyX} (U{http://www.pknyx.org}) is Copyright:
+  - (C) 2013-2015 Frédéric Mantegazza
+
+This program is free software; you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation; either version 2 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program; if not, write to the Free Software
+Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+
+or see:
+
+ - U{http://www.gnu.org/licenses/gpl.html}
+
+Module purpose
+==============
+
+KNX Stack management
+
+Implements
+==========
+
+ - B{InitReadScheduler}
+ - B{InitReadSchedulerValueError}
+
+Documentation
+=============
+
+On start, the stack sends a GroupValue_Read for each Group having at least one GroupObject with the 'init' flag
+on. The scheduler sends these reads from its own thread, without waiting for their confirmation, at the rate
+allowed by a L{TokenBucket<pknyx.stack.tokenBucket>} (bus budget, in telegrams/s, which should match the line
+coupler capacity).
+
+Each read stays outstanding until an answer is received on its GAD (a GroupValue_Response, or a GroupValue_Write
+which also gives the current value). If no answer comes within the timeout, the read is sent again; the timeout
+is doubled on each retry. After the last retry, the GAD is marked as failed.
+
+The L{done<InitReadScheduler.done>} event is set when all reads are answered or failed (or when the scheduler is
+stopped).
+
+Usage
+=====
+
+>>> scheduler = InitReadScheduler(rate=20., burst=5)
+>>> scheduler.start(groups)
+>>> scheduler.wait(10.)
+True
+>>> scheduler.failed
+frozenset([])
+
+@author: Frédéric Mantegazza
+@copyright: (C) 2013-2015 Frédéric Mantegazza
+@license: GPL
+"""
+
+__revision__ = "$Id$"
+
+import collections
+import threading
+import time
+
+from pknyx.common import config
+from pknyx.common.exception import PKNyXValueError
+from pknyx.services.logger import Logger
+from pknyx.stack.priority import Priority
+from pknyx.stack.tokenBucket import TokenBucket
+from pknyx.core.groupListener import GroupListener
+
+
+class InitReadSchedulerValueError(PKNyXValueError):
+    """
+    """
+
+
+class _InitReadListener(GroupListener):
+    """ Group listener forwarding answers to the scheduler
+    """
+    def __init__(self, scheduler, group):
+        super(_InitReadListener, self).__init__()
+
+        self._scheduler = scheduler
+        self._group = group
+
+    def onWrite(self, src, data):
+        self._scheduler._answer(self._group)
+
+    def onRead(self, src):
+        pass
+
+    def onResponse(self, src, data):
+        self._scheduler._answer(self._group)
+
+
+class InitReadScheduler(object):
+    """ InitReadScheduler class
+
+    @ivar _bucket: bus budget
+    @type _bucket: L{TokenBucket}
+
+    @ivar _listeners: listeners of the groups waiting for an answer (queued or outstanding reads)
+    @type _listeners: dict of L{Group<pknyx.core.group>}: L{_InitReadListener}
+
+    @ivar _queue: reads to send, with their attempt number
+    @type _queue: L{deque<collections>} of (L{Group<pknyx.core.group>}, int)
+
+    @ivar _outstanding: sent reads, with their deadline and attempt number
+    @type _outstanding: dict of L{Group<pknyx.core.group>}: (float, int)
+
+    @ivar _answered: GADs which have been answered
+    @type _answered: set of L{GroupAddress}
+
+    @ivar _failed: GADs which have not been answered after the last retry
+    @type _failed: set of L{GroupAddress}
+
+    @ivar _condition: condition protecting the above, and waking up the scheduler thread
+    @type _condition: L{Condition<threading>}
+
+    @ivar _done: set when all reads are answered or failed
+    @type _done: L{Event<threading>}
+    """
+    def __init__(self, rate=config.STACK_INIT_READ_RATE, burst=config.STACK_INIT_READ_BURST,
+                 timeout=config.STACK_INIT_READ_TIMEOUT, retries=config.STACK_INIT_READ_RETRIES, priority=None):
+        """
+
+        @param rate: bus budget, in telegrams/s
+        @type rate: float
+
+        @param burst: number of telegrams which can be sent in a row
+        @type burst: int
+
+        @param timeout: time to wait for an answer, in s (doubled on each retry)
+        @type timeout: float
+
+        @param retries: number of retries of unanswered reads
+        @type retries: int
+
+        @param priority: priority of the reads (default to low)
+        @type priority: L{Priority}
+
+        raise InitReadSchedulerValueError:
+        """
+        super(InitReadScheduler, self).__init__()
+
+        self._logger = Logger()
+
+        if rate <= 0:
+            raise InitReadSchedulerValueError("invalid rate (%r)" % rate)
+        if burst < 1:
+            raise InitReadSchedulerValueError("invalid burst (%r)" % burst)
+        if timeout <= 0:
+            raise InitReadSchedulerValueError("invalid timeout (%r)" % timeout)
+        if retries < 0:
+            raise InitReadSchedulerValueError("invalid retries (%r)" % retries)
+
+        self._bucket = TokenBucket(rate, burst)
+        self._timeout = timeout
+        self._retries = retries
+        if priority is None:
+            priority = Priority()
+        self._priority = priority
+
+        self._listeners = {}
+        self._queue = collections.deque()
+        self._outstanding = {}
+        self._answered = set()
+        self._failed = set()
+        self._condition = threading.Condition()
+        self._done = threading.Event()
+        self._done.set()
+
+        self._running = False
+        self._thread = None
+
+    @property
+    def done(self):
+        return self._done
+
+    @property
+    def pending(self):
+        with self._condition:
+            return len(self._listeners)
+
+    @property
+    def answered(self):
+        with self._condition:
+            return frozenset(self._answered)
+
+    @property
+    def failed(self):
+        with self._condition:
+            return frozenset(self._failed)
+
+    def wait(self, timeout=None):
+        """ Wait for all reads to be answered or failed
+
+        @param timeout: max time to wait, in s (None to wait forever)
+        @type timeout: float
+
+        @return: True if done, False on timeout
+        @rtype: bool
+        """
+        self._done.wait(timeout)
+
+        return self._done.is_set()
+
+    def start(self, groups):
+        """ Start sending the reads
+
+        Does nothing if the scheduler is already running.
+
+        @param groups: groups to read
+        @type groups: iterable of L{Group<pknyx.core.group>}
+        """
+        self._logger.trace("InitReadScheduler.start()")
+
+        with self._condition:
+            if self._running:
+                return
+
+            self._answered.clear()
+            self._failed.clear()
+            for group in groups:
+                if group not in self._listeners:
+                    listener = _InitReadListener(self, group)
+                    group.addListener(listener)
+                    self._listeners[group] = listener
+                    self._queue.append((group, 0))
+
+            if not self._listeners:
+                self._done.set()
+                return
+
+            self._logger.debug("InitReadScheduler.start(): %d read(s)", len(self._listeners))
+            self._done.clear()
+            self._running = True
+            self._thread = threading.Thread(target=self._run, name="Init read scheduler")
+            self._thread.setDaemon(True)
+            self._thread.start()
+
+    def stop(self):
+        """ Stop the scheduler
+
+        Pending reads are dropped.
+        """
+        self._logger.trace("InitReadScheduler.stop()")
+
+        with self._condition:
+            self._running = False
+            self._condition.notify()
+
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+
+    def _forget(self, group):
+        """ Stop waiting for an answer of the given group
+
+        Must be called with the condition acquired.
+        """
+        group.removeListener(self._listeners.pop(group))
+        self._outstanding.pop(group, None)
+
+    def _answer(self, group):
+        """ Answer received on the given group
+        """
+        with self._condition:
+            if group in self._listeners:
+                self._logger.debug("InitReadScheduler._answer(): gad=%s", group.gad)
+                self._forget(group)
+                self._answered.add(group.gad)
+                self._condition.notify()
+
+    def _schedule(self, now):
+        """ Handle expired reads, and get the reads to send now
+
+        Must be called with the condition acquired.
+
+        @return: groups to read now, and delay until the next event (None if there is no event to wait for)
+        @rtype: tuple of (list of L{Group<pknyx.core.group>}, float)
+        """
+        for group, (deadline, attempt) in self._outstanding.items():
+            if deadline <= now:
+                del self._outstanding[group]
+                if attempt < self._retries:
+                    self._queue.append((group, attempt + 1))
+                else:
+                    self._logger.warning("InitReadScheduler: no answer on %s" % group.gad)
+                    self._forget(group)
+                    self._failed.add(group.gad)
+
+        groups = []
+        delay = None
+        while self._queue:
+            group, attempt = self._queue[0]
+            if group not in self._listeners:  # answered while queued
+                self._queue.popleft()
+                continue
+            delay = self._bucket.consume(now)
+            if delay:
+                break
+            self._queue.popleft()
+            self._outstanding[group] = (now + self._timeout * 2 ** attempt, attempt)
+            groups.append(group)
+            delay = None
+
+        if self._outstanding:
+            nextDeadline = min([deadline for deadline, attempt in self._outstanding.itervalues()]) - now
+            if delay is None or nextDeadline < delay:
+                delay = nextDeadline
+
+        return groups, delay
+
+    def _run(self):
+        """ Scheduler thread
+        """
+        self._logger.trace("InitReadScheduler._run()")
+
+        while True:
+            with self._condition:
+                if not self._running or not self._listeners:
+                    break
+                groups, delay = self._schedule(time.time())
+                if not groups:
+                    if self._listeners:
+                        self._condition.wait(delay)
+                    continue
+
+            # Don't send with the condition acquired, as answers come from the stack threads
+            for group in groups:
+                try:
+                    group.read(self._priority, wait=False)
+                except PKNyXValueError:
+                    self._logger.exception("InitReadScheduler._run()")
+
+        with self._condition:
+            for group in self._listeners.keys():
+                self._forget(group)
+            self._queue.clear()
+            self._running = False
+            self._logger.debug("InitReadScheduler._run(): done (%d answered, %d failed)",
+                               len(self._answered), len(self._failed))
+        self._done.set()
+
+
+if __name__ == '__main__':
+    import unittest
+
+    from pknyx.core.group import Group
+    from pknyx.stack.groupAddress import GroupAddress
+
+    # Mute logger
+    Logger().setLevel('error')
+
+
+    class GroupTest(Group):
+        """ Group answering (or not) the reads
+        """
+        def __init__(self, gad, answers=1, skip=0):
+            super(GroupTest, self).__init__(gad, None)
+            self.reads = []
+            self._answers = answers
+            self._skip = skip
+
+        def read(self, priority, wait=True):
+            self.reads.append(time.time())
+            if len(self.reads) > self._skip and len(self.reads) <= self._skip + self._answers:
+                self.groupValueReadCon("1.1.1", priority, bytearray(1))
+
+
+    class InitReadSchedulerTestCase(unittest.TestCase):
+
+        def setUp(self):
+            pass
+
+        def tearDown(self):
+            pass
+
+        def test_constructor(self):
+            with self.assertRaises(InitReadSchedulerValueError):
+                InitReadScheduler(rate=0.)
+            with self.assertRaises(InitReadSchedulerValueError):
+                InitReadScheduler(burst=0)
+            with self.assertRaises(InitReadSchedulerValueError):
+                InitReadScheduler(timeout=0.)
+            with self.assertRaises(InitReadSchedulerValueError):
+                InitReadScheduler(retries=-1)
+            scheduler = InitReadScheduler()
+            self.assertTrue(scheduler.done.is_set())
+            scheduler.start([])
+            self.assertTrue(scheduler.wait(0.))
+
+        def test_rate(self):
+            groups = [GroupTest(GroupAddress(i + 1)) for i in xrange(10)]
+            scheduler = InitReadScheduler(rate=100., burst=5)
+            startTime = time.time()
+            scheduler.start(groups)
+            self.assertTrue(scheduler.wait(1.))
+            self.assertGreaterEqual(time.time() - startTime, 0.045)
+            self.assertEqual(scheduler.answered, frozenset([group.gad for group in groups]))
+            self.assertEqual(scheduler.failed, frozenset())
+            self.assertEqual(scheduler.pending, 0)
+            for group in groups:
+                self.assertEqual(len(group.reads), 1)
+                self.assertEqual(group.listeners, set())
+
+        def test_retry(self):
+            groups = [GroupTest("1/1/1", skip=2), GroupTest("1/1/2", answers=0)]
+            scheduler = InitReadScheduler(rate=1000., timeout=0.02, retries=2)
+            scheduler.start(groups)
+            self.assertTrue(scheduler.wait(1.))
+            self.assertEqual(scheduler.answered, frozenset([GroupAddress("1/1/1")]))
+            self.assertEqual(scheduler.failed, frozenset([GroupAddress("1/1/2")]))
+            self.assertEqual(len(groups[0].reads), 3)
+            self.assertEqual(len(groups[1].reads), 3)
+
+            # Backoff: 0.02, then 0.04 s
+            reads = groups[1].reads
+            self.assertGreaterEqual(reads[1] - reads[0], 0.02)
+            self.assertGreaterEqual(reads[2] - reads[1], 0.04)
+
+        def test_write(self):
+            group = GroupTest("1/1/1", answers=0)
+            scheduler = InitReadScheduler(timeout=10.)
+            scheduler.start([group])
+            group.groupValueWriteInd("1.1.1", Priority(), bytearray(1))
+            self.assertTrue(scheduler.wait(1.))
+            self.assertEqual(scheduler.answered, frozenset([GroupAddress("1/1/1")]))
+
+        def test_stop(self):
+            group = GroupTest("1/1/1", answers=0)
+            scheduler = InitReadScheduler(timeout=10.)
+            scheduler.start([group])
+            self.assertFalse(scheduler.wait(0.05))
+            self.assertEqual(scheduler.pending, 1)
+            scheduler.stop()
+            self.assertTrue(scheduler.done.is_set())
+            self.assertEqual(scheduler.pending, 0)
+            self.assertEqual(group.listeners, set())
+
+
+    unittest.main()
@@ -78,8 +78,14 @@ class KnxAddress(object):
 
     @ivar _raw: knx raw address
     @type _raw: int
+
+    @ivar _hash: precomputed hash
+    @type _hash: int
+
     @todo: use buffer protocole (bytearray)?
     """
+    __slots__ = ("_raw", "_hash")
+
     def __init__(self, raw=0x0000):
         """ Create a generic address
 
@@ -100,6 +106,7 @@ class KnxAddress(object):
         else:
             raise KnxAddressValueError("invalid address (%r)" % repr(raw))
         self._raw = raw
+        self._hash = hash(raw)
 
     def __repr__(self):
         return "<KnxAddress('%s')>" % hex(self._raw)
@@ -107,6 +114,9 @@ class KnxAddress(object):
     def __cmp__(self, other):
         return cmp(self.raw, other.raw)
 
+    def __hash__(self):
+        return self._hash
+
     @property
     def raw(self):
         return self._raw
@@ -174,6 +184,10 @@ if __name__ == '__main__':
             self.assertNotEqual(self.ad1, self.ad2)
             self.assertEqual(self.ad1, self.ad3)
 
+        def test_hash(self):
+            self.assertEqual(hash(self.ad1), hash(self.ad3))
+            self.assertEqual(len(set([self.ad1, self.ad2, self.ad3])), 2)
+
         def test_frame(self):
             self.assertEqual(self.ad1.frame, "\x00\x7b")
 
@@ -114,6 +114,7 @@ class KNXnetIPHeader(object):
     TUNNELING_ACK = 0x0421
     ROUTING_IND = 0x0530
     ROUTING_LOST_MSG = 0x0531
+    ROUTING_BUSY = 0x0532
 
     SERVICE = (CONNECT_REQ, CONNECT_RES,
                CONNECTIONSTATE_REQ, CONNECTIONSTATE_RES,
@@ -122,10 +123,11 @@ class KNXnetIPHeader(object):
                SEARCH_REQ, SEARCH_RES,
                DEVICE_CONFIGURATION_REQ, DEVICE_CONFIGURATION_ACK,
                TUNNELING_REQ, TUNNELING_ACK,
-               ROUTING_IND, ROUTING_LOST_MSG
+               ROUTING_IND, ROUTING_LOST_MSG, ROUTING_BUSY
               )
 
     HEADER_SIZE = 0x06
+    HEADER_STRUCT = struct.Struct(">BBHH")
     KNXNETIP_VERSION = 0x10
 
     def __init__(self, frame=None, service=None, serviceLength=0):
@@ -134,7 +136,7 @@ class KNXnetIPHeader(object):
         Header can be loaded either from frame or from sratch
 
         @param frame: byte array with contained KNXnet/IP frame
-        @type frame: sequence
+        @type frame: str, bytearray or memoryview
 
         @param service: service identifier
         @type service: int
@@ -150,23 +152,21 @@ class KNXnetIPHeader(object):
             raise KNXnetIPHeaderValueError("can't give both frame and service type")
 
         if frame is not None:
-            frame = bytearray(frame)
             if len(frame) < KNXnetIPHeader.HEADER_SIZE:
                     raise KNXnetIPHeaderValueError("frame too short for KNXnet/IP header (%d)" % len(frame))
 
-            headersize = frame[0] & 0xff
+            # Decode in place (frame can be a str, a bytearray or a memoryview), without copying it
+            headersize, protocolVersion, self._service, self._totalSize = KNXnetIPHeader.HEADER_STRUCT.unpack_from(frame)
+
             if headersize != KNXnetIPHeader.HEADER_SIZE:
                 raise KNXnetIPHeaderValueError("wrong header size (%d)" % headersize)
 
-            protocolVersion = frame[1] & 0xff
             if protocolVersion != KNXnetIPHeader.KNXNETIP_VERSION:
                 raise KNXnetIPHeaderValueError("unsupported KNXnet/IP protocol (%d)" % protocolVersion)
 
-            self._service = (frame[2] & 0xff) << 8 | (frame[3] & 0xff)
             if self._service not in KNXnetIPHeader.SERVICE:
                 raise KNXnetIPHeaderValueError("unsupported service (%d)" % self._service)
 
-            self._totalSize = (frame[4] & 0xff) << 8 | (frame[5] & 0xff)
             if len(frame) != self._totalSize:
                 raise KNXnetIPHeaderValueError("wrong frame length (%d; should be %d)" % (len(frame), self._totalSize))
 
@@ -199,7 +199,7 @@ class KNXnetIPHeader(object):
 
     @property
     def frame(self):
-        s = struct.pack(">2B2H", KNXnetIPHeader.HEADER_SIZE, KNXnetIPHeader.KNXNETIP_VERSION, self._service, self._totalSize)
+        s = KNXnetIPHeader.HEADER_STRUCT.pack(KNXnetIPHeader.HEADER_SIZE, KNXnetIPHeader.KNXNETIP_VERSION, self._service, self._totalSize)
         return bytearray(s)
 
     @property
@@ -236,6 +236,8 @@ class KNXnetIPHeader(object):
             return "routing.ind"
         elif self._service == KNXnetIPHeader.ROUTING_LOST_MSG:
             return "routing-lost.msg"
+        elif self._service == KNXnetIPHeader.ROUTING_BUSY:
+            return "routing-busy"
         else:
             return "unknown/unsupported service"
 
@@ -269,6 +271,12 @@ if __name__ == '__main__':
             with self.assertRaises(KNXnetIPHeaderValueError):
                 KNXnetIPHeader(frame="\x06\x10\x05\x30\x00\x10\x29\x00\xbc\xd0\x11\x0e\x19\x02\x01\x00\x80")  # total length
 
+        def test_memoryview(self):
+            buffer = bytearray("\x06\x10\x05\x30\x00\x11\x29\x00\xbc\xd0\x11\x0e\x19\x02\x01\x00\x80\xff\xff")
+            header = KNXnetIPHeader(frame=memoryview(buffer)[:17])
+            self.assertEqual(header.service, KNXnetIPHeader.ROUTING_IND)
+            self.assertEqual(header.totalSize, 17)
+
         def test_service(self):
             self.assertEqual(self._header1.service, KNXnetIPHeader.ROUTING_IND)
             self.assertEqual(self._header2.service, KNXnetIPHeader.ROUTING_IND)
@@ -285,4 +293,9 @@ if __name__ == '__main__':
             self.assertEqual(self._header1.serviceName, "routing.ind")
             self.assertEqual(self._header2.serviceName, "routing.ind")
 
+        def test_routingBusy(self):
+            header = KNXnetIPHeader(frame="\x06\x10\x05\x32\x00\x0c\x06\x00\x00\x64\x00\x00")
+            self.assertEqual(header.service, KNXnetIPHeader.ROUTING_BUSY)
+            self.assertEqual(header.serviceName, "routing-busy")
+
     unittest.main()
@@ -64,8 +64,11 @@ class L_DataListener(object):
         """
         super(L_DataListener, self).__init__()
 
-    def dataInd(self, src, dest, priority, lSDU):
+    def dataInd(self, cEMI):
         """
+
+        @param cEMI: decoded input frame
+        @type cEMI: L{CEMILDataTelegram<pknyx.stack.cemi.cemiLDataTelegram>}
         """
         raise NotImplementedError
 
@@ -39,6 +39,14 @@ Implements
 Documentation
 =============
 
+Outgoing transmissions are queued by priority. The transceiver gets them through a
+L{TrafficShaper<pknyx.stack.trafficShaper>}, which delays them according to the bus budget (see STACK_OUT_xxx
+config values), and to the KNXnet/IP routing flow control (ROUTING_BUSY). The output queue can be bounded; when it
+is full, new transmissions are dropped (and confirmed with an error result).
+
+Transmissions can be coalesced (latest value wins): if a coalescable transmission of the same GAD, with the same
+priority, is still pending, its frame is replaced in place, instead of queueing a new transmission.
+
 Usage
 =====
 
@@ -49,17 +57,21 @@ Usage
 
 __revision__ = "$Id$"
 
-import time
 import threading
+import time
 
+from pknyx.common import config
 from pknyx.common.exception import PKNyXValueError
 from pknyx.services.logger import Logger
+from pknyx.stack.result import Result
 from pknyx.stack.individualAddress import IndividualAddress
-from pknyx.stack.priorityQueue import PriorityQueue
+from pknyx.stack.priorityQueue import PriorityQueue, PriorityQueueFullError
+from pknyx.stack.trafficShaper import TrafficShaper
 from pknyx.stack.layer3.n_groupDataListener import N_GroupDataListener
 from pknyx.stack.transceiver.transceiverLSAP import TransceiverLSAP
 from pknyx.stack.transceiver.transmission import Transmission
 from pknyx.stack.cemi.cemiLData import CEMILData
+from pknyx.stack.cemi.cemiLDataTelegram import CEMILDataTelegram
 
 
 class L_DSValueError(PKNyXValueError):
@@ -67,6 +79,12 @@ class L_DSValueError(PKNyXValueError):
     """
 
 
+class LocalCEMILDataTelegram(CEMILDataTelegram):
+    """ Telegram sent by a local device, to be given to the other local devices sharing the link layer
+    """
+    __slots__ = ()
+
+
 class L_DataService(threading.Thread, TransceiverLSAP):  # @todo: do not inherits Thread
     """ L_DataService class
 
@@ -79,13 +97,42 @@ class L_DataService(threading.Thread, TransceiverLSAP):  # @todo: do not inheri
     @ivar _outQueue: output queue
     @type _outQueue: L{PriorityQueue}
 
-    @ivar _ldl: link data listener
-    @type _ldl: L{L_DataListener<pknyx.core.layer2.l_dataListener>}
+    @ivar _shaper: outgoing traffic shaper (protected by the output queue lock)
+    @type _shaper: L{TrafficShaper}
+
+    @ivar _outDropped: number of transmissions dropped because the output queue was full
+    @type _outDropped: int
+
+    @ivar _coalescable: pending coalescable transmissions, with their priority level, by destination
+    @type _coalescable: dict of L{GroupAddress<pknyx.stack.groupAddress>}: (L{Transmission}, int)
+
+    @ivar _outCoalesced: number of transmissions coalesced with a pending one
+    @type _outCoalesced: int
+
+    @ivar _ldls: link data listeners, with their Individual Address (several when the service is shared by a
+                 L{DeviceHost<pknyx.core.deviceHost>})
+    @type _ldls: tuple of (L{L_DataListener<pknyx.core.layer2.l_dataListener>}, L{IndividualAddress})
+
+    @ivar _localAddresses: Individual Addresses of all local devices, used to avoid loops
+    @type _localAddresses: frozenset of L{IndividualAddress<pknyx.core.individualAddress>}
 
     @ivar _running: True if thread is running
     @type _running: bool
+
+    @ivar _eventLoop: event loop running the service (None to run in its own thread)
+    @type _eventLoop: L{EventLoop<pknyx.stack.eventLoop>}
+
+    @ivar _inScheduled: True if inQueue processing is already scheduled in the event loop
+    @type _inScheduled: bool
+
+    @ivar _transmitHandler: handler called by the event loop when transmissions are pending
+    @type _transmitHandler: callable
+
+    @ivar _transmitScheduled: True if a call of the transmit handler is already scheduled, for delayed transmissions
+    @type _transmitScheduled: bool
     """
-    def __init__(self, priorityDistribution, individualAddress=IndividualAddress("0.0.0")):
+    def __init__(self, priorityDistribution, individualAddress=IndividualAddress("0.0.0"), eventLoop=None,
+                 shaper=None, shared=False):
         """
 
         @param individualAddress: own Individual Address
@@ -94,21 +141,51 @@ class L_DataService(threading.Thread, TransceiverLSAP):  # @todo: do not inheri
         @param priorityDistribution:
         @type priorityDistribution:
 
+        @param eventLoop: event loop running the service. If None, the service runs in its own thread
+        @type eventLoop: L{EventLoop<pknyx.stack.eventLoop>}
+
+        @param shaper: outgoing traffic shaper. If None, a shaper is created from config
+        @type shaper: L{TrafficShaper}
+
+        @param shared: if True, the service is shared by several devices (see L{DeviceHost<pknyx.core.deviceHost>}):
+                       individualAddress is not a device address, and only the addresses of the listeners added
+                       with L{addListener} are local (frames sent from them are ignored)
+        @type shared: bool
+
         raise L_DSValueError:
         """
         super(L_DataService, self).__init__(name="LinkLayer")
 
+        self._logger = Logger()
+
         if not isinstance(individualAddress, IndividualAddress):
             individualAddress = IndividualAddress(individualAddress)
         self._individualAddress = individualAddress
 
         self._inQueue  = PriorityQueue(4, priorityDistribution)
-        self._outQueue = PriorityQueue(4, priorityDistribution)
-
-        self._ldl = None
+        self._outQueue = PriorityQueue(4, priorityDistribution, config.STACK_OUT_QUEUE_SIZE,
+                                       key=lambda transmission: transmission.destination)
+        if shaper is None:
+            shaper = TrafficShaper(config.STACK_OUT_RATE, config.STACK_OUT_BURST, config.STACK_OUT_PRIORITY_RATES,
+                                   config.STACK_OUT_MIN_INTERVAL)
+        self._shaper = shaper
+        self._outDropped = 0
+        self._coalescable = {}
+        self._outCoalesced = 0
+
+        self._ldls = ()
+        if shared:
+            self._localAddresses = frozenset()
+        else:
+            self._localAddresses = frozenset((individualAddress,))
 
         self._running = False
 
+        self._eventLoop = eventLoop
+        self._inScheduled = False
+        self._transmitHandler = None
+        self._transmitScheduled = False
+
         self.setDaemon(True)
         #self.start()
 
@@ -116,21 +193,99 @@ class L_DataService(threading.Thread, TransceiverLSAP):  # @todo: do not inheri
     def individualAddress(self):
         return self._individualAddress
 
+    @property
+    def localAddresses(self):
+        return self._localAddresses
+
+    @property
+    def shaper(self):
+        return self._shaper
+
+    @property
+    def outPending(self):
+        return self._outQueue.qsize()
+
+    @property
+    def outDropped(self):
+        return self._outDropped
+
+    @property
+    def outCoalesced(self):
+        return self._outCoalesced
+
     def setListener(self, ldl):
         """
 
         @param ldl: listener to use to transmit data
         @type ldl: L{L_GroupDataListener<pknyx.core.layer2.l_groupDataListener>}
         """
-        self._ldl = ldl
+        self._ldls = ((ldl, self._individualAddress),)
+
+    def addListener(self, ldl, individualAddress=None):
+        """ Add a listener
+
+        Incoming frames are given to all listeners. Frames sent by a listener are also given to the other ones.
+
+        @param ldl: additional listener to use to transmit data
+        @type ldl: L{L_GroupDataListener<pknyx.core.layer2.l_groupDataListener>}
+
+        @param individualAddress: Individual Address of the listener device, if different from own Individual
+                                  Address; frames sent from this address are ignored
+        @type individualAddress: str or L{IndividualAddress}
+        """
+        if individualAddress is None:
+            individualAddress = self._individualAddress
+        elif not isinstance(individualAddress, IndividualAddress):
+            individualAddress = IndividualAddress(individualAddress)
+        self._ldls += ((ldl, individualAddress),)
+        self._localAddresses = self._localAddresses | frozenset((individualAddress,))
+
+    def setTransmitHandler(self, handler):
+        """ Set the handler called (in the event loop) when transmissions are pending
+
+        Only used when the service runs in an event loop.
+
+        @param handler: transceiver method transmitting all pending transmissions
+        @type handler: callable
+        """
+        self._transmitHandler = handler
+
+    def _scheduleInFrames(self):
+        """ Schedule inQueue processing in the event loop
+
+        Must be called with inQueue lock acquired.
+        """
+        if not self._inScheduled:
+            self._inScheduled = True
+            self._eventLoop.callSoon(self._processInFrames)
+
+    def _processInFrames(self):
+        """ Handle all frames pending in inQueue (event loop mode)
+        """
+        cEMIs = []
+        self._inQueue.acquire()
+        try:
+            self._inScheduled = False
+            cEMI = self._inQueue.remove()
+            while cEMI is not None:
+                cEMIs.append(cEMI)
+                cEMI = self._inQueue.remove()
+        finally:
+            self._inQueue.release()
+
+        for cEMI in cEMIs:
+            try:
+                self._handleInFrame(cEMI)
+            except:
+                self._logger.exception("L_DataService._processInFrames()")
 
     def putInFrame(self, cEMI):
         """ Set input frame
 
-        @param cEMI:
-        @type cEMI:
+        @param cEMI: decoded input frame
+        @type cEMI: L{CEMILDataTelegram<pknyx.stack.cemi.cemiLDataTelegram>}
         """
-        Logger().debug("L_DataService.putInFrame(): cEMI=%s" % cEMI)
+        self._logger.debug("L_DataService.putInFrame(): cEMI=%r", cEMI)
 
         # Get priority from cEMI
         priority = cEMI.priority
@@ -139,112 +294,534 @@ class L_DataService(threading.Thread, TransceiverLSAP):  # @todo: do not inheri
         self._inQueue.acquire()
         try:
             self._inQueue.add(cEMI, priority)
+            if self._eventLoop is None:
+                self._inQueue.notify()
+            else:
+                self._scheduleInFrames()
         finally:
             self._inQueue.release()
 
-    def getOutFrame(self):
+    def putInFrames(self, cEMIs):
+        """ Set input frames
+
+        All frames are queued at once, and inQueue handler is notified only once.
+
+        @param cEMIs: decoded input frames
+        @type cEMIs: list of L{CEMILDataTelegram<pknyx.stack.cemi.cemiLDataTelegram>}
+        """
+        self._logger.debug("L_DataService.putInFrames(): %d cEMIs", len(cEMIs))
+
+        self._inQueue.acquire()
+        try:
+            for cEMI in cEMIs:
+                self._inQueue.add(cEMI, cEMI.priority)
+            if self._eventLoop is None:
+                self._inQueue.notify()
+            else:
+                self._scheduleInFrames()
+        finally:
+            self._inQueue.release()
+
+    def _scheduledTransmit(self):
+        """ Call the transmit handler, for delayed transmissions (event loop mode)
+        """
+        self._transmitScheduled = False
+        self._transmitHandler()
+
+    def _selectOutFrame(self, timeout):
+        """ Wait for a transmission allowed by the shaper, and remove it from outQueue
+
+        Must be called with outQueue acquired.
+
+        @param timeout: max time to wait for a transmission, in s (None blocks until a transmission is allowed)
+        @type timeout: float
+
+        @return: allowed transmission (None if timeout expired or service stopped)
+        @rtype: L{Transmission}
+        """
+        if timeout is not None:
+            endTime = time.time() + timeout
+        while True:
+            transmission, delay = self._shaper.select(self._outQueue)
+            if transmission is not None and self._coalescable:
+                pending = self._coalescable.get(transmission.destination)
+                if pending is not None and pending[0] is transmission:
+                    del self._coalescable[transmission.destination]
+            if transmission is not None or not self._running:
+                return transmission
+
+            if timeout is not None:
+                remaining = endTime - time.time()
+                if remaining <= 0:
+
+                    # Transmissions are delayed; as nobody waits for them in event loop mode, call the transmit
+                    # handler later
+                    if delay is not None and self._eventLoop is not None and self._transmitHandler is not None:
+                        if not self._transmitScheduled:
+                            self._transmitScheduled = True
+                            self._eventLoop.callLater(delay, self._scheduledTransmit)
+                    return None
+                elif delay is None or delay > remaining:
+                    delay = remaining
+
+            self._outQueue.wait(delay)
+
+    def getOutFrame(self, timeout=None):
         """ Get output frame
 
-        Blocks until there is a transmission pending in outQueue, then returns this transmission
+        Blocks until there is a transmission pending in outQueue, allowed by the shaper, then returns this
+        transmission
+
+        @param timeout: max time to wait for a transmission, in s (None blocks until notified)
+        @type timeout: float
 
-        @return: pending transmission in outQueue
+        @return: pending transmission in outQueue (None if timeout expired or service stopped)
         @rtype: L{Transmission}
         """
         self._outQueue.acquire()
         try:
-            transmission = self._outQueue.remove()
+            transmission = self._selectOutFrame(timeout)
         finally:
             self._outQueue.release()
 
         return transmission
 
-    def dataReq(self, cEMI):
+    def getOutFrames(self, maxCount, timeout=None):
+        """ Get output frames
+
+        Blocks until there is a transmission pending in outQueue, allowed by the shaper, then returns all pending
+        transmissions allowed by the shaper, up to maxCount.
+
+        @param maxCount: max number of transmissions to return
+        @type maxCount: int
+
+        @param timeout: max time to wait for a transmission, in s (None blocks until notified)
+        @type timeout: float
+
+        @return: pending transmissions in outQueue (empty if timeout expired or service stopped)
+        @rtype: list of L{Transmission}
         """
+        transmissions = []
+        self._outQueue.acquire()
+        try:
+            transmission = self._selectOutFrame(timeout)
+            while transmission is not None:
+                transmissions.append(transmission)
+                if len(transmissions) >= maxCount:
+                    break
+                transmission = self._selectOutFrame(0)
+        finally:
+            self._outQueue.release()
+
+        return transmissions
+
+    def dataReq(self, cEMI, wait=True, coalesce=False):
+        """ Request a frame transmission
+
+        @param cEMI: frame to transmit
+        @type cEMI: L{CEMILData}
+
+        @param wait: if True, block until the transmission is confirmed by the transceiver, and return its result.
+                     If False, return immediately the pending transmission, which can be waited for later.
+                     Ignored (always False) when called from the event loop thread: the transmission may be delayed
+                     by the shaper, and only the loop itself can send it
+        @type wait: bool
+
+        @param coalesce: if True, and a coalescable transmission with the same destination and priority is still
+                         pending, replace its frame (the pending transmission is returned/waited for)
+        @type coalesce: bool
+
+        @return: transmission result if wait is True, pending transmission otherwise
+        @rtype: int or L{Transmission}
         """
-        Logger().debug("L_DataService.dataReq(): cEMI=%s" % cEMI)
+        self._logger.debug("L_DataService.dataReq(): cEMI=%s", cEMI)
 
-        # Add source address to cEMI
-        cEMI.sourceAddress = self._individualAddress
+        # Add source address to cEMI, if not already set by a local device
+        if cEMI.sourceAddress.isNull:
+            cEMI.sourceAddress = self._individualAddress
 
         priority = cEMI.priority
+        destination = cEMI.destinationAddress
 
-        transmission = Transmission(cEMI.frame)
-        transmission.acquire()
+        self._outQueue.acquire()
         try:
-            self._outQueue.acquire()
-            try:
+            pending = self._coalescable.get(destination)
+            if coalesce and pending is not None and pending[1] == priority.level:
+                transmission = pending[0]
+                transmission.payload = cEMI.frame
+                self._outCoalesced += 1
+            else:
+                transmission = Transmission(cEMI.frame, destination=destination)
                 self._outQueue.add(transmission, priority)
-            finally:
-                self._outQueue.release()
-
-            while transmission.waitConfirm:
-                transmission.wait()
+                self._outQueue.notify()
+
+                # Keep order with other transmissions of the same destination
+                if coalesce:
+                    self._coalescable[destination] = (transmission, priority.level)
+                elif pending is not None:
+                    del self._coalescable[destination]
+        except PriorityQueueFullError:
+            self._outDropped += 1
+            self._logger.warning("L_DataService.dataReq(): output queue full; transmission dropped")
+            transmission.result = Result.ERROR
+            transmission.waitConfirm = False
+            if not wait:
+                return transmission
+            return transmission.result
         finally:
-            transmission.release()
+            self._outQueue.release()
+
+        # Give the frame to the other local devices, as it won't come back from the bus
+        if len(self._ldls) > 1:
+            self.putInFrame(LocalCEMILDataTelegram.decode(cEMI.frame.raw))
+
+        if self._eventLoop is not None and self._transmitHandler is not None:
+            if self._eventLoop.inLoop():
+                self._transmitHandler()  # don't wait for the loop, as we are running in it
+
+                # Waiting for the confirmation would block the loop, which may have to send the frame later
+                wait = False
+            else:
+                self._eventLoop.callSoon(self._transmitHandler)
+
+        if not wait:
+            return transmission
+
+        transmission.waitConfirmation()
 
         return transmission.result
 
+    def routingBusy(self, waitTime):
+        """ Suspend transmissions (KNXnet/IP routing flow control)
+
+        @param waitTime: wait time requested by the router, in s
+        @type waitTime: float
+        """
+        self._logger.debug("L_DataService.routingBusy(): waitTime=%s", waitTime)
+
+        self._outQueue.acquire()
+        try:
+            self._shaper.routingBusy(waitTime)
+            self._outQueue.notify()
+        finally:
+            self._outQueue.release()
+
+    def _handleInFrame(self, cEMI):
+        """ Handle an incoming frame
+
+        @param cEMI: decoded input frame
+        @type cEMI: L{CEMILDataTelegram<pknyx.stack.cemi.cemiLDataTelegram>}
+        """
+        self._logger.debug("L_DataService._handleInFrame(): cEMI=%r", cEMI)
+
+        srcAddr = cEMI.sourceAddress
+        if isinstance(cEMI, LocalCEMILDataTelegram):
+            for ldl, individualAddress in self._ldls:
+                if individualAddress != srcAddr:
+                    ldl.dataInd(cEMI)
+
+        elif srcAddr not in self._localAddresses:  # Avoid loop
+            if cEMI.messageCode == CEMILData.MC_LDATA_IND:  #in (CEMILData.MC_LDATA_CON, CEMILData.MC_LDATA_IND):
+                if not self._ldls:
+                    self._logger.warning("L_GroupDataService._handleInFrame(): not listener defined")
+                for ldl, individualAddress in self._ldls:
+                    ldl.dataInd(cEMI)
+
     def run(self):
         """ inQueue handler main loop
         """
-        Logger().trace("L_DataService.run()")
+        self._logger.trace("L_DataService.run()")
 
-        self._running = True
         while self._running:
             try:
 
-                # Get incoming frame from inQueue
+                # Wait for incoming frame from inQueue
                 self._inQueue.acquire()
                 try:
+                    while self._running and self._inQueue.isEmpty():
+                        self._inQueue.wait()
                     cEMI = self._inQueue.remove()
                 finally:
                     self._inQueue.release()
 
                 # Handle cEMI message
                 if cEMI is not None:
-                    Logger().debug("L_DataService.run(): cEMI=%s" % cEMI)
+                    self._handleInFrame(cEMI)
 
-                    srcAddr = cEMI.sourceAddress
-                    if srcAddr != self._individualAddress:  # Avoid loop
-                        if cEMI.messageCode == CEMILData.MC_LDATA_IND:  #in (CEMILData.MC_LDATA_CON, CEMILData.MC_LDATA_IND):
-                            if self._ldl is None:
-                                Logger().warning("L_GroupDataService.run(): not listener defined")
-                            else:
-                                self._ldl.dataInd(cEMI)
+            except:
+                self._logger.exception("L_DataService.run()")  #, debug=True)
 
-                else:
-                    time.sleep(0.001)
+        self._logger.trace("L_DataService.run(): ended")
 
-            except:
-                Logger().exception("L_DataService.run()")  #, debug=True)
+    def start(self):
+        """ start thread
+        """
+        self._logger.trace("L_DataService.start()")
 
-        Logger().trace("L_DataService.run(): ended")
+        self._running = True
+        if self._eventLoop is None:
+            super(L_DataService, self).start()
+        else:
+            self._eventLoop.start()
 
     def stop(self):
         """ stop thread
+
+        Wake up all threads blocked on the queues, so they can see the service is stopped.
         """
-        Logger().trace("L_DataService.stop()")
+        self._logger.trace("L_DataService.stop()")
 
         self._running = False
+        for queue in (self._inQueue, self._outQueue):
+            queue.acquire()
+            try:
+                queue.notifyAll()
+            finally:
+                queue.release()
+
+    def join(self, timeout=None):
+        """ wait for thread end
+
+        Does nothing when running in an event loop (the loop may be shared by several stacks).
+        """
+        if self._eventLoop is None:
+            super(L_DataService, self).join(timeout)
 
 
 if __name__ == '__main__':
     import unittest
+    import time
+
+    from pknyx.stack.eventLoop import EventLoop
 
     # Mute logger
     Logger().setLevel('error')
 
 
+    class L_DataListenerTest(object):
+
+        def __init__(self):
+            self.event = threading.Event()
+
+        def dataInd(self, cEMI):
+            self.cEMI = cEMI
+            self.thread = threading.current_thread()
+            self.event.set()
+
+
     class L_DataServiceCase(unittest.TestCase):
 
         def setUp(self):
-            pass
+            self.lds = L_DataService((-1, 3, 2))
+            self.ldl = L_DataListenerTest()
+            self.lds.setListener(self.ldl)
 
         def tearDown(self):
-            pass
+            self.lds.stop()
 
         def test_constructor(self):
             pass
 
+        def test_putInFrame(self):
+            self.lds.start()
+            self.lds.putInFrame(CEMILDataTelegram.decode(")\x00\xbc\xd0\x11\x0e\x19\x02\x01\x00\x80"))
+            self.assertTrue(self.ldl.event.wait(1))
+            self.lds.stop()
+            self.lds.join(1)
+            self.assertFalse(self.lds.isAlive())
+
+        def test_getOutFrame(self):
+            self.lds.start()
+            self.assertIs(self.lds.getOutFrame(timeout=0.01), None)
+
+        def test_dataReqNoWait(self):
+            self.lds.start()
+            cEMI = CEMILData(")\x00\xbc\xd0\x11\x0e\x19\x02\x01\x00\x80")
+            transmission = self.lds.dataReq(cEMI, wait=False)
+            self.assertFalse(transmission.done)
+            self.assertIs(self.lds.getOutFrame(timeout=1), transmission)
+
+        def test_putInFrames(self):
+            self.lds.start()
+            self.lds.putInFrames([CEMILDataTelegram.decode(")\x00\xbc\xd0\x11\x0e\x19\x02\x01\x00\x80")])
+            self.assertTrue(self.ldl.event.wait(1))
+
+        def test_getOutFrames(self):
+            self.lds.start()
+            self.assertEqual(self.lds.getOutFrames(10, timeout=0.01), [])
+            cEMI = CEMILData(")\x00\xbc\xd0\x11\x0e\x19\x02\x01\x00\x80")
+            transmissions = [self.lds.dataReq(cEMI, wait=False) for i in xrange(3)]
+            self.assertEqual(self.lds.getOutFrames(2), transmissions[:2])
+            self.assertEqual(self.lds.getOutFrames(10), transmissions[2:])
+
+        def test_addListener(self):
+            ldl = L_DataListenerTest()
+            self.lds.addListener(ldl, "1.1.14")
+            self.assertIn(IndividualAddress("1.1.14"), self.lds.localAddresses)
+            self.lds.start()
+            self.lds.putInFrame(CEMILDataTelegram.decode(")\x00\xbc\xd0\x11\x0e\x19\x02\x01\x00\x80"))  # from 1.1.14
+            self.lds.putInFrame(CEMILDataTelegram.decode(")\x00\xbc\xd0\x11\x0f\x19\x02\x01\x00\x80"))  # from 1.1.15
+            self.assertTrue(self.ldl.event.wait(1))
+            self.assertTrue(ldl.event.wait(1))
+            self.assertEqual(self.ldl.cEMI.sourceAddress, IndividualAddress("1.1.15"))
+            self.assertIs(ldl.cEMI, self.ldl.cEMI)
+
+            # Frames sent by a local device are given to the other ones
+            self.ldl.event.clear()
+            ldl.event.clear()
+            cEMI = CEMILData(")\x00\xbc\xd0\x11\x0e\x19\x02\x01\x00\x80")
+            self.lds.dataReq(cEMI, wait=False)
+            self.assertTrue(self.ldl.event.wait(1))
+            self.assertEqual(self.ldl.cEMI.sourceAddress, IndividualAddress("1.1.14"))
+            self.assertFalse(ldl.event.wait(0.05))
+
+        def test_eventLoop(self):
+            eventLoop = EventLoop()
+            lds = L_DataService((-1, 3, 2), eventLoop=eventLoop)
+            lds.setListener(self.ldl)
+            transmissions = []
+            lds.setTransmitHandler(lambda: transmissions.extend(lds.getOutFrames(10, timeout=0)))
+            lds.start()
+            try:
+                self.assertTrue(eventLoop.running)
+                lds.putInFrame(CEMILDataTelegram.decode(")\x00\xbc\xd0\x11\x0e\x19\x02\x01\x00\x80"))
+                self.assertTrue(self.ldl.event.wait(1))
+                self.assertIs(self.ldl.thread, eventLoop._thread)
+                cEMI = CEMILData(")\x00\xbc\xd0\x11\x0e\x19\x02\x01\x00\x80")
+                transmission = lds.dataReq(cEMI, wait=False)
+                time.sleep(0.05)
+                self.assertEqual(transmissions, [transmission])
+            finally:
+                lds.stop()
+                lds.join()
+                eventLoop.stop()
+                eventLoop.join()
+
+        def test_shaper(self):
+            lds = L_DataService((-1, 3, 2), shaper=TrafficShaper(rate=20.))
+            lds.start()
+            try:
+                cEMI = CEMILData(")\x00\xbc\xd0\x11\x0e\x19\x02\x01\x00\x80")
+                transmissions = [lds.dataReq(cEMI, wait=False) for i in xrange(3)]
+                self.assertIs(transmissions[0].destination, cEMI.destinationAddress)
+                self.assertEqual(lds.outPending, 3)
+                self.assertEqual(lds.getOutFrames(10), transmissions[:1])
+                self.assertEqual(lds.getOutFrames(10, timeout=0.01), [])
+                startTime = time.time()
+                self.assertEqual(lds.getOutFrames(10), transmissions[1:2])
+                self.assertIs(lds.getOutFrame(), transmissions[2])
+                self.assertGreaterEqual(time.time() - startTime, 0.08)
+                self.assertEqual(lds.outPending, 0)
+                self.assertGreaterEqual(lds.shaper.delayed, 1)
+            finally:
+                lds.stop()
+
+        def test_routingBusy(self):
+            self.lds.start()
+            cEMI = CEMILData(")\x00\xbc\xd0\x11\x0e\x19\x02\x01\x00\x80")
+            self.lds.routingBusy(0.05)
+            startTime = time.time()
+            transmission = self.lds.dataReq(cEMI, wait=False)
+            self.assertIs(self.lds.getOutFrame(timeout=0.01), None)
+            self.assertIs(self.lds.getOutFrame(timeout=1), transmission)
+            self.assertGreaterEqual(time.time() - startTime, 0.05)
+
+        def test_outQueueFull(self):
+            outQueueSize = config.STACK_OUT_QUEUE_SIZE
+            config.STACK_OUT_QUEUE_SIZE = 1
+            try:
+                lds = L_DataService((-1, 3, 2))
+            finally:
+                config.STACK_OUT_QUEUE_SIZE = outQueueSize
+            cEMI = CEMILData(")\x00\xbc\xd0\x11\x0e\x19\x02\x01\x00\x80")
+            lds.dataReq(cEMI, wait=False)
+            transmission = lds.dataReq(cEMI, wait=False)
+            self.assertTrue(transmission.done)
+            self.assertEqual(transmission.result, Result.ERROR)
+            self.assertEqual(lds.dataReq(cEMI), Result.ERROR)
+            self.assertEqual(lds.outPending, 1)
+            self.assertEqual(lds.outDropped, 2)
+
+        def test_coalesce(self):
+            cEMI1 = CEMILData(")\x00\xbc\xd0\x11\x0e\x19\x02\x01\x00\x80")
+            cEMI2 = CEMILData(")\x00\xbc\xd0\x11\x0e\x19\x02\x01\x00\x81")
+            cEMI3 = CEMILData(")\x00\xb8\xd0\x11\x0e\x19\x02\x01\x00\x80")  # other priority
+            self.lds.start()
+            transmission = self.lds.dataReq(cEMI1, wait=False, coalesce=True)
+            self.assertIs(self.lds.dataReq(cEMI2, wait=False, coalesce=True), transmission)
+            self.assertEqual(transmission.payload.raw, cEMI2.frame.raw)
+            self.assertEqual(self.lds.outPending, 1)
+            self.assertEqual(self.lds.outCoalesced, 1)
+            other = self.lds.dataReq(cEMI3, wait=False, coalesce=True)
+            self.assertIsNot(other, transmission)
+            self.assertEqual(self.lds.outPending, 2)
+
+            # Transmissions sent
+            self.assertEqual(self.lds.getOutFrames(10), [other, transmission])
+            self.assertIsNot(self.lds.dataReq(cEMI1, wait=False, coalesce=True), transmission)
+
+            # Not coalescable transmission queued after a coalescable one
+            self.lds.dataReq(cEMI1, wait=False)
+            self.lds.dataReq(cEMI2, wait=False, coalesce=True)
+            self.assertEqual(self.lds.outPending, 3)
+
+        def test_eventLoopShaper(self):
+            eventLoop = EventLoop()
+            lds = L_DataService((-1, 3, 2), eventLoop=eventLoop, shaper=TrafficShaper(rate=20.))
+            lds.setListener(self.ldl)
+            transmissions = []
+            event = threading.Event()
+
+            def transmitHandler():
+                transmissions.extend(lds.getOutFrames(10, timeout=0))
+                if len(transmissions) == 2:
+                    event.set()
+
+            lds.setTransmitHandler(transmitHandler)
+            lds.start()
+            try:
+                cEMI = CEMILData(")\x00\xbc\xd0\x11\x0e\x19\x02\x01\x00\x80")
+                startTime = time.time()
+                expected = [lds.dataReq(cEMI, wait=False) for i in xrange(2)]
+                self.assertTrue(event.wait(1))
+                self.assertGreaterEqual(time.time() - startTime, 0.04)
+                self.assertEqual(transmissions, expected)
+            finally:
+                lds.stop()
+                lds.join()
+                eventLoop.stop()
+                eventLoop.join()
+
+        def test_eventLoopShaperWait(self):
+            eventLoop = EventLoop()
+            lds = L_DataService((-1, 3, 2), eventLoop=eventLoop, shaper=TrafficShaper(rate=20.))
+            transmissions = []
+            results = []
+            event = threading.Event()
+
+            def transmitHandler():
+                for transmission in lds.getOutFrames(10, timeout=0):
+                    transmission.result = Result.OK
+                    transmission.waitConfirm = False
+                    transmissions.append(transmission)
+                if len(transmissions) == 2:
+                    event.set()
+
+            def callback():
+                cEMI = CEMILData(")\x00\xbc\xd0\x11\x0e\x19\x02\x01\x00\x80")
+                results.extend(lds.dataReq(cEMI) for i in xrange(2))  # the 2nd one is delayed by the shaper
+
+            lds.setTransmitHandler(transmitHandler)
+            lds.start()
+            try:
+                eventLoop.callSoon(callback)
+                self.assertTrue(event.wait(1))
+                self.assertEqual(results, transmissions)
+            finally:
+                lds.stop()
+                lds.join()
+                eventLoop.stop()
+                eventLoop.join()
+
 
     unittest.main()
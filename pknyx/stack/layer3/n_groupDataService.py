@@ -69,17 +69,25 @@ class N_GroupDataService(L_DataListener):
 
     @ivar _ngdl: network group data listener
     @type _ngdl: L{N_GroupDataListener<pknyx.core.layer3.n_groupDataListener>}
+
+    @ivar _individualAddress: source address of sent frames (None to use the link layer one)
+    @type _individualAddress: L{IndividualAddress<pknyx.stack.individualAddress>}
     """
-    def __init__(self, lds, hopCount=6):
+    def __init__(self, lds, hopCount=6, individualAddress=None):
         """
 
         @param lds: Link data service object
         @type lds: L{L_DataService<pknyx.core.layer2.l_dataService>}
 
+        @param individualAddress: source address of sent frames, when the link layer is shared by several devices
+        @type individualAddress: str or L{IndividualAddress<pknyx.stack.individualAddress>}
+
         raise N_GDSValueError:
         """
         super(N_GroupDataService, self).__init__()
 
+        self._logger = Logger()
+
         self._lds = lds
 
         self._ngdl = None
@@ -87,22 +95,28 @@ class N_GroupDataService(L_DataListener):
             raise N_GDSValueError("invalid hopCount (%d)" % hopCount)
         self._hopCount = hopCount
 
-        lds.setListener(self)
+        if individualAddress is not None and not isinstance(individualAddress, IndividualAddress):
+            individualAddress = IndividualAddress(individualAddress)
+        self._individualAddress = individualAddress
+
+        lds.addListener(self, individualAddress)
 
     def dataInd(self, cEMI):
-        Logger().debug("N_GroupDataService.dataInd(): cEMI=%s" % repr(cEMI))
+        """
+
+        @param cEMI: decoded input frame
+        @type cEMI: L{CEMILDataTelegram<pknyx.stack.cemi.cemiLDataTelegram>}
+        """
+        self._logger.debug("N_GroupDataService.dataInd(): cEMI=%r", cEMI)
 
         if self._ngdl is None:
-            Logger().warning("N_GroupDataService.dataInd(): not listener defined")
+            self._logger.warning("N_GroupDataService.dataInd(): not listener defined")
             return
 
-        hopCount = cEMI.hopCount
-        mc = cEMI.messageCode
         src = cEMI.sourceAddress
         dest = cEMI.destinationAddress
         priority = cEMI.priority
-        hopCount = cEMI.hopCount
-        nSDU = cEMI.npdu[1:]
+        nSDU = cEMI.nsdu
 
         if isinstance(dest, GroupAddress):
             if not dest.isNull:
@@ -114,7 +128,7 @@ class N_GroupDataService(L_DataListener):
         #else:
             #Logger().warning("N_GroupDataService.dataInd(): unknown destination address type (%s)" % repr(dest))
         else:
-            Logger().warning("N_GroupDataService.dataInd(): unsupported destination address type (%s)" % repr(dest))
+            self._logger.warning("N_GroupDataService.dataInd(): unsupported destination address type (%s)" % repr(dest))
 
     def setListener(self, ngdl):
         """
@@ -124,18 +138,19 @@ class N_GroupDataService(L_DataListener):
         """
         self._ngdl = ngdl
 
-    def groupDataReq(self, gad, priority, nSDU):
+    def groupDataReq(self, gad, priority, nSDU, wait=True, coalesce=False):
         """
         """
-        Logger().debug("N_GroupDataService.groupDataReq(): gad=%s, priority=%s, nSDU=%s" % \
-                       (gad, priority, repr(nSDU)))
+        self._logger.debug("N_GroupDataService.groupDataReq(): gad=%s, priority=%s, nSDU=%r",
+                       gad, priority, nSDU)
 
         if gad.isNull:
             raise N_GDSValueError("invalid Group Address")
 
         cEMI = CEMILData()
         cEMI.messageCode = CEMILData.MC_LDATA_IND  # ???!!!??? Does not work with MC_LDATA_REQ!!!
-        #cEMI.sourceAddress = src  # Added by Link Data Layer
+        if self._individualAddress is not None:
+            cEMI.sourceAddress = self._individualAddress  # otherwise, added by Link Data Layer
         cEMI.destinationAddress = gad
         cEMI.priority = priority
         cEMI.hopCount = self._hopCount
@@ -144,20 +159,32 @@ class N_GroupDataService(L_DataListener):
         nPDU[1:] = nSDU
         cEMI.npdu = nPDU
 
-        return self._lds.dataReq(cEMI)
+        return self._lds.dataReq(cEMI, wait, coalesce)
 
 
 if __name__ == '__main__':
     import unittest
 
+    from pknyx.stack.layer2.l_dataService import L_DataService
+    from pknyx.stack.layer3.n_groupDataListener import N_GroupDataListener
+    from pknyx.stack.cemi.cemiLDataTelegram import CEMILDataTelegram
+
     # Mute logger
     Logger().setLevel('error')
 
 
+    class N_GroupDataListenerTest(N_GroupDataListener):
+
+        def groupDataInd(self, src, gad, priority, nSDU):
+            self.ind = (src, gad, priority, nSDU)
+
+
     class N_GDSTestCase(unittest.TestCase):
 
         def setUp(self):
-            pass
+            self.ngds = N_GroupDataService(L_DataService((-1, 3, 2)))
+            self.ngdl = N_GroupDataListenerTest()
+            self.ngds.setListener(self.ngdl)
 
         def tearDown(self):
             pass
@@ -165,5 +192,13 @@ if __name__ == '__main__':
         def test_constructor(self):
             pass
 
+        def test_dataInd(self):
+            self.ngds.dataInd(CEMILDataTelegram.decode(")\x00\xbc\xd0\x11\x0e\x19\x02\x01\x00\x80"))
+            src, gad, priority, nSDU = self.ngdl.ind
+            self.assertEqual(src, IndividualAddress("1.1.14"))
+            self.assertEqual(gad, GroupAddress("3/1/2"))
+            self.assertEqual(priority.level, 0x03)
+            self.assertEqual(nSDU, "\x00\x80")
+
 
     unittest.main()
@@ -78,6 +78,8 @@ class T_GroupDataService(N_GroupDataListener):
         """
         super(T_GroupDataService, self).__init__()
 
+        self._logger = Logger()
+
         self._ngds = ngds
 
         self._tgdl = None
@@ -117,11 +119,11 @@ class T_GroupDataService(N_GroupDataListener):
         #return packetType
 
     def groupDataInd(self, src, gad, priority, tPDU):
-        Logger().debug("T_GroupDataService.groupDataInd(): src=%s, gad=%s, priority=%s, tPDU=%s" % \
-                       (src, gad, priority, repr(tPDU)))
+        self._logger.debug("T_GroupDataService.groupDataInd(): src=%s, gad=%s, priority=%s, tPDU=%r",
+                       src, gad, priority, tPDU)
 
         if self._tgdl is None:
-            Logger().warning("T_GroupDataService.groupDataInd(): not listener defined")
+            self._logger.warning("T_GroupDataService.groupDataInd(): not listener defined")
             return
 
         #if self._getPacketType(tPDU) == TPCI.UNNUMBERED_DATA:
@@ -139,16 +141,16 @@ class T_GroupDataService(N_GroupDataListener):
         """
         self._tgdl = tgdl
 
-    def groupDataReq(self, gad, priority, tSDU):
+    def groupDataReq(self, gad, priority, tSDU, wait=True, coalesce=False):
         """
         """
-        Logger().debug("T_GroupDataService.groupDataReq(): gad=%s, priority=%s, tSDU=%s" % \
-                       (gad, priority, repr(tSDU)))
+        self._logger.debug("T_GroupDataService.groupDataReq(): gad=%s, priority=%s, tSDU=%r",
+                       gad, priority, tSDU)
 
         #self._setTPCI(tSDU, TPCI.UNNUMBERED_DATA, 0)
         tPDU = tSDU
         tPDU[0] |= TPCI.UNNUMBERED_DATA
-        return self._ngds.groupDataReq(gad, priority, tPDU)
+        return self._ngds.groupDataReq(gad, priority, tPDU, wait, coalesce)
 
 
 if __name__ == '__main__':
@@ -48,6 +48,8 @@ Usage
 
 __revision__ = "$Id$"
 
+import time
+
 from pknyx.common.exception import PKNyXValueError
 from pknyx.services.logger import Logger
 from pknyx.core.group import Group
@@ -69,46 +71,75 @@ class A_GroupDataService(T_GroupDataListener):
     @ivar _tgds: transport group data service object
     @type _tgds: L{T_GroupDataService<pknyx.core.layer4.t_groupDataService>}
 
-    @ivar _groups: Groups managed
-    @type _groups: set of L{Group}
+    @ivar _groups: Groups managed, by raw GAD
+    @type _groups: dict of L{Group}
+
+    @ivar _groupTable: dense routing table, indexed by raw GAD (None if not used)
+    @type _groupTable: list of L{Group}
+
+    @ivar _groupMonitor: group monitor, receiving all group telegrams
+    @type _groupMonitor: L{GroupMonitor}
+
+    @ivar _cache: last known values of group addresses (None if not used)
+    @type _cache: L{GroupValueCache<pknyx.stack.groupValueCache>}
     """
-    def __init__(self, tgds):
+    def __init__(self, tgds, dense=False, cache=None):
         """
 
         @param tgds: Transport group data service object
         @type tgds: L{T_GroupDataService<pknyx.core.layer4.t_groupDataService>}
 
+        @param dense: if True, also route telegrams through a 65536 entries table, indexed by raw GAD
+                      (for large installations)
+        @type dense: bool
+
+        @param cache: if given, store the last known value of all group addresses seen (written, or answered)
+        @type cache: L{GroupValueCache<pknyx.stack.groupValueCache>}
+
         raise A_GDSValueError:
         """
         super(A_GroupDataService, self).__init__()
 
+        self._logger = Logger()
+
         self._tgds = tgds
 
         self._groups = {}
+        if dense:
+            self._groupTable = [None] * 0x10000
+        else:
+            self._groupTable = None
+        self._groupMonitor = None
+        self._cache = cache
 
         tgds.setListener(self)
 
     def groupDataInd(self, src, gad, priority, aPDU):  # aPDU -> tSDU
-        Logger().debug("A_GroupDataService.groupDataInd(): src=%s, gad=%s, priority=%s, aPDU=%s" % \
-                       (src, gad, priority, repr(aPDU)))
+        self._logger.debug("A_GroupDataService.groupDataInd(): src=%s, gad=%s, priority=%s, aPDU=%r",
+                       src, gad, priority, aPDU)
 
         length = len(aPDU) - 2
         if length >= 0:
             apci = aPDU[0] << 8 | aPDU[1]
 
-            if gad.address in self._groups.keys():
-                group = self._groups[gad.address]
+            if self._groupTable is not None:
+                group = self._groupTable[gad.raw]
             else:
-                Logger().debug("A_GroupDataService.groupDataInd(): no registered group for that GAD (%s)" % repr(gad))
-                group = None
+                group = self._groups.get(gad.raw)
+            if group is None:
+                self._logger.debug("A_GroupDataService.groupDataInd(): no registered group for that GAD (%r)", gad)
 
-            if "0/0/0" in self._groups.keys():
-                groupMonitor = self._groups["0/0/0"]
-            else:
-                groupMonitor = None
+            groupMonitor = self._groupMonitor
+            cache = self._cache
+
+            # Don't extract data if nobody will keep it
+            if group is None and groupMonitor is None and cache is None:
+                return
 
             if (apci & APCI._4) == APCI.GROUPVALUE_WRITE:
                 data = APDU.getGroupValue(aPDU)
+                if cache is not None:
+                    cache.update(gad, src, data)
                 if group is not None:
                     group.groupValueWriteInd(src, priority, data)
                 if groupMonitor is not None:
@@ -121,22 +152,34 @@ class A_GroupDataService(T_GroupDataListener):
                     if groupMonitor is not None:
                         groupMonitor.groupValueReadInd(src, gad, priority)
                 else:
-                    Logger().warning("A_GroupDataService.groupDataInd(): invalid aPDU length")
+                    self._logger.warning("A_GroupDataService.groupDataInd(): invalid aPDU length")
 
             elif (apci & APCI._4) == APCI.GROUPVALUE_RES:
                 data = APDU.getGroupValue(aPDU)
+                if cache is not None:
+                    cache.update(gad, src, data)
                 if group is not None:
                     group.groupValueReadCon(src, priority, data)
                 if groupMonitor is not None:
                     groupMonitor.groupValueReadCon(src, gad, priority, data)
 
         else:
-            Logger().warning("A_GroupDataService.groupDataInd(): invalid aPDU length")
+            self._logger.warning("A_GroupDataService.groupDataInd(): invalid aPDU length")
 
     @property
     def groups(self):
+        """ Groups managed, by raw GAD (group monitor excluded)
+        """
         return self._groups
 
+    @property
+    def groupMonitor(self):
+        return self._groupMonitor
+
+    @property
+    def cache(self):
+        return self._cache
+
     def subscribe(self, gad, listener):
         """ Subscribe listener to specified group address
 
@@ -154,61 +197,151 @@ class A_GroupDataService(T_GroupDataListener):
         @return: group handling the group address
         @rtype: L{Group}
         """
-        Logger().debug("A_GroupDataService.subscribe(): gad=%s, listener=%s" % (gad, repr(listener)))
+        self._logger.debug("A_GroupDataService.subscribe(): gad=%s, listener=%r", gad, listener)
         if not isinstance(gad, GroupAddress):
             gad = GroupAddress(gad)
 
-        try:
-            group = self._groups[gad.address]
-        except KeyError:
-            if gad.isNull:
-                group = self._groups[gad.address] = GroupMonitor(self)
-            else:
-                group = self._groups[gad.address] = Group(gad, self)
+        if gad.isNull:
+            if self._groupMonitor is None:
+                self._groupMonitor = GroupMonitor(self)
+            group = self._groupMonitor
+        else:
+            try:
+                group = self._groups[gad.raw]
+            except KeyError:
+                group = self._groups[gad.raw] = Group(gad, self)
+                if self._groupTable is not None:
+                    self._groupTable[gad.raw] = group
 
         group.addListener(listener)
 
         return group
 
-    def groupValueWriteReq(self, gad, priority, data, size):
+    def groupValueWriteReq(self, gad, priority, data, size, wait=True, coalesce=False):
         """
+
+        @param wait: if False, don't wait for the transmission to be confirmed, but return the pending
+                     L{Transmission<pknyx.stack.transceiver.transmission>} instead of its result
+        @type wait: bool
+
+        @param coalesce: if True, replace the pending (not yet sent) write of the same GAD, if any
+        @type coalesce: bool
         """
-        Logger().debug("A_GroupDataService.groupValueWriteReq(): gad=%s, priority=%s, data=%s, size=%d" % \
-                       (gad, priority, repr(data), size))
+        self._logger.debug("A_GroupDataService.groupValueWriteReq(): gad=%s, priority=%s, data=%r, size=%d",
+                       gad, priority, data, size)
+
+        if self._cache is not None:
+            self._cache.update(gad, None, data)
 
         aPDU = APDU.makeGroupValue(APCI.GROUPVALUE_WRITE, data, size)
-        return self._tgds.groupDataReq(gad, priority, aPDU)
+        return self._tgds.groupDataReq(gad, priority, aPDU, wait, coalesce)
 
-    def groupValueReadReq(self, gad, priority):
+    def groupValueReadReq(self, gad, priority, wait=True):
         """
+
+        @param wait: if False, don't wait for the transmission to be confirmed, but return the pending
+                     L{Transmission<pknyx.stack.transceiver.transmission>} instead of its result
+        @type wait: bool
         """
-        Logger().debug("A_GroupDataService.groupValueReadReq(): gad=%s, priority=%s" % \
-                       (gad, priority))
+        self._logger.debug("A_GroupDataService.groupValueReadReq(): gad=%s, priority=%s", gad, priority)
 
         aPDU = APDU.makeGroupValue(APCI.GROUPVALUE_READ)
-        return self._tgds.groupDataReq(gad, priority, aPDU)
+        return self._tgds.groupDataReq(gad, priority, aPDU, wait)
 
     def groupValueReadRes(self, gad, priority, data, size):
         """
         """
-        Logger().debug("A_GroupDataService.groupValueReadRes(): gad=%s, priority=%s, data=%s, size=%d" % \
-                       (gad, priority, repr(data), size))
+        self._logger.debug("A_GroupDataService.groupValueReadRes(): gad=%s, priority=%s, data=%r, size=%d",
+                       gad, priority, data, size)
+
+        if self._cache is not None:
+            self._cache.update(gad, None, data)
 
         aPDU = APDU.makeGroupValue(APCI.GROUPVALUE_RES, data, size)
         return self._tgds.groupDataReq(gad, priority, aPDU)
 
+    def groupValueReadCached(self, gad, priority, maxAge=None, timeout=1.):
+        """ Read the value of a group address, from the cache if possible
+
+        If the cached value is not older than maxAge, it is returned without any bus traffic. Otherwise, a read
+        request is sent, and the answer (or any write seen on the group address meanwhile) is waited for.
+
+        Must not be called from the stack thread (or event loop thread), as it blocks until the answer is received.
+
+        @param maxAge: max age of the cached value, in s (None for no limit, 0 to always read the bus)
+        @type maxAge: float
+
+        @param timeout: max time to wait for the answer, in s
+        @type timeout: float
+
+        @return: value, or None if no answer has been received before timeout
+        @rtype: L{GroupValue<pknyx.stack.groupValueCache>}
+
+        raise A_GDSValueError:
+        """
+        self._logger.debug("A_GroupDataService.groupValueReadCached(): gad=%s, priority=%s, maxAge=%r",
+                       gad, priority, maxAge)
+
+        if self._cache is None:
+            raise A_GDSValueError("no group value cache")
+
+        if maxAge != 0:
+            value = self._cache.get(gad, maxAge)
+            if value is not None:
+                return value
+
+        since = time.time()
+        self.groupValueReadReq(gad, priority, wait=False)
+
+        return self._cache.wait(gad, since, timeout)
+
 
 if __name__ == '__main__':
     import unittest
 
+    from pknyx.stack.groupValueCache import GroupValueCache
+    from pknyx.stack.individualAddress import IndividualAddress
+    from pknyx.stack.priority import Priority
+
     # Mute logger
     Logger().setLevel('error')
 
 
+    class TGDSTest(object):
+
+        def __init__(self):
+            self.requests = []
+
+        def setListener(self, tgdl):
+            pass
+
+        def groupDataReq(self, gad, priority, aPDU, wait=True, coalesce=False):
+            self.requests.append((gad, aPDU))
+
+
+    class GroupListenerTest(object):
+
+        def __init__(self):
+            self.written = []
+
+        def onWrite(self, src, data):
+            self.written.append(data)
+
+
+    class GroupMonitorListenerTest(object):
+
+        def __init__(self):
+            self.written = []
+
+        def onWrite(self, src, gad, priority, data):
+            self.written.append(data)
+
+
     class A_GDSTestCase(unittest.TestCase):
 
         def setUp(self):
-            pass
+            self.agds = A_GroupDataService(TGDSTest())
+            self.agdsDense = A_GroupDataService(TGDSTest(), dense=True)
 
         def tearDown(self):
             pass
@@ -216,5 +349,44 @@ if __name__ == '__main__':
         def test_constructor(self):
             pass
 
+        def test_subscribe(self):
+            for agds in (self.agds, self.agdsDense):
+                group = agds.subscribe("1/2/3", GroupListenerTest())
+                self.assertIs(agds.subscribe(GroupAddress("1/515", outFormatLevel=2), GroupListenerTest()), group)
+                self.assertEqual(agds.groups.keys(), [GroupAddress("1/2/3").raw])
+                self.assertIs(agds.groupMonitor, None)
+                groupMonitor = agds.subscribe("0/0/0", GroupMonitorListenerTest())
+                self.assertIs(agds.groupMonitor, groupMonitor)
+                self.assertEqual(len(agds.groups), 1)
+
+        def test_groupDataInd(self):
+            for agds in (self.agds, self.agdsDense):
+                listener = GroupListenerTest()
+                monitor = GroupMonitorListenerTest()
+                agds.subscribe("1/2/3", listener)
+                agds.groupDataInd(IndividualAddress("1.1.1"), GroupAddress("1/2/3"), Priority(), bytearray("\x00\x81"))
+                agds.groupDataInd(IndividualAddress("1.1.1"), GroupAddress("1/2/4"), Priority(), bytearray("\x00\x81"))
+                self.assertEqual(listener.written, ["\x01"])
+                agds.subscribe("0/0/0", monitor)
+                agds.groupDataInd(IndividualAddress("1.1.1"), GroupAddress("1/2/4"), Priority(), bytearray("\x00\x80"))
+                self.assertEqual(listener.written, ["\x01"])
+                self.assertEqual(monitor.written, ["\x00"])
+
+        def test_cache(self):
+            agds = A_GroupDataService(TGDSTest(), cache=GroupValueCache())
+            with self.assertRaises(A_GDSValueError):
+                self.agds.groupValueReadCached(GroupAddress("1/2/3"), Priority())
+            agds.groupDataInd(IndividualAddress("1.1.1"), GroupAddress("1/2/3"), Priority(), bytearray("\x00\x81"))
+            value = agds.cache.get(GroupAddress("1/2/3"))
+            self.assertEqual((value.src, value.data), (IndividualAddress("1.1.1"), bytearray("\x01")))
+            agds.groupValueWriteReq(GroupAddress("1/2/4"), Priority(), bytearray("\x00"), 0)
+            self.assertIs(agds.cache.get(GroupAddress("1/2/4")).src, None)
+
+            # Read-through
+            self.assertIs(agds.groupValueReadCached(GroupAddress("1/2/3"), Priority(), maxAge=10.), value)
+            self.assertEqual(agds._tgds.requests, [(GroupAddress("1/2/4"), bytearray("\x00\x80"))])
+            self.assertIs(agds.groupValueReadCached(GroupAddress("1/2/3"), Priority(), maxAge=0, timeout=0.01), None)
+            self.assertEqual(agds._tgds.requests[-1], (GroupAddress("1/2/3"), bytearray("\x00\x00")))
+
 
     unittest.main()
@@ -55,6 +55,7 @@ Usage
 
 __revision__ = "$Id$"
 
+import select
 import socket
 import struct
 
@@ -124,6 +125,8 @@ class MulticastSocketBase(socket.socket):
 class MulticastSocketReceive(MulticastSocketBase):
     """
     """
+    MAX_DATAGRAM_SIZE = 1024
+
     def __init__(self, localAddr, mcastAddr, mcastPort, timeout=1, ttl=32, loop=1):
         """
         """
@@ -149,7 +152,41 @@ class MulticastSocketReceive(MulticastSocketBase):
     def receive(self):
         """
         """
-        return self.recvfrom(1024)
+        return self.recvfrom(MulticastSocketReceive.MAX_DATAGRAM_SIZE)
+
+    def receiveInto(self, buffer):
+        """ Receive a datagram in the given buffer
+
+        @param buffer: pre-allocated buffer to receive into
+        @type buffer: bytearray
+
+        @return: number of bytes received, and (addr, port) of the sender
+        @rtype: tuple
+        """
+        return self.recvfrom_into(buffer)
+
+    def receiveAll(self, buffer, maxCount=64):
+        """ Receive all ready datagrams in the given buffer
+
+        Waits (up to the socket timeout) until the socket is readable, then drains all ready datagrams,
+        without blocking anymore. The same buffer is used for all datagrams, so received data is only
+        valid until the next iteration.
+
+        @param buffer: pre-allocated buffer to receive into
+        @type buffer: bytearray
+
+        @param maxCount: max number of datagrams to read
+        @type maxCount: int
+
+        @return: iterator over the number of bytes received, and (addr, port) of the sender
+        @rtype: generator
+        """
+        count = 0
+        readable = select.select([self], [], [], self.gettimeout())[0]
+        while readable and count < maxCount:
+            yield self.recvfrom_into(buffer)
+            count += 1
+            readable = select.select([self], [], [], 0)[0]
 
 
 class MulticastSocketTransmit(MulticastSocketBase):
@@ -35,6 +35,7 @@ Implements
 
  - B{PriorityQueue}
  - B{PriorityQueueValueError}
+ - B{PriorityQueueFullError}
 
 Documentation
 =============
@@ -56,9 +57,22 @@ remaining 2 objects with pr. 1 and at last the remaining with pr. 2.
 
 The size of this array must be smaller by one than the number of priority steps.
 
-The array is used internally (it is not cloned)
+Each priority step is stored in its own deque, so adding and removing elements is O(1), whatever the number of
+pending elements.
 
-A queue inherits threading.Condition object, so can block/notify calling threads
+A filter can be given when removing an element (see L{TrafficShaper<pknyx.stack.trafficShaper>}): elements which
+are not accepted are skipped, and keep their place. A priority step can also be refused as a whole.
+
+If a key function is given, elements of each priority step are stored in one deque per key (per destination for
+the L_DataService output queue), and the filter is only offered the first element of each key: elements of a same
+key are never reordered, and refusing a key costs O(log k) (k being the number of keys with pending elements),
+whatever the number of its pending elements. Elements of different keys are still removed in order of arrival.
+
+A capacity can be given; in this case, adding an element to a full queue raises a B{PriorityQueueFullError}.
+
+A queue inherits threading.Condition object, so can block/notify calling threads. Producers add elements and notify
+the queue while holding it; consumers wait on the queue (with an optional timeout) as long as it is empty. This
+avoids any polling loop.
 
 Usage
 =====
@@ -66,16 +80,16 @@ Usage
 @author: Frédéric Mantegazza
 @copyright: (C) 2013-2015 Frédéric Mantegazza
 @license: GPL
-
-@todo: use Queue.PriorityQueue?
 """
 
 __revision__ = "$Id$"
 
-import copy
+import collections
+import heapq
+import itertools
 import threading
 
-from pknyx.common.exception import PKNyXValueError
+from pknyx.common.exception import PKNyXError, PKNyXValueError
 from pknyx.services.logger import Logger
 
 
@@ -84,13 +98,42 @@ class PriorityQueueValueError(PKNyXValueError):
     """
 
 
+class PriorityQueueFullError(PKNyXError):
+    """
+    """
+
+
 class PriorityQueue(object):
     """ PriorityQueue class
 
     @ivar _priorityDistribution: determines the handling of the different priorities
-    @type _priorityDistribution: list/tuple of int
+    @type _priorityDistribution: tuple of int
+
+    @ivar _count: remaining elements to get for each priority step, before handling lower priorities
+    @type _count: list of int
+
+    @ivar _queue: elements, one deque per priority step (without key)
+    @type _queue: list of L{deque<collections>}
+
+    @ivar _key: function giving the key of an element (None to store elements in a single deque per step)
+    @type _key: callable
+
+    @ivar _keyQueues: elements, with their sequence number, one deque per key and priority step (with key)
+    @type _keyQueues: list of dict of key: L{deque<collections>}
+
+    @ivar _heads: first element sequence number of each key, one heap of (sequence, key) per priority step (with key)
+    @type _heads: list of list
+
+    @ivar _sizes: number of elements of each priority step
+    @type _sizes: list of int
+
+    @ivar _maxsize: max number of elements in the queue (0 means unbounded)
+    @type _maxsize: int
+
+    @ivar _size: number of elements in the queue
+    @type _size: int
     """
-    def __init__(self, prioritySteps, priorityDistribution):
+    def __init__(self, prioritySteps, priorityDistribution, maxsize=0, key=None):
         """ Create a new PriorityQueue
 
         @param prioritySteps: determines the number of priority steps the queue holds
@@ -99,25 +142,77 @@ class PriorityQueue(object):
         @param priorityDistribution: determines the handling of the different priorities
         @type priorityDistribution: list/tuple of int
 
+        @param maxsize: max number of elements in the queue (0 means unbounded)
+        @type maxsize: int
+
+        @param key: function giving the key of an element; elements of a same key keep their order, and are
+                    filtered together (see L{remove})
+        @type key: callable
+
         raise PriorityQueueValueError:
         """
         super(PriorityQueue, self).__init__()
 
-        self._priorityDistribution = priorityDistribution
-
         if prioritySteps < 1:
             raise PriorityQueueValueError("there must be a least one priority step")
 
         if len(priorityDistribution) + 1 != prioritySteps:
             raise PriorityQueueValueError("size of array 'priorityDistribution' must be smaller by one than 'prioritySteps'")
 
-        self._priorityDistribution = priorityDistribution
+        if maxsize < 0:
+            raise PriorityQueueValueError("invalid maxsize (%d)" % maxsize)
 
-        self._count = copy.copy(priorityDistribution)
-        self._queue = prioritySteps * [[]]
+        self._priorityDistribution = tuple(priorityDistribution)
+
+        self._count = list(priorityDistribution)
+        self._key = key
+        if key is None:
+            self._queue = [collections.deque() for i in xrange(prioritySteps)]
+        else:
+            self._keyQueues = [{} for i in xrange(prioritySteps)]
+            self._heads = [[] for i in xrange(prioritySteps)]
+            self._sequence = itertools.count()
+
+        self._maxsize = maxsize
+        self._size = 0
+        self._sizes = [0] * prioritySteps
 
         self._condition = threading.Condition()
 
+    @property
+    def maxsize(self):
+        return self._maxsize
+
+    def qsize(self, level=None):
+        """ Return the number of elements in the queue
+
+        @param level: priority step to count (None counts all steps)
+        @type level: int
+
+        @return: number of elements
+        @rtype: int
+        """
+        if level is None:
+            return self._size
+        else:
+            return self._sizes[level]
+
+    def isEmpty(self):
+        """ Test if the queue is empty
+
+        @return: True if no element is pending in the queue
+        @rtype: bool
+        """
+        return not self._size
+
+    def isFull(self):
+        """ Test if the queue is full
+
+        @return: True if the queue reached its max size
+        @rtype: bool
+        """
+        return 0 < self._maxsize <= self._size
+
     def add(self, obj, priority):
         """ Add an element to the queue
 
@@ -128,33 +223,117 @@ class PriorityQueue(object):
         @type obj: any
 
         @param priority: priority value of the object to add
-        @type priority: int
+        @type priority: L{Priority<pknyx.stack.priority>}
+
+        raise PriorityQueueFullError: queue is full
+        """
+        if self.isFull():
+            raise PriorityQueueFullError("queue is full (%d elements)" % self._size)
+
+        level = priority.level
+        if self._key is None:
+            self._queue[level].append(obj)
+        else:
+            key = self._key(obj)
+            sequence = next(self._sequence)
+            keyQueues = self._keyQueues[level]
+            try:
+                keyQueues[key].append((sequence, obj))
+            except KeyError:
+                keyQueues[key] = collections.deque(((sequence, obj),))
+                heapq.heappush(self._heads[level], (sequence, key))
+        self._size += 1
+        self._sizes[level] += 1
+
+    def _takeKey(self, level, key):
+        """ Remove and return the first element of a key
         """
-        self._queue[priority.level].append(obj)
+        keyQueue = self._keyQueues[level][key]
+        sequence, obj = keyQueue.popleft()
+        if keyQueue:
+            heapq.heappush(self._heads[level], (keyQueue[0][0], key))
+        else:
+            del self._keyQueues[level][key]
 
-        #Logger().debug("PriorityQueue.add(): _queue=%s" % repr(self._queue))
+        return obj
 
-    def remove(self):
-        """ Removes and returns the next element from this queue
+    def _take(self, level, accept):
+        """ Remove and return the first accepted element of a priority step
 
-        @return: the next element from this queue (None if queue is empty)
+        @return: accepted element (None if no element is accepted)
         """
-        for i in range(len(self._queue) - 1):
-            if self._count[i] == 0:
-                self._count[i] = distr[i]
-            elif len(self._queue[i]):
-                if self._count[i] > 0:
-                    self._count[i] -= 1
-                return self._queue[i].pop(0)
+        obj = None
+        if self._key is None:
+            queue = self._queue[level]
+            if accept is None:
+                obj = queue.popleft()
+            else:
+                for index, candidate in enumerate(queue):
+                    if accept(candidate, level):
+                        del queue[index]
+                        obj = candidate
+                        break
+                else:
+                    return None
+
+        else:
+            heads = self._heads[level]
+            if accept is None:
+                obj = self._takeKey(level, heapq.heappop(heads)[1])
+            else:
+
+                # Only offer the first element of each key, in order of arrival
+                refused = []
+                while heads:
+                    head = heapq.heappop(heads)
+                    if accept(self._keyQueues[level][head[1]][0][1], level):
+                        obj = self._takeKey(level, head[1])
+                        break
+                    refused.append(head)
+                for head in refused:
+                    heapq.heappush(heads, head)
+                if obj is None:
+                    return None
+
+        self._size -= 1
+        self._sizes[level] -= 1
+
+        return obj
+
+    def remove(self, accept=None, acceptLevel=None):
+        """ Removes and returns the next element from this queue
 
-        while i >= 0:
-            if len(self._queue[i]):
-                return self._queue[i].pop(0)
-            i -= 1
+        @param accept: function called with the candidate elements and their priority step, in removing order,
+                       until it returns True. Refused elements keep their place in the queue. If None, the first
+                       candidate is removed. With a key, only the first element of each key is a candidate
+        @type accept: callable
 
-        #Logger().debug("PriorityQueue.remove(): _queue=%s" % repr(self._queue))
+        @param acceptLevel: function called with the priority steps having elements, before their candidates; if it
+                            returns False, the whole step is skipped
+        @type acceptLevel: callable
 
-        return None
+        @return: the next element from this queue (None if queue is empty, or if no element is accepted)
+        """
+        if not self._size:
+            return None
+
+        sizes = self._sizes
+        last = len(sizes) - 1
+        for i in xrange(last):
+            if self._count[i] == 0:
+                self._count[i] = self._priorityDistribution[i]
+            elif sizes[i] and (acceptLevel is None or acceptLevel(i)):
+                obj = self._take(i, accept)
+                if obj is not None:
+                    if self._count[i] > 0:
+                        self._count[i] -= 1
+                    return obj
+
+        for i in xrange(last, -1, -1):
+            if sizes[i] and (acceptLevel is None or acceptLevel(i)):
+                obj = self._take(i, accept)
+                if obj is not None:
+                    return obj
 
     def acquire(self):
         self._condition.acquire()
@@ -162,20 +341,32 @@ class PriorityQueue(object):
     def release(self):
         self._condition.release()
 
-    def wait(self):
-        self._condition.wait()
+    def wait(self, timeout=None):
+        """ Wait for a notification
+
+        Must be called with the queue acquired.
+
+        @param timeout: max time to wait, in s (None blocks until notified)
+        @type timeout: float
+        """
+        self._condition.wait(timeout)
+
+    def notify(self, n=1):
+        """ Wake up threads waiting on this queue
 
-    def notify(self):
-        self._condition.notify()
+        Must be called with the queue acquired.
+        """
+        self._condition.notify(n)
 
     def notifyAll(self):
         self._condition.notifyAll()
 
 
-
 if __name__ == '__main__':
     import unittest
 
+    from pknyx.stack.priority import Priority
+
     # Mute logger
     Logger().setLevel('error')
 
@@ -183,7 +374,7 @@ if __name__ == '__main__':
     class PriorityQueueTestCase(unittest.TestCase):
 
         def setUp(self):
-            pass
+            self.queue = PriorityQueue(4, (-1, 3, 2))
 
         def tearDown(self):
             pass
@@ -191,5 +382,114 @@ if __name__ == '__main__':
         def test_constructor(self):
             pass
 
+        def test_wait(self):
+            result = []
+
+            def consumer():
+                self.queue.acquire()
+                try:
+                    while self.queue.isEmpty():
+                        self.queue.wait(1)
+                    result.append(self.queue.remove())
+                finally:
+                    self.queue.release()
+
+            thread = threading.Thread(target=consumer)
+            thread.start()
+            self.queue.acquire()
+            try:
+                self.queue.add("obj", Priority('low'))
+                self.queue.notify()
+            finally:
+                self.queue.release()
+            thread.join(1)
+            self.assertEqual(result, ["obj"])
+            self.assertTrue(self.queue.isEmpty())
+
+        def test_distribution(self):
+            queue = PriorityQueue(3, (-1, 3))
+            for i in xrange(3):
+                queue.add((0, i), Priority(0))
+            for i in xrange(5):
+                queue.add((1, i), Priority(1))
+            for i in xrange(2):
+                queue.add((2, i), Priority(2))
+            self.assertEqual(queue.qsize(), 10)
+            self.assertEqual(queue.qsize(1), 5)
+            result = [queue.remove() for i in xrange(10)]
+            self.assertEqual(result, [(0, 0), (0, 1), (0, 2),
+                                      (1, 0), (1, 1), (1, 2),
+                                      (2, 0),
+                                      (1, 3), (1, 4),
+                                      (2, 1)])
+            self.assertIs(queue.remove(), None)
+            self.assertEqual(queue.qsize(), 0)
+
+        def test_maxsize(self):
+            queue = PriorityQueue(4, (-1, 3, 2), maxsize=2)
+            queue.add("obj1", Priority('low'))
+            queue.add("obj2", Priority('system'))
+            self.assertTrue(queue.isFull())
+            with self.assertRaises(PriorityQueueFullError):
+                queue.add("obj3", Priority('normal'))
+            self.assertEqual(queue.remove(), "obj2")
+            self.assertFalse(queue.isFull())
+            with self.assertRaises(PriorityQueueValueError):
+                PriorityQueue(4, (-1, 3, 2), maxsize=-1)
+
+        def test_accept(self):
+            queue = PriorityQueue(3, (-1, 3))
+            for i in xrange(3):
+                queue.add((0, i), Priority(0))
+            for i in xrange(2):
+                queue.add((2, i), Priority(2))
+            accepted = []
+
+            def accept(obj, level):
+                accepted.append((obj, level))
+                return obj[1] == 1
+
+            self.assertEqual(queue.remove(accept), (0, 1))
+            self.assertEqual(accepted, [((0, 0), 0), ((0, 1), 0)])
+            self.assertEqual(queue.remove(lambda obj, level: level == 2), (2, 0))
+            self.assertIs(queue.remove(lambda obj, level: False), None)
+            self.assertEqual(queue.qsize(), 3)
+            self.assertEqual([queue.remove() for i in xrange(3)], [(0, 0), (0, 2), (2, 1)])
+
+        def test_acceptLevel(self):
+            queue = PriorityQueue(3, (-1, 3))
+            queue.add((0, 0), Priority(0))
+            queue.add((2, 0), Priority(2))
+            self.assertEqual(queue.remove(acceptLevel=lambda level: level != 0), (2, 0))
+            self.assertIs(queue.remove(acceptLevel=lambda level: False), None)
+            self.assertEqual(queue.remove(), (0, 0))
+
+        def test_key(self):
+            queue = PriorityQueue(3, (-1, 3), key=lambda obj: obj[0])
+            for obj in (("a", 0), ("a", 1), ("b", 0), ("a", 2), ("c", 0)):
+                queue.add(obj, Priority(2))
+            queue.add(("a", 3), Priority(0))
+            self.assertEqual(queue.qsize(2), 5)
+            accepted = []
+
+            def accept(obj, level):
+                accepted.append(obj)
+                return obj[0] != "a"
+
+            self.assertEqual(queue.remove(accept), ("b", 0))
+            self.assertEqual(accepted, [("a", 3), ("a", 0), ("b", 0)])
+            self.assertEqual(queue.remove(accept), ("c", 0))
+            self.assertIs(queue.remove(accept), None)
+            self.assertEqual(queue.qsize(), 4)
+            self.assertEqual([queue.remove() for i in xrange(5)], [("a", 3), ("a", 0), ("a", 1), ("a", 2), None])
+            self.assertEqual(queue.qsize(2), 0)
+
+        def test_keyOrder(self):
+            queue = PriorityQueue(3, (-1, 3), key=lambda obj: obj[0])
+            objs = [("a", 0), ("a", 1), ("b", 0), ("a", 2), ("c", 0), ("b", 1)]
+            for obj in objs:
+                queue.add(obj, Priority(1))
+            self.assertEqual([queue.remove() for i in xrange(6)], objs)
+
 
     unittest.main()
@@ -39,6 +39,10 @@ Implements
 Documentation
 =============
 
+On start, a GroupValue_Read is sent for each Group having at least one GroupObject with the 'init' flag on. Reads
+are sent by an L{InitReadScheduler<pknyx.stack.initReadScheduler>}, within the bus budget, and answers are
+tracked; start() does not wait for them (see L{initReadScheduler<Stack.initReadScheduler>}).
+
 Usage
 =====
 
@@ -51,6 +55,7 @@ __revision__ = "$Id$"
 
 import time
 
+from pknyx.common import config
 from pknyx.common.exception import PKNyXValueError
 from pknyx.services.logger import Logger
 from pknyx.stack.individualAddress import IndividualAddress
@@ -59,7 +64,8 @@ from pknyx.stack.layer4.t_groupDataService import T_GroupDataService
 from pknyx.stack.layer3.n_groupDataService import N_GroupDataService
 from pknyx.stack.layer2.l_dataService import L_DataService
 from pknyx.stack.transceiver.udpTransceiver import UDPTransceiver
-from pknyx.stack.priority import Priority
+from pknyx.stack.initReadScheduler import InitReadScheduler
+from pknyx.stack.groupValueCache import GroupValueCache
 
 
 class StackValueError(PKNyXValueError):
@@ -84,67 +90,147 @@ class Stack(object):
 
     @ivar _tc: transciever
     @type _tc: L{Transceiver<pknyx.stack.transceiver.transceiver>}
+
+    @ivar _eventLoop: event loop running the lower layers (None to use dedicated threads)
+    @type _eventLoop: L{EventLoop<pknyx.stack.eventLoop>}
+
+    @ivar _individualAddress: own Individual Address
+    @type _individualAddress: L{IndividualAddress}
+
+    @ivar _shared: True if the link layer (and transceiver) is shared with other stacks
+    @type _shared: bool
+
+    @ivar _initReadScheduler: scheduler of the init reads
+    @type _initReadScheduler: L{InitReadScheduler}
+
+    @ivar _groupValueCache: last known values of group addresses (None if not used)
+    @type _groupValueCache: L{GroupValueCache}
     """
     PRIORITY_DISTRIBUTION = (-1, 3, 2)
 
     def __init__(self, individualAddress=IndividualAddress("0.0.0"),
-                 transCls=UDPTransceiver, transParams=dict(mcastAddr="224.0.23.12", mcastPort=3671)):
+                 transCls=UDPTransceiver, transParams=dict(mcastAddr="224.0.23.12", mcastPort=3671),
+                 denseGroupTable=False, eventLoop=None, lds=None, groupValueCache=None):
         """
 
+        @param denseGroupTable: if True, use a dense (65536 entries) group routing table, for large installations
+        @type denseGroupTable: bool
+
+        @param eventLoop: event loop running the link layer and the transceiver, which can be shared by several
+                          stacks. If None, they run in their own threads
+        @type eventLoop: L{EventLoop<pknyx.stack.eventLoop>}
+
+        @param lds: link layer shared by several stacks (see L{DeviceHost<pknyx.core.deviceHost>}). If given,
+                    the stack does not create its own link layer and transceiver, and transCls, transParams and
+                    eventLoop are not used
+        @type lds: L{L_DataService}
+
+        @param groupValueCache: if True, keep the last known value of all group addresses seen on the bus
+                                (default to config.STACK_GROUP_VALUE_CACHE)
+        @type groupValueCache: bool
+
         raise StackValueError:
         """
         super(Stack, self).__init__()
         if not isinstance(individualAddress, IndividualAddress):
             individualAddress = IndividualAddress(individualAddress)
 
-        self._lds = L_DataService(Stack.PRIORITY_DISTRIBUTION, individualAddress)
-        self._tc = transCls(self._lds, **transParams)
-        self._ngds = N_GroupDataService(self._lds)
+        self._individualAddress = individualAddress
+        self._shared = lds is not None
+        if self._shared:
+            self._eventLoop = None
+            self._lds = lds
+            self._tc = None
+            self._ngds = N_GroupDataService(self._lds, individualAddress=individualAddress)
+        else:
+            self._eventLoop = eventLoop
+            self._lds = L_DataService(Stack.PRIORITY_DISTRIBUTION, individualAddress, eventLoop)
+            if eventLoop is not None:
+                transParams = dict(transParams, eventLoop=eventLoop)
+            self._tc = transCls(self._lds, **transParams)
+            self._ngds = N_GroupDataService(self._lds)
         self._tgds = T_GroupDataService(self._ngds)
-        self._agds = A_GroupDataService(self._tgds)
+        if groupValueCache is None:
+            groupValueCache = config.STACK_GROUP_VALUE_CACHE
+        if groupValueCache:
+            self._groupValueCache = GroupValueCache()
+        else:
+            self._groupValueCache = None
+        self._agds = A_GroupDataService(self._tgds, denseGroupTable, self._groupValueCache)
+        self._initReadScheduler = InitReadScheduler()
+
+    @property
+    def tc(self):
+        return self._tc
 
     @property
     def agds(self):
         return self._agds
 
+    @property
+    def eventLoop(self):
+        return self._eventLoop
+
     @property
     def individualAddress(self):
-        return self._lds.individualAddress
+        return self._individualAddress
+
+    @property
+    def shared(self):
+        return self._shared
+
+    @property
+    def initReadScheduler(self):
+        return self._initReadScheduler
+
+    @property
+    def groupValueCache(self):
+        return self._groupValueCache
 
     def start(self):
         """ Start the stack threads
+
+        When running in an event loop, the loop is started if needed. When the link layer is shared, it must be
+        started by its owner.
+
+        Init reads are sent in background; use L{initReadScheduler} to wait for their answers.
         """
         Logger().trace("Stack.start()")
 
-        self._lds.start()
-        self._tc.start()
-
-        time.sleep(0.25)
+        if not self._shared:
+            self._lds.start()
+            self._tc.start()
 
         # Iterate over Group to find those which need to send a initial read request
         # (depending on GroupObject init flag)
         Logger().debug("Stack.start(): initiate a read request for Group having at least one GroupObject with 'init' flag on")
+        groups = []
         for group in self._agds.groups.itervalues():
             for listener in group.listeners:
                 try:
                     if listener.flags.init:
-                        group.read(priority=Priority())
-                        time.sleep(0.1)  # avoid bus saturation
+                        groups.append(group)
                         break
                 except AttributeError:
                     Logger().exception("Stack.start(): listener does not seem to be a GroupObject", debug=True)
+        self._initReadScheduler.start(groups)
 
         Logger().debug("Stack.start(): running")
 
     def stop(self):
         """ Stop the stack threads
+
+        When running in an event loop, the loop is not stopped, as it may be shared by other stacks.
         """
         Logger().trace("Stack.stop()")
 
-        self._tc.stop()
-        self._lds.stop()
-        self._tc.join()
-        self._lds.join()
+        self._initReadScheduler.stop()
+
+        if not self._shared:
+            self._tc.stop()
+            self._lds.stop()
+            self._tc.join()
+            self._lds.join()
 
         Logger().debug("Stack.stop(): stopped")
 
@@ -164,10 +250,21 @@ class Stack(object):
 if __name__ == '__main__':
     import unittest
 
+    from pknyx.core.datapoint import Datapoint
+    from pknyx.core.groupObject import GroupObject
+    from pknyx.stack.groupAddress import GroupAddress
+    from pknyx.stack.priority import Priority
+    from pknyx.stack.transceiver.loopbackTransceiver import LoopbackBus, LoopbackTransceiver
+
     # Mute logger
     Logger().setLevel('error')
 
 
+    class OwnerTest(object):
+        def notify(self, dp, oldValue, newValue):
+            pass
+
+
     class StackTestCase(unittest.TestCase):
 
         def setUp(self):
@@ -179,5 +276,57 @@ if __name__ == '__main__':
         def test_constructor(self):
             pass
 
+        def test_initRead(self):
+            bus = LoopbackBus()
+            stack1 = Stack("1.1.1", transCls=LoopbackTransceiver, transParams=dict(bus=bus))
+            stack2 = Stack("1.1.2", transCls=LoopbackTransceiver, transParams=dict(bus=bus))
+            owner = OwnerTest()
+            datapoints = []
+            for i in xrange(10):
+                gad = GroupAddress(i + 1)
+                datapoint = Datapoint(owner, "dp_%d" % i, "output", "1.001", default="Off")
+                groupObject = GroupObject(datapoint, flags="CWUI")
+                groupObject.group = stack1.agds.subscribe(gad, groupObject)
+                datapoints.append(datapoint)
+                if i < 9:
+                    datapoint = Datapoint(owner, "dp_%d" % i, "output", "1.001", default="On")
+                    groupObject = GroupObject(datapoint, flags="CRT")
+                    groupObject.group = stack2.agds.subscribe(gad, groupObject)
+            stack1._initReadScheduler = InitReadScheduler(rate=1000., timeout=0.2, retries=1)
+            stack2.start()
+            stack1.start()
+            try:
+                self.assertTrue(stack1.initReadScheduler.wait(2.))
+                self.assertEqual(len(stack1.initReadScheduler.answered), 9)
+                self.assertEqual(stack1.initReadScheduler.failed, frozenset([GroupAddress(10)]))
+                self.assertEqual([datapoint.value for datapoint in datapoints], ["On"] * 9 + ["Off"])
+            finally:
+                stack1.stop()
+                stack2.stop()
+
+        def test_readValue(self):
+            bus = LoopbackBus()
+            stack1 = Stack("1.1.1", transCls=LoopbackTransceiver, transParams=dict(bus=bus))
+            stack2 = Stack("1.1.2", transCls=LoopbackTransceiver, transParams=dict(bus=bus))
+            self.assertIs(Stack(groupValueCache=False).groupValueCache, None)
+            datapoint = Datapoint(OwnerTest(), "dp", "output", "1.001", default="On")
+            groupObject = GroupObject(datapoint, flags="CR")  # changes are not transmitted
+            groupObject.group = stack2.agds.subscribe("1/1/1", groupObject)
+            group = stack1.agds.subscribe("1/1/1", GroupObject(Datapoint(OwnerTest(), "dp", "input", "1.001")))
+            stack2.start()
+            stack1.start()
+            try:
+                value = group.readValue(Priority("low"), maxAge=10., timeout=1.)
+                self.assertEqual((value.src, value.data), (stack2.individualAddress, bytearray("\x01")))
+                self.assertIs(group.readValue(Priority("low"), maxAge=10.), value)
+                datapoint.value = "Off"
+                self.assertIs(group.readValue(Priority("low"), maxAge=10.), value)
+                value = group.readValue(Priority("low"), maxAge=0, timeout=1.)
+                self.assertEqual(value.data, bytearray("\x00"))
+                self.assertIs(group.readValue(Priority("low"), timeout=0.01), value)
+            finally:
+                stack1.stop()
+                stack2.stop()
+
 
     unittest.main()
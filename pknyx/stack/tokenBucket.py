@@ -0,0 +1,206 @@
+# -*- coding: utf-8 -*-
+
+""" Python KNX framework
+
+License
+=======
+
+ - B{pKNyX} (U{http://www.pknyx.org}) is Copyright:
+  - (C) 2013-2015 Frédéric Mantegazza
+
+This program is free software; you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation; either version 2 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program; if not, write to the Free Software
+Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+
+or see:
+
+ - U{http://www.gnu.org/licenses/gpl.html}
+
+Module purpose
+==============
+
+Bus budget management
+
+Implements
+==========
+
+ - B{TokenBucket}
+ - B{TokenBucketValueError}
+
+Documentation
+=============
+
+Rate limiter: tokens are added at a constant rate, up to the bucket capacity; each telegram takes one token. The
+bucket starts full, so up to capacity telegrams can be sent in a row.
+
+The bucket is not thread-safe: callers must protect it.
+
+Usage
+=====
+
+>>> bucket = TokenBucket(rate=10., capacity=2)
+>>> bucket.consume()
+0.0
+>>> bucket.consume()
+0.0
+>>> bucket.consume()
+0.1
+
+@author: Frédéric Mantegazza
+@copyright: (C) 2013-2015 Frédéric Mantegazza
+@license: GPL
+"""
+
+__revision__ = "$Id$"
+
+import time
+
+from pknyx.common.exception import PKNyXValueError
+from pknyx.services.logger import Logger
+
+
+class TokenBucketValueError(PKNyXValueError):
+    """
+    """
+
+
+class TokenBucket(object):
+    """ TokenBucket class
+
+    @ivar _rate: tokens added per second
+    @type _rate: float
+
+    @ivar _capacity: max number of tokens (number of telegrams which can be sent in a row)
+    @type _capacity: float
+
+    @ivar _tokens: available tokens
+    @type _tokens: float
+
+    @ivar _lastTime: time of the last refill
+    @type _lastTime: float
+    """
+    def __init__(self, rate, capacity=1):
+        """
+
+        @param rate: tokens added per second
+        @type rate: float
+
+        @param capacity: max number of tokens (the bucket starts full)
+        @type capacity: int
+
+        raise TokenBucketValueError:
+        """
+        super(TokenBucket, self).__init__()
+
+        if rate <= 0:
+            raise TokenBucketValueError("invalid rate (%r)" % rate)
+        if capacity < 1:
+            raise TokenBucketValueError("invalid capacity (%r)" % capacity)
+
+        self._rate = float(rate)
+        self._capacity = float(capacity)
+        self._tokens = self._capacity
+        self._lastTime = time.time()
+
+    @property
+    def rate(self):
+        return self._rate
+
+    @property
+    def capacity(self):
+        return self._capacity
+
+    def _refill(self, now):
+        """ Add the tokens accumulated since last refill
+        """
+        self._tokens = min(self._capacity, self._tokens + max(0., now - self._lastTime) * self._rate)
+        self._lastTime = now
+
+    def delay(self, now=None):
+        """ Get the delay until a token is available, without taking it
+
+        @param now: current time (default to time.time())
+        @type now: float
+
+        @return: 0. if a token is available, delay until a token is available otherwise, in s
+        @rtype: float
+        """
+        if now is None:
+            now = time.time()
+
+        self._refill(now)
+
+        if self._tokens >= 1.:
+            return 0.
+        else:
+            return (1. - self._tokens) / self._rate
+
+    def consume(self, now=None):
+        """ Take a token, if available
+
+        @param now: current time (default to time.time())
+        @type now: float
+
+        @return: 0. if a token has been taken, delay until a token is available otherwise, in s
+        @rtype: float
+        """
+        delay = self.delay(now)
+        if not delay:
+            self._tokens -= 1.
+
+        return delay
+
+
+if __name__ == '__main__':
+    import unittest
+
+    # Mute logger
+    Logger().setLevel('error')
+
+
+    class TokenBucketTestCase(unittest.TestCase):
+
+        def setUp(self):
+            pass
+
+        def tearDown(self):
+            pass
+
+        def test_constructor(self):
+            with self.assertRaises(TokenBucketValueError):
+                TokenBucket(0.)
+            with self.assertRaises(TokenBucketValueError):
+                TokenBucket(10., 0)
+
+        def test_consume(self):
+            bucket = TokenBucket(10., 2)
+            now = time.time()
+            self.assertEqual(bucket.consume(now), 0.)
+            self.assertEqual(bucket.consume(now), 0.)
+            self.assertAlmostEqual(bucket.consume(now), 0.1)
+            self.assertAlmostEqual(bucket.consume(now + 0.05), 0.05)
+            self.assertEqual(bucket.consume(now + 0.11), 0.)
+            self.assertEqual(bucket.consume(now + 10.), 0.)
+            self.assertEqual(bucket.consume(now + 10.), 0.)  # capacity reached
+            self.assertNotEqual(bucket.consume(now + 10.), 0.)
+
+        def test_delay(self):
+            bucket = TokenBucket(10.)
+            now = time.time()
+            self.assertEqual(bucket.delay(now), 0.)
+            self.assertEqual(bucket.delay(now), 0.)
+            self.assertEqual(bucket.consume(now), 0.)
+            self.assertAlmostEqual(bucket.delay(now), 0.1)
+
+
+    unittest.main()
@@ -0,0 +1,422 @@
+# -*- coding: utf-8 -*-
+
+""" Python KNX framework
+
+License
+=======
+
+ - B{pKNyX} (U{http://www.pknyx.org}) is Copyright:
+  - (C) 2013-2015 Frédéric Mantegazza
+
+This program is free software; you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation; either version 2 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program; if not, write to the Free Software
+Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+
+or see:
+
+ - U{http://www.gnu.org/licenses/gpl.html}
+
+Module purpose
+==============
+
+Bus budget management
+
+Implements
+==========
+
+ - B{TrafficShaper}
+ - B{TrafficShaperValueError}
+
+Documentation
+=============
+
+The shaper decides which pending transmission of the L{L_DataService<pknyx.stack.layer2.l_dataService>} output
+queue can be sent now. Transmissions are not dropped: they wait in the queue until they are allowed.
+
+Limits:
+ - global bus budget: token bucket, in telegrams/s (should match the line behind the KNXnet/IP router: about 50
+   telegrams/s for a 9600 bit/s TP1 line);
+ - per priority budget: one token bucket per priority level;
+ - per GAD min interval between 2 transmissions.
+
+A transmission which is not allowed keeps its place; the next ones (lower priorities, or other GADs) can be sent
+in the meantime. Order of the transmissions of a same GAD, and priority, is kept.
+
+The output queue should be keyed by destination (see L{PriorityQueue<pknyx.stack.priorityQueue>}): the shaper then
+only checks the first pending transmission of each GAD, and a priority level without budget is skipped at once, so
+a backlog on a GAD waiting for its min interval does not slow down the selection.
+
+The shaper also handles the KNXnet/IP routing flow control: when a ROUTING_BUSY is received, transmissions are
+suspended for the requested wait time, plus a random time growing with the number of ROUTING_BUSY received in a
+row (simplified version of the KNXnet/IP routing specification).
+
+The shaper is not thread-safe: it is protected by the output queue lock.
+
+Usage
+=====
+
+>>> shaper = TrafficShaper(rate=40., burst=10, priorityRates={'low': 20.}, minInterval=0.1)
+>>> shaper.setMinInterval(GroupAddress("1/1/1"), 1.)
+>>> transmission, delay = shaper.select(queue)
+
+@author: Frédéric Mantegazza
+@copyright: (C) 2013-2015 Frédéric Mantegazza
+@license: GPL
+"""
+
+__revision__ = "$Id$"
+
+import random
+import time
+
+from pknyx.common.exception import PKNyXValueError
+from pknyx.services.logger import Logger
+from pknyx.stack.priority import Priority
+from pknyx.stack.tokenBucket import TokenBucket
+
+
+class TrafficShaperValueError(PKNyXValueError):
+    """
+    """
+
+
+class TrafficShaper(object):
+    """ TrafficShaper class
+
+    @ivar _bucket: global bus budget (None for no limit)
+    @type _bucket: L{TokenBucket}
+
+    @ivar _buckets: bus budget of each priority level (None for no limit)
+    @type _buckets: list of L{TokenBucket}
+
+    @ivar _minInterval: default min interval between 2 transmissions on the same GAD, in s
+    @type _minInterval: float
+
+    @ivar _minIntervals: min interval of specific GADs
+    @type _minIntervals: dict of L{GroupAddress}: float
+
+    @ivar _lastSends: time of the last transmission of each GAD having a min interval
+    @type _lastSends: dict of L{GroupAddress}: float
+
+    @ivar _busyUntil: time until which transmissions are suspended (ROUTING_BUSY)
+    @type _busyUntil: float
+
+    @ivar _busyCount: number of ROUTING_BUSY received in a row
+    @type _busyCount: int
+
+    @ivar _delay: delay until the next refused transmission can be sent, computed while selecting
+    @type _delay: float
+
+    @ivar _delayed: number of selections which have been delayed
+    @type _delayed: int
+    """
+    BUSY_RANDOM_TIME = 0.05  # random wait time added for each ROUTING_BUSY received in a row, in s
+    BUSY_SLOW_DURATION = 0.1  # time, for each ROUTING_BUSY received in a row, before the counter is reset, in s
+    BUSY_MIN_INTERVAL = 0.01  # ROUTING_BUSY received closer than this are counted once, in s
+
+    def __init__(self, rate=None, burst=1, priorityRates=None, minInterval=0.):
+        """
+
+        @param rate: global bus budget, in telegrams/s (None for no limit)
+        @type rate: float
+
+        @param burst: number of telegrams which can be sent in a row (for each budget)
+        @type burst: int
+
+        @param priorityRates: bus budget of priorities, in telegrams/s (missing priorities are not limited)
+        @type priorityRates: dict of str or int: float
+
+        @param minInterval: default min interval between 2 transmissions on the same GAD, in s (0 for no limit)
+        @type minInterval: float
+
+        raise TrafficShaperValueError:
+        """
+        super(TrafficShaper, self).__init__()
+
+        if rate is not None and rate <= 0:
+            raise TrafficShaperValueError("invalid rate (%r)" % rate)
+        if burst < 1:
+            raise TrafficShaperValueError("invalid burst (%r)" % burst)
+        if minInterval < 0:
+            raise TrafficShaperValueError("invalid min interval (%r)" % minInterval)
+
+        if rate is not None:
+            self._bucket = TokenBucket(rate, burst)
+        else:
+            self._bucket = None
+
+        self._buckets = [None] * 4
+        if priorityRates is not None:
+            for priority, priorityRate in priorityRates.iteritems():
+                if priorityRate is None:
+                    continue
+                if priorityRate <= 0:
+                    raise TrafficShaperValueError("invalid rate for priority %r (%r)" % (priority, priorityRate))
+                self._buckets[Priority(priority).level] = TokenBucket(priorityRate, burst)
+
+        self._minInterval = minInterval
+        self._minIntervals = {}
+        self._lastSends = {}
+
+        self._busyUntil = 0.
+        self._busyCount = 0
+        self._lastBusy = 0.
+
+        self._now = 0.
+        self._delay = None
+        self._delayed = 0
+
+        self._limited = self._bucket is not None or any(self._buckets) or bool(minInterval)
+
+    @property
+    def delayed(self):
+        return self._delayed
+
+    @property
+    def busyCount(self):
+        return self._busyCount
+
+    def setMinInterval(self, gad, interval):
+        """ Set the min interval between 2 transmissions on the given GAD
+
+        @param gad: GAD
+        @type gad: L{GroupAddress}
+
+        @param interval: min interval, in s (None to use the default one)
+        @type interval: float
+
+        raise TrafficShaperValueError:
+        """
+        if interval is None:
+            self._minIntervals.pop(gad, None)
+        elif interval < 0:
+            raise TrafficShaperValueError("invalid min interval (%r)" % interval)
+        else:
+            self._minIntervals[gad] = interval
+            self._limited = True
+
+    def routingBusy(self, waitTime, now=None):
+        """ Suspend transmissions, on ROUTING_BUSY reception
+
+        @param waitTime: wait time requested by the router, in s
+        @type waitTime: float
+
+        @param now: current time (default to time.time())
+        @type now: float
+        """
+        if now is None:
+            now = time.time()
+
+        if now - self._lastBusy >= TrafficShaper.BUSY_MIN_INTERVAL:
+            self._busyCount += 1
+        self._lastBusy = now
+        busyUntil = now + waitTime + random.random() * self._busyCount * TrafficShaper.BUSY_RANDOM_TIME
+        self._busyUntil = max(self._busyUntil, busyUntil)
+
+    def _acceptLevel(self, level):
+        """ Check if the budget of a priority level allows a transmission now
+        """
+        bucket = self._buckets[level]
+        if bucket is not None:
+            delay = bucket.delay(self._now)
+            if delay:
+                if self._delay is None or delay < self._delay:
+                    self._delay = delay
+                return False
+
+        return True
+
+    def _accept(self, transmission, level):
+        """ Check if a transmission can be sent now (and take its tokens)
+
+        The priority level budget has already been checked by L{_acceptLevel}.
+        """
+        gad = transmission.destination
+        interval = self._minIntervals.get(gad, self._minInterval)
+        if interval:
+            lastSend = self._lastSends.get(gad)
+            if lastSend is not None and self._now - lastSend < interval:
+                delay = lastSend + interval - self._now
+                if self._delay is None or delay < self._delay:
+                    self._delay = delay
+                return False
+            self._lastSends[gad] = self._now
+
+        bucket = self._buckets[level]
+        if bucket is not None:
+            bucket.consume(self._now)
+        if self._bucket is not None:
+            self._bucket.consume(self._now)
+
+        return True
+
+    def select(self, queue, now=None):
+        """ Remove the next transmission which can be sent now
+
+        Must be called with the queue acquired.
+
+        @param queue: output queue
+        @type queue: L{PriorityQueue<pknyx.stack.priorityQueue>}
+
+        @param now: current time (default to time.time())
+        @type now: float
+
+        @return: transmission to send now (None if none can be sent), and delay until one can be sent (None if no
+                 transmission is pending)
+        @rtype: tuple of (L{Transmission<pknyx.stack.transceiver.transmission>}, float)
+        """
+        if queue.isEmpty():
+            return None, None
+
+        if now is None:
+            now = time.time()
+
+        if self._busyCount:
+            if now < self._busyUntil:
+                self._delayed += 1
+                return None, self._busyUntil - now
+            elif now - self._busyUntil > self._busyCount * TrafficShaper.BUSY_SLOW_DURATION:
+                self._busyCount = 0
+
+        if not self._limited:
+            return queue.remove(), 0.
+
+        if self._bucket is not None:
+            delay = self._bucket.delay(now)
+            if delay:
+                self._delayed += 1
+                return None, delay
+
+        self._now = now
+        self._delay = None
+        transmission = queue.remove(self._accept, self._acceptLevel)
+        if transmission is None:
+            self._delayed += 1
+            return None, self._delay
+
+        return transmission, 0.
+
+
+if __name__ == '__main__':
+    import unittest
+
+    from pknyx.stack.groupAddress import GroupAddress
+    from pknyx.stack.priorityQueue import PriorityQueue
+    from pknyx.stack.transceiver.transmission import Transmission
+
+    # Mute logger
+    Logger().setLevel('error')
+
+
+    class TrafficShaperTestCase(unittest.TestCase):
+
+        def setUp(self):
+            self.queue = PriorityQueue(4, (-1, 3, 2), key=lambda transmission: transmission.destination)
+
+        def tearDown(self):
+            pass
+
+        def _add(self, gad, priority="low"):
+            transmission = Transmission(bytearray(1), destination=GroupAddress(gad))
+            self.queue.add(transmission, Priority(priority))
+            return transmission
+
+        def test_constructor(self):
+            with self.assertRaises(TrafficShaperValueError):
+                TrafficShaper(rate=0.)
+            with self.assertRaises(TrafficShaperValueError):
+                TrafficShaper(burst=0)
+            with self.assertRaises(TrafficShaperValueError):
+                TrafficShaper(priorityRates={'low': 0.})
+            with self.assertRaises(TrafficShaperValueError):
+                TrafficShaper(minInterval=-1.)
+
+        def test_unlimited(self):
+            shaper = TrafficShaper()
+            self.assertEqual(shaper.select(self.queue), (None, None))
+            transmission = self._add("1/1/1")
+            self.assertEqual(shaper.select(self.queue), (transmission, 0.))
+
+        def test_rate(self):
+            shaper = TrafficShaper(rate=10., burst=2)
+            transmissions = [self._add("1/1/1") for i in xrange(3)]
+            now = time.time()
+            self.assertIs(shaper.select(self.queue, now)[0], transmissions[0])
+            self.assertIs(shaper.select(self.queue, now)[0], transmissions[1])
+            transmission, delay = shaper.select(self.queue, now)
+            self.assertIs(transmission, None)
+            self.assertAlmostEqual(delay, 0.1, places=3)
+            self.assertEqual(shaper.delayed, 1)
+            self.assertIs(shaper.select(self.queue, now + 0.11)[0], transmissions[2])
+
+        def test_priorityRates(self):
+            shaper = TrafficShaper(priorityRates={'low': 10.})
+            low1 = self._add("1/1/1")
+            low2 = self._add("1/1/1")
+            normal = self._add("1/1/2", "normal")
+            now = time.time()
+            self.assertIs(shaper.select(self.queue, now)[0], normal)
+            self.assertIs(shaper.select(self.queue, now)[0], low1)
+            transmission, delay = shaper.select(self.queue, now)
+            self.assertIs(transmission, None)
+            self.assertAlmostEqual(delay, 0.1, places=3)
+            self.assertIs(shaper.select(self.queue, now + 0.11)[0], low2)
+
+        def test_minInterval(self):
+            shaper = TrafficShaper(minInterval=0.5)
+            shaper.setMinInterval(GroupAddress("1/1/2"), 0.)
+            t1 = self._add("1/1/1")
+            t2 = self._add("1/1/1")
+            t3 = self._add("1/1/2")
+            t4 = self._add("1/1/2")
+            t5 = self._add("1/1/3")
+            now = time.time()
+            self.assertEqual([shaper.select(self.queue, now)[0] for i in xrange(4)], [t1, t3, t4, t5])
+            transmission, delay = shaper.select(self.queue, now + 0.1)
+            self.assertIs(transmission, None)
+            self.assertAlmostEqual(delay, 0.4, places=3)
+            self.assertIs(shaper.select(self.queue, now + 0.51)[0], t2)
+
+        def test_minIntervalBacklog(self):
+            shaper = TrafficShaper(minInterval=0.5)
+            busy = [self._add("1/1/1") for i in xrange(1000)]
+            other = self._add("1/1/2")
+            checked = []
+            accept = shaper._accept
+            shaper._accept = lambda transmission, level: checked.append(transmission) or accept(transmission, level)
+            now = time.time()
+            self.assertIs(shaper.select(self.queue, now)[0], busy[0])
+            self.assertIs(shaper.select(self.queue, now)[0], other)
+            self.assertIs(shaper.select(self.queue, now)[0], None)
+            self.assertEqual(len(checked), 4)  # the backlog is not scanned
+            self.assertIs(shaper.select(self.queue, now + 0.51)[0], busy[1])
+
+        def test_routingBusy(self):
+            shaper = TrafficShaper()
+            transmission = self._add("1/1/1")
+            now = time.time()
+            shaper.routingBusy(0.1, now)
+            self.assertEqual(shaper.busyCount, 1)
+            self.assertIs(shaper.select(self.queue, now)[0], None)
+            delay = shaper.select(self.queue, now + 0.05)[1]
+            self.assertTrue(0.05 <= delay <= 0.1)
+            shaper.routingBusy(0.1, now + 0.05)
+            self.assertEqual(shaper.busyCount, 2)
+            self.assertIs(shaper.select(self.queue, now + 0.3)[0], transmission)
+            self.assertEqual(shaper.busyCount, 2)
+            self._add("1/1/1")
+            shaper.select(self.queue, now + 1.)
+            self.assertEqual(shaper.busyCount, 0)
+
+
+    unittest.main()
@@ -0,0 +1,489 @@
+# -*- coding: utf-8 -*-
+
+""" Python KNX framework
+
+License
+=======
+
+ - B{pKNyX} (U{http://www.pknyx.org}) is Copyright:
+  - (C) 2013-2015 Frédéric Mantegazza
+
+This program is free software; you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation; either version 2 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program; if not, write to the Free Software
+Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+or see:
+
+ - U{http://www.gnu.org/licenses/gpl.html}
+
+Module purpose
+==============
+
+Transceiver management
+
+Implements
+==========
+
+ - B{LoopbackBus}
+ - B{LoopbackTransceiver}
+ - B{LoopbackTransceiverValueError}
+
+Documentation
+=============
+
+In-process transceiver. All L{LoopbackTransceiver}s attached to the same L{LoopbackBus} exchange frames through
+in-memory queues, without any socket: several L{Stack<pknyx.stack.stack>}s can be connected in a single
+process, to simulate large installations, or for testing.
+
+Each transmitted frame is decoded once, and the resulting (immutable) telegram is shared by all receivers. The
+frame is not looped back to its sender.
+
+The bus can inject a constant latency, and randomly drop frames (per receiver).
+
+Usage
+=====
+
+>>> bus = LoopbackBus(latency=0.001)
+>>> stack1 = Stack("1.1.1", transCls=LoopbackTransceiver, transParams=dict(bus=bus))
+>>> stack2 = Stack("1.1.2", transCls=LoopbackTransceiver, transParams=dict(bus=bus))
+
+@author: Frédéric Mantegazza
+@copyright: (C) 2013-2015 Frédéric Mantegazza
+@license: GPL
+"""
+
+__revision__ = "$Id$"
+
+import collections
+import random
+import threading
+import time
+
+from pknyx.common.exception import PKNyXValueError
+from pknyx.services.logger import Logger
+from pknyx.stack.result import Result
+from pknyx.stack.transceiver.transceiver import Transceiver
+from pknyx.stack.cemi.cemi import CEMIValueError
+from pknyx.stack.cemi.cemiLDataTelegram import CEMILDataTelegram
+
+
+class LoopbackTransceiverValueError(PKNyXValueError):
+    """
+    """
+
+
+class LoopbackBus(object):
+    """ In-memory bus shared by loopback transceivers
+
+    @ivar _latency: delay before a frame is delivered to receivers, in s
+    @type _latency: float
+
+    @ivar _loss: probability for a frame to be dropped, for each receiver
+    @type _loss: float
+
+    @ivar _random: random generator used to drop frames
+    @type _random: L{Random<random>}
+
+    @ivar _transceivers: attached transceivers
+    @type _transceivers: tuple of L{LoopbackTransceiver}
+
+    @ivar _lock: lock protecting the attached transceivers
+    @type _lock: L{Lock<threading>}
+    """
+    def __init__(self, latency=0., loss=0., seed=None):
+        """
+
+        @param latency: delay before a frame is delivered to receivers, in s
+        @type latency: float
+
+        @param loss: probability for a frame to be dropped, for each receiver (0. to 1.)
+        @type loss: float
+
+        @param seed: seed of the random generator used to drop frames, for reproducible simulations
+        @type seed: hashable
+
+        raise LoopbackTransceiverValueError:
+        """
+        super(LoopbackBus, self).__init__()
+
+        if latency < 0.:
+            raise LoopbackTransceiverValueError("invalid latency (%r)" % latency)
+        if not 0. <= loss <= 1.:
+            raise LoopbackTransceiverValueError("invalid loss (%r)" % loss)
+
+        self._latency = latency
+        self._loss = loss
+        self._random = random.Random(seed)
+
+        self._transceivers = ()
+        self._lock = threading.Lock()
+
+    @property
+    def latency(self):
+        return self._latency
+
+    @property
+    def loss(self):
+        return self._loss
+
+    @property
+    def transceivers(self):
+        return self._transceivers
+
+    def attach(self, transceiver):
+        """ Attach a transceiver to the bus
+
+        @param transceiver: transceiver to attach
+        @type transceiver: L{LoopbackTransceiver}
+        """
+        with self._lock:
+            if transceiver not in self._transceivers:
+                self._transceivers += (transceiver,)
+
+    def detach(self, transceiver):
+        """ Detach a transceiver from the bus
+
+        @param transceiver: transceiver to detach
+        @type transceiver: L{LoopbackTransceiver}
+        """
+        with self._lock:
+            self._transceivers = tuple([tc for tc in self._transceivers if tc is not transceiver])
+
+    def transmit(self, cEMI, sender):
+        """ Deliver a telegram to all attached transceivers, but the sender
+
+        @param cEMI: telegram to deliver
+        @type cEMI: L{CEMILDataTelegram<pknyx.stack.cemi.cemiLDataTelegram>}
+
+        @param sender: transmitting transceiver
+        @type sender: L{LoopbackTransceiver}
+        """
+        deliveryTime = time.time() + self._latency if self._latency else 0.
+        for transceiver in self._transceivers:  # atomic snapshot
+            if transceiver is sender:
+                continue
+            if self._loss and self._random.random() < self._loss:
+                continue
+            transceiver.deliver(cEMI, deliveryTime)
+
+
+class LoopbackTransceiver(Transceiver):
+    """ LoopbackTransceiver class
+
+    @ivar _bus: bus the transceiver is attached to
+    @type _bus: L{LoopbackBus}
+
+    @ivar _inQueue: delivered telegrams, with their delivery time
+    @type _inQueue: L{deque<collections>} of (float, L{CEMILDataTelegram<pknyx.stack.cemi.cemiLDataTelegram>})
+
+    @ivar _inCondition: condition protecting the input queue
+    @type _inCondition: L{Condition<threading>}
+
+    @ivar _receiver: receiver loop
+    @type _receiver: L{Thread<threading>}
+
+    @ivar _transmitter: transmitter loop
+    @type _transmitter: L{Thread<threading>}
+
+    @ivar _eventLoop: event loop running the transceiver (None to use receiver and transmitter threads)
+    @type _eventLoop: L{EventLoop<pknyx.stack.eventLoop>}
+    """
+    BATCH_SIZE = 64
+
+    _defaultBus = None
+
+    def __init__(self, tLSAP, bus=None, eventLoop=None):
+        """
+
+        @param tLSAP:
+        @type tLSAP: L{TransceiverLSAP}
+
+        @param bus: bus to attach to. If None, use a default bus, shared by the whole process
+        @type bus: L{LoopbackBus}
+
+        @param eventLoop: event loop running the transceiver. If None, the transceiver uses its own receiver and
+                          transmitter threads
+        @type eventLoop: L{EventLoop<pknyx.stack.eventLoop>}
+        """
+        super(LoopbackTransceiver, self).__init__(tLSAP)
+
+        self._logger = Logger()
+
+        if bus is None:
+            bus = LoopbackTransceiver.defaultBus()
+        self._bus = bus
+
+        self._inQueue = collections.deque()
+        self._inCondition = threading.Condition()
+
+        self._running = False
+        self._eventLoop = eventLoop
+
+        # Create transmitter and receiver threads
+        if eventLoop is None:
+            self._receiver = threading.Thread(target=self._receiverLoop, name="Loopback receiver")
+            self._transmitter = threading.Thread(target=self._transmitterLoop, name="Loopback transmitter")
+
+    @classmethod
+    def defaultBus(cls):
+        """ Return the default bus, shared by the whole process
+        """
+        if cls._defaultBus is None:
+            cls._defaultBus = LoopbackBus()
+
+        return cls._defaultBus
+
+    @property
+    def tLSAP(self):
+        return self._tLSAP
+
+    @property
+    def bus(self):
+        return self._bus
+
+    def deliver(self, cEMI, deliveryTime=0.):
+        """ Queue a telegram received from the bus
+
+        @param cEMI: received telegram
+        @type cEMI: L{CEMILDataTelegram<pknyx.stack.cemi.cemiLDataTelegram>}
+
+        @param deliveryTime: time at which the telegram must be given to the stack (0. for immediately)
+        @type deliveryTime: float
+        """
+        if self._eventLoop is not None:
+            delay = deliveryTime - time.time()
+            if delay > 0.:
+                self._eventLoop.callLater(delay, self._tLSAP.putInFrame, cEMI)
+            else:
+                self._tLSAP.putInFrame(cEMI)
+            return
+
+        with self._inCondition:
+            self._inQueue.append((deliveryTime, cEMI))
+            self._inCondition.notify()
+
+    def _receiverLoop(self):
+        """
+        """
+        self._logger.trace("LoopbackTransceiver._receiverLoop()")
+
+        inQueue = self._inQueue
+        while self._running:
+            try:
+                with self._inCondition:
+                    while self._running and not inQueue:
+                        self._inCondition.wait()
+                    if not self._running:
+                        break
+                    deliveryTime = inQueue[0][0]
+
+                # Latency is the same for all frames, so the oldest one is always the first to be delivered
+                delay = deliveryTime - time.time()
+                if delay > 0.:
+                    time.sleep(delay)
+
+                now = time.time()
+                cEMIs = []
+                with self._inCondition:
+                    while inQueue and inQueue[0][0] <= now and len(cEMIs) < LoopbackTransceiver.BATCH_SIZE:
+                        cEMIs.append(inQueue.popleft()[1])
+                if cEMIs:
+                    self._logger.debug("LoopbackTransceiver._receiverLoop(): %d cEMIs", len(cEMIs))
+                    self._tLSAP.putInFrames(cEMIs)
+
+            except:
+                self._logger.exception("LoopbackTransceiver._receiverLoop()")
+
+        self._logger.trace("LoopbackTransceiver._receiverLoop(): ended")
+
+    def _transmit(self, transmission):
+        """ Transmit a pending transmission, and confirm it
+        """
+        self._logger.debug("LoopbackTransceiver._transmit(): transmission=%r", transmission)
+
+        try:
+            cEMI = CEMILDataTelegram.decode(transmission.payload.raw)
+            self._bus.transmit(cEMI, self)
+            transmission.result = Result.OK
+        except CEMIValueError:
+            self._logger.exception("LoopbackTransceiver._transmit()")
+            transmission.result = Result.ERROR
+
+        if transmission.waitConfirm:
+            transmission.acquire()
+            try:
+                transmission.waitConfirm = False
+                transmission.notifyAll()
+            finally:
+                transmission.release()
+
+    def _transmitterLoop(self):
+        """
+        """
+        self._logger.trace("LoopbackTransceiver._transmitterLoop()")
+
+        while self._running:
+            try:
+                for transmission in self._tLSAP.getOutFrames(LoopbackTransceiver.BATCH_SIZE):
+                    self._transmit(transmission)
+
+            except:
+                self._logger.exception("LoopbackTransceiver._transmitterLoop()")
+
+        self._logger.trace("LoopbackTransceiver._transmitterLoop(): ended")
+
+    def start(self):
+        """
+        """
+        self._logger.trace("LoopbackTransceiver.start()")
+
+        self._running = True
+        self._bus.attach(self)
+        if self._eventLoop is None:
+            self._receiver.start()
+            self._transmitter.start()
+        else:
+            self._tLSAP.setTransmitHandler(self._transmitPending)
+            self._eventLoop.start()
+
+    def stop(self):
+        """
+        """
+        self._logger.trace("LoopbackTransceiver.stop()")
+
+        self._bus.detach(self)
+        self._running = False
+        with self._inCondition:
+            self._inCondition.notifyAll()
+
+    def join(self):
+        """
+        """
+        self._logger.trace("LoopbackTransceiver.join()")
+
+        if self._eventLoop is None:
+            self._transmitter.join()
+            self._receiver.join()
+
+
+if __name__ == '__main__':
+    import unittest
+
+    from pknyx.stack.transceiver.transceiverLSAP import TransceiverLSAP
+    from pknyx.stack.transceiver.transmission import Transmission
+    from pknyx.stack.cemi.cemiLData import CEMILData
+    from pknyx.stack.eventLoop import EventLoop
+
+    # Mute logger
+    Logger().setLevel('error')
+
+
+    class TransceiverLSAPTest(TransceiverLSAP):
+
+        def __init__(self):
+            super(TransceiverLSAPTest, self).__init__()
+            self.outFrames = collections.deque()
+            self.inFrames = []
+            self.event = threading.Event()
+
+        def getOutFrame(self, timeout=None):
+            try:
+                return self.outFrames.popleft()
+            except IndexError:
+                time.sleep(0.01)
+                return None
+
+        def putInFrame(self, cEMI):
+            self.inFrames.append((time.time(), cEMI))
+            self.event.set()
+
+        def setTransmitHandler(self, handler):
+            self.transmitHandler = handler
+
+
+    class LoopbackTransceiverTestCase(unittest.TestCase):
+
+        def setUp(self):
+            self.lsaps = [TransceiverLSAPTest() for i in range(3)]
+            self.cEMI = CEMILData(")\x00\xbc\xd0\x11\x0e\x19\x02\x01\x00\x80")
+
+        def tearDown(self):
+            pass
+
+        def _run(self, bus, timeout=0.2, eventLoop=None):
+            transceivers = [LoopbackTransceiver(lsap, bus, eventLoop) for lsap in self.lsaps]
+            for transceiver in transceivers:
+                transceiver.start()
+            try:
+                transmission = Transmission(self.cEMI.frame)
+                startTime = time.time()
+                self.lsaps[0].outFrames.append(transmission)
+                if eventLoop is not None:
+                    eventLoop.callSoon(self.lsaps[0].transmitHandler)
+                self.assertTrue(transmission.waitConfirmation(1.))
+                self.assertEqual(transmission.result, Result.OK)
+                for lsap in self.lsaps[1:]:
+                    lsap.event.wait(timeout)
+            finally:
+                for transceiver in transceivers:
+                    transceiver.stop()
+                for transceiver in transceivers:
+                    transceiver.join()
+
+            return startTime
+
+        def test_constructor(self):
+            with self.assertRaises(LoopbackTransceiverValueError):
+                LoopbackBus(latency=-1.)
+            with self.assertRaises(LoopbackTransceiverValueError):
+                LoopbackBus(loss=1.5)
+            tc = LoopbackTransceiver(self.lsaps[0])
+            self.assertIs(tc.bus, LoopbackTransceiver.defaultBus())
+
+        def test_transmit(self):
+            bus = LoopbackBus()
+            self._run(bus)
+            self.assertEqual(self.lsaps[0].inFrames, [])
+            for lsap in self.lsaps[1:]:
+                self.assertEqual(len(lsap.inFrames), 1)
+                cEMI = lsap.inFrames[0][1]
+                self.assertIsInstance(cEMI, CEMILDataTelegram)
+                self.assertEqual(cEMI.destinationAddress, self.cEMI.destinationAddress)
+                self.assertEqual(cEMI.nsdu, self.cEMI.nsdu)
+            self.assertIs(self.lsaps[1].inFrames[0][1], self.lsaps[2].inFrames[0][1])
+            self.assertEqual(bus.transceivers, ())
+
+        def test_latency(self):
+            startTime = self._run(LoopbackBus(latency=0.05))
+            for lsap in self.lsaps[1:]:
+                self.assertEqual(len(lsap.inFrames), 1)
+                self.assertGreaterEqual(lsap.inFrames[0][0] - startTime, 0.05)
+
+        def test_eventLoop(self):
+            eventLoop = EventLoop()
+            try:
+                startTime = self._run(LoopbackBus(latency=0.05), eventLoop=eventLoop)
+            finally:
+                eventLoop.stop()
+                eventLoop.join()
+            self.assertEqual(self.lsaps[0].inFrames, [])
+            for lsap in self.lsaps[1:]:
+                self.assertEqual(len(lsap.inFrames), 1)
+                self.assertGreaterEqual(lsap.inFrames[0][0] - startTime, 0.05)
+
+        def test_loss(self):
+            self._run(LoopbackBus(loss=1.), timeout=0.05)
+            for lsap in self.lsaps:
+                self.assertEqual(lsap.inFrames, [])
+
+
+    unittest.main()
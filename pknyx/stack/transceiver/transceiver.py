@@ -59,6 +59,7 @@ class Transceiver(object):
     @type _tLSAP:
     """
     OVERHEAD = 2
+    BATCH_SIZE = 64
 
     def __init__(self, tLSAP):
         """
@@ -70,6 +71,23 @@ class Transceiver(object):
 
         self._tLSAP = tLSAP
 
+    def _transmit(self, transmission):
+        """ Transmit a pending transmission, and confirm it
+        """
+        raise NotImplementedError
+
+    def _transmitPending(self):
+        """ Transmit all pending transmissions, without blocking
+
+        Used as transmit handler when running in an event loop.
+        """
+        while True:
+            transmissions = self._tLSAP.getOutFrames(self.BATCH_SIZE, timeout=0)
+            for transmission in transmissions:
+                self._transmit(transmission)
+            if len(transmissions) < self.BATCH_SIZE:
+                break
+
     def cleanup(self):
         raise NotImplementedError
 
@@ -60,12 +60,50 @@ class TransceiverLSAP(object):
         """
         super(TransceiverLSAP, self).__init__()
 
-    def getOutFrame(self):
+    def getOutFrame(self, timeout=None):
         """ Get output frame
+
+        Blocks until a frame is available (or timeout expired, if given).
         """
         raise NotImplementedError
 
+    def getOutFrames(self, maxCount, timeout=None):
+        """ Get output frames
+
+        Blocks until a frame is available (or timeout expired, if given), then returns all pending frames,
+        up to maxCount.
+
+        Default implementation relies on L{getOutFrame}; override for a more efficient implementation.
+        """
+        lPDUs = []
+        lPDU = self.getOutFrame(timeout)
+        while lPDU is not None:
+            lPDUs.append(lPDU)
+            if len(lPDUs) >= maxCount:
+                break
+            lPDU = self.getOutFrame(0)
+
+        return lPDUs
+
+    def routingBusy(self, waitTime):
+        """ Suspend transmissions (KNXnet/IP routing flow control)
+
+        Default implementation ignores the request.
+
+        @param waitTime: wait time requested by the router, in s
+        @type waitTime: float
+        """
+        pass
+
     def putInFrame(self, lPDU):
         """ Set input frame
         """
         raise NotImplementedError
+
+    def putInFrames(self, lPDUs):
+        """ Set input frames
+
+        Default implementation relies on L{putInFrame}; override for a more efficient implementation.
+        """
+        for lPDU in lPDUs:
+            self.putInFrame(lPDU)
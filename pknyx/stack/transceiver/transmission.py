@@ -49,6 +49,7 @@ Usage
 
 __revision__ = "$Id$"
 
+import time
 import threading
 
 from pknyx.common.exception import PKNyXValueError
@@ -70,10 +71,13 @@ class Transmission(object):
     @ivar _waitConfirm:
     @type _waitConfirm: bool
 
+    @ivar _destination: destination address of the frame (used to shape the traffic)
+    @type _destination: L{KnxAddress<pknyx.stack.knxAddress>}
+
     @ivar _result:
     @type _result: int
     """
-    def __init__(self, payload, waitConfirm=True):
+    def __init__(self, payload, waitConfirm=True, destination=None):
         """
 
         @param payload:
@@ -82,12 +86,16 @@ class Transmission(object):
         @param waitConfirm:
         @type waitConfirm: bool
 
+        @param destination: destination address of the frame
+        @type destination: L{KnxAddress<pknyx.stack.knxAddress>}
+
         raise TransmissionValueError:
         """
         super(Transmission, self).__init__()
 
         self._payload = payload
         self._waitConfirm = waitConfirm
+        self._destination = destination
         self._result = Result.OK
 
         self._condition = threading.Condition()
@@ -99,6 +107,14 @@ class Transmission(object):
     def payload(self):
         return self._payload
 
+    @payload.setter
+    def payload(self, payload):
+        self._payload = payload
+
+    @property
+    def destination(self):
+        return self._destination
+
     @property
     def waitConfirm(self):
         return self._waitConfirm
@@ -118,6 +134,59 @@ class Transmission(object):
 
         self._result = code
 
+    @property
+    def done(self):
+        return not self._waitConfirm
+
+    def waitConfirmation(self, timeout=None):
+        """ Wait until the transmission has been handled by the transceiver
+
+        @param timeout: max time to wait, in s (None blocks until confirmed)
+        @type timeout: float
+
+        @return: True if the transmission has been confirmed, False if timeout expired
+        @rtype: bool
+        """
+        if timeout is not None:
+            endTime = time.time() + timeout
+        self._condition.acquire()
+        try:
+            while self._waitConfirm:
+                if timeout is None:
+                    self._condition.wait()
+                else:
+                    remaining = endTime - time.time()
+                    if remaining <= 0:
+                        return False
+                    self._condition.wait(remaining)
+        finally:
+            self._condition.release()
+
+        return True
+
+    @classmethod
+    def waitAll(cls, transmissions, timeout=None):
+        """ Wait until all given transmissions have been handled by the transceiver
+
+        @param transmissions: transmissions to wait for
+        @type transmissions: iterable of L{Transmission}
+
+        @param timeout: max time to wait for all transmissions, in s (None blocks until all are confirmed)
+        @type timeout: float
+
+        @return: True if all transmissions have been confirmed, False if timeout expired
+        @rtype: bool
+        """
+        if timeout is not None:
+            endTime = time.time() + timeout
+        for transmission in transmissions:
+            if timeout is None:
+                transmission.waitConfirmation()
+            elif not transmission.waitConfirmation(max(0., endTime - time.time())):
+                return False
+
+        return True
+
     def acquire(self):
         self._condition.acquire()
 
@@ -144,7 +213,7 @@ if __name__ == '__main__':
     class TransmissionTestCase(unittest.TestCase):
 
         def setUp(self):
-            pass
+            self.transmission = Transmission(bytearray(1))
 
         def tearDown(self):
             pass
@@ -152,5 +221,27 @@ if __name__ == '__main__':
         def test_constructor(self):
             pass
 
+        def _confirm(self, transmission):
+            transmission.acquire()
+            try:
+                transmission.waitConfirm = False
+                transmission.notifyAll()
+            finally:
+                transmission.release()
+
+        def test_waitConfirmation(self):
+            self.assertFalse(self.transmission.done)
+            self.assertFalse(self.transmission.waitConfirmation(0.01))
+            threading.Timer(0.01, self._confirm, (self.transmission,)).start()
+            self.assertTrue(self.transmission.waitConfirmation(1))
+            self.assertTrue(self.transmission.done)
+
+        def test_waitAll(self):
+            transmissions = [Transmission(bytearray(1)) for i in xrange(3)]
+            self.assertFalse(Transmission.waitAll(transmissions, 0.01))
+            for transmission in transmissions:
+                self._confirm(transmission)
+            self.assertTrue(Transmission.waitAll(transmissions))
+
 
     unittest.main()
@@ -51,9 +51,9 @@ Usage
 
 __revision__ = "$Id$"
 
-import time
 import threading
 import socket
+import struct
 
 from pknyx.common.exception import PKNyXValueError
 from pknyx.services.logger import Logger
@@ -64,7 +64,8 @@ from pknyx.stack.individualAddress import IndividualAddress
 from pknyx.stack.multicastSocket import MulticastSocketReceive, MulticastSocketTransmit
 from pknyx.stack.transceiver.transceiver import Transceiver
 from pknyx.stack.knxnetip.knxNetIPHeader import KNXnetIPHeader, KNXnetIPHeaderValueError
-from pknyx.stack.cemi.cemiLData import CEMILData, CEMIValueError
+from pknyx.stack.cemi.cemi import CEMIValueError
+from pknyx.stack.cemi.cemiLDataTelegram import CEMILDataTelegram
 
 
 class UDPTransceiverValueError(PKNyXValueError):
@@ -86,8 +87,25 @@ class UDPTransceiver(Transceiver):
 
     @ivar _transmitter: multicast transmitter loop
     @type _transmitter: L{Thread<threading>}
+
+    @ivar _inBuffer: receive buffer
+    @type _inBuffer: bytearray
+
+    @ivar _inView: zero-copy view on the receive buffer
+    @type _inView: memoryview
+
+    @ivar _batch: if True, drain all ready datagrams/pending transmissions on each wakeup
+    @type _batch: bool
+
+    @ivar _eventLoop: event loop running the transceiver (None to use receiver and transmitter threads)
+    @type _eventLoop: L{EventLoop<pknyx.stack.eventLoop>}
     """
-    def __init__(self, tLSAP, mcastAddr="224.0.23.12", mcastPort=3671):
+    BATCH_SIZE = 64
+
+    # structure length, device state, wait time (ms), control field
+    ROUTING_BUSY_STRUCT = struct.Struct(">BBHH")
+
+    def __init__(self, tLSAP, mcastAddr="224.0.23.12", mcastPort=3671, batch=False, eventLoop=None):
         """
 
         @param tLSAP:
@@ -99,22 +117,40 @@ class UDPTransceiver(Transceiver):
         @param mcastPort: multicast port to bind to
         @type mcastPort: str
 
+        @param batch: if True, receive all ready datagrams at once (using select), and send all pending
+                      transmissions in a row, up to BATCH_SIZE
+        @type batch: bool
+
+        @param eventLoop: event loop running the transceiver. If None, the transceiver uses its own receiver and
+                          transmitter threads
+        @type eventLoop: L{EventLoop<pknyx.stack.eventLoop>}
+
         raise UDPTransceiverValueError:
         """
         super(UDPTransceiver, self).__init__(tLSAP)
 
+        self._logger = Logger()
+
         self._mcastAddr = mcastAddr
         self._mcastPort = mcastPort
+        self._batch = batch
+        self._eventLoop = eventLoop
+        self._running = False
 
         localAddr = socket.gethostbyname(socket.gethostname())
         self._receiverSock = MulticastSocketReceive(localAddr, mcastAddr, mcastPort)
         self._transmitterSock = MulticastSocketTransmit(localAddr, mcastPort, mcastAddr, mcastPort)
 
+        # Receive buffer, re-used for all incoming datagrams
+        self._inBuffer = bytearray(MulticastSocketReceive.MAX_DATAGRAM_SIZE)
+        self._inView = memoryview(self._inBuffer)
+
         # Create transmitter and receiver threads
-        self._receiver = threading.Thread(target=self._receiverLoop, name="UDP receiver")
-        #self._receiver.setDaemon(True)
-        self._transmitter = threading.Thread(target=self._transmitterLoop, name="UDP transmitter")
-        #self._transmitter.setDaemon(True)
+        if eventLoop is None:
+            self._receiver = threading.Thread(target=self._receiverLoop, name="UDP receiver")
+            #self._receiver.setDaemon(True)
+            self._transmitter = threading.Thread(target=self._transmitterLoop, name="UDP transmitter")
+            #self._transmitter.setDaemon(True)
 
     @property
     def tLSAP(self):
@@ -136,119 +172,177 @@ class UDPTransceiver(Transceiver):
     def localPort(self):
         return self._receiverSock.localPort
 
+    def _decodeInFrame(self, inFrame, fromAddr, fromPort):
+        """ Decode an incoming datagram
+
+        The datagram is parsed in place; only the nSDU is copied, once.
+
+        @param inFrame: received datagram
+        @type inFrame: memoryview
+
+        @return: decoded cEMI telegram, or None if the datagram must be dropped
+        @rtype: L{CEMILDataTelegram}
+        """
+        self._logger.debug("UDPTransceiver._decodeInFrame(): inFrame length=%d (%s, %d)", len(inFrame), fromAddr, fromPort)
+        try:
+            header = KNXnetIPHeader(inFrame)
+        except KNXnetIPHeaderValueError:
+            self._logger.exception("UDPTransceiver._decodeInFrame()", debug=True)
+            return None
+        self._logger.debug("UDPTransceiver._decodeInFrame(): KNXnetIP header=%r", header)
+
+        frame = inFrame[KNXnetIPHeader.HEADER_SIZE:]
+        if header.service == KNXnetIPHeader.ROUTING_BUSY:
+            if len(frame) < UDPTransceiver.ROUTING_BUSY_STRUCT.size:
+                self._logger.warning("UDPTransceiver._decodeInFrame(): ROUTING_BUSY too short (%d)" % len(frame))
+            else:
+                length, deviceState, waitTime, control = UDPTransceiver.ROUTING_BUSY_STRUCT.unpack_from(frame)
+                self._logger.debug("UDPTransceiver._decodeInFrame(): ROUTING_BUSY from %s (wait time=%dms)",
+                                   fromAddr, waitTime)
+                self._tLSAP.routingBusy(waitTime / 1000.)
+            return None
+        try:
+            cEMI = CEMILDataTelegram.decode(frame)
+        except CEMIValueError:
+            self._logger.exception("UDPTransceiver._decodeInFrame()")  #, debug=True)
+            return None
+        self._logger.debug("UDPTransceiver._decodeInFrame(): cEMI=%r", cEMI)
+
+        destAddr = cEMI.destinationAddress
+        if isinstance(destAddr, GroupAddress):
+            return cEMI
+        elif isinstance(destAddr, IndividualAddress):
+            self._logger.warning("UDPTransceiver._decodeInFrame(): unsupported destination address type (%s)" % repr(destAddr))
+        else:
+            self._logger.warning("UDPTransceiver._decodeInFrame(): unknown destination address type (%s)" % repr(destAddr))
+
+        return None
+
+    def _receiveAll(self):
+        """ Receive and decode all ready datagrams, and give them to the stack at once
+        """
+        cEMIs = []
+        for length, (fromAddr, fromPort) in self._receiverSock.receiveAll(self._inBuffer, UDPTransceiver.BATCH_SIZE):
+            try:
+                cEMI = self._decodeInFrame(self._inView[:length], fromAddr, fromPort)
+            except:
+                self._logger.exception("UDPTransceiver._receiveAll()")  #, debug=True)
+                continue
+            if cEMI is not None:
+                cEMIs.append(cEMI)
+        if cEMIs:
+            self._tLSAP.putInFrames(cEMIs)
+
     def _receiverLoop(self):
         """
         """
-        Logger().trace("UDPTransceiver._receiverLoop()")
+        self._logger.trace("UDPTransceiver._receiverLoop()")
 
         while self._running:
             try:
-                inFrame, (fromAddr, fromPort) = self._receiverSock.receive()
-                Logger().debug("UDPTransceiver._receiverLoop(): inFrame=%s (%s, %d)" % (repr(inFrame), fromAddr, fromPort))
-                inFrame = bytearray(inFrame)
-                try:
-                    header = KNXnetIPHeader(inFrame)
-                except KNXnetIPHeaderValueError:
-                    Logger().exception("UDPTransceiver._receiverLoop()", debug=True)
-                    continue
-                Logger().debug("UDPTransceiver._receiverLoop(): KNXnetIP header=%s" % repr(header))
-
-                frame = inFrame[KNXnetIPHeader.HEADER_SIZE:]
-                Logger().debug("UDPTransceiver._receiverLoop(): frame=%s" % repr(frame))
-                try:
-                    cEMI = CEMILData(frame)
-                except CEMIValueError:
-                    Logger().exception("UDPTransceiver._receiverLoop()")  #, debug=True)
-                    continue
-                Logger().debug("UDPTransceiver._receiverLoop(): cEMI=%s" % cEMI)
-
-                destAddr = cEMI.destinationAddress
-                if isinstance(cEMI.destinationAddress, GroupAddress):
-                    self._tLSAP.putInFrame(cEMI)
-
-                elif isinstance(destAddr, IndividualAddress):
-                    Logger().warning("UDPTransceiver._receiverLoop(): unsupported destination address type (%s)" % repr(destAddr))
+                if self._batch:
+                    self._receiveAll()
+
                 else:
-                    Logger().warning("UDPTransceiver._receiverLoop(): unknown destination address type (%s)" % repr(destAddr))
+                    length, (fromAddr, fromPort) = self._receiverSock.receiveInto(self._inBuffer)
+                    cEMI = self._decodeInFrame(self._inView[:length], fromAddr, fromPort)
+                    if cEMI is not None:
+                        self._tLSAP.putInFrame(cEMI)
 
             except socket.timeout:
                 pass
                 #Logger().exception("UDPTransceiver._receiverLoop()", debug=True)
 
             except:
-                Logger().exception("UDPTransceiver._receiverLoop()")  #, debug=True)
+                self._logger.exception("UDPTransceiver._receiverLoop()")  #, debug=True)
 
         self._receiverSock.close()
 
-        Logger().trace("UDPTransceiver._receiverLoop(): ended")
+        self._logger.trace("UDPTransceiver._receiverLoop(): ended")
+
+    def _transmit(self, transmission):
+        """ Transmit a pending transmission, and confirm it
+        """
+        self._logger.debug("UDPTransceiver._transmit(): transmission=%r", transmission)
+
+        cEMIFrame = transmission.payload
+        cEMIRawFrame = cEMIFrame.raw
+        header = KNXnetIPHeader(service=KNXnetIPHeader.ROUTING_IND, serviceLength=len(cEMIRawFrame))
+        frame = header.frame + cEMIRawFrame
+        self._logger.debug("UDPTransceiver._transmit(): frame= %r", frame)
+
+        try:
+            self._transmitterSock.transmit(frame)
+            transmission.result = Result.OK
+        except:
+            self._logger.exception("UDPTransceiver._transmit()")
+            transmission.result = Result.ERROR
+
+        if transmission.waitConfirm:
+            transmission.acquire()
+            try:
+                transmission.waitConfirm = False
+                transmission.notifyAll()
+            finally:
+                transmission.release()
+            self._logger.debug("UDPTransceiver._transmit(): transmission=%r", transmission)
 
     def _transmitterLoop(self):
         """
         """
-        Logger().trace("UDPTransceiver._transmitterLoop()")
+        self._logger.trace("UDPTransceiver._transmitterLoop()")
 
         while self._running:
             try:
-                transmission = self._tLSAP.getOutFrame()
-
-                if transmission is not None:
-                    Logger().debug("UDPTransceiver._transmitterLoop(): transmission=%s" % repr(transmission))
-
-                    cEMIFrame = transmission.payload
-                    cEMIRawFrame = cEMIFrame.raw
-                    header = KNXnetIPHeader(service=KNXnetIPHeader.ROUTING_IND, serviceLength=len(cEMIRawFrame))
-                    frame = header.frame + cEMIRawFrame
-                    Logger().debug("UDPTransceiver._transmitterLoop(): frame= %s" % repr(frame))
-
-                    try:
-                        self._transmitterSock.transmit(frame)
-                        transmission.result = Result.OK
-                    except:
-                        Logger().exception("UDPTransceiver._transmitterLoop()")
-                        transmission.result = Result.ERROR
-
-                    if transmission.waitConfirm:
-                        transmission.acquire()
-                        try:
-                            transmission.waitConfirm = False
-                            transmission.notify()
-                        finally:
-                            transmission.release()
-                        Logger().debug("UDPTransceiver._transmitterLoop(): transmission=%s" % repr(transmission))
+                if self._batch:
+                    for transmission in self._tLSAP.getOutFrames(UDPTransceiver.BATCH_SIZE):
+                        self._transmit(transmission)
 
                 else:
-                    time.sleep(0.001)
+                    transmission = self._tLSAP.getOutFrame()
+                    if transmission is not None:
+                        self._transmit(transmission)
 
             except:
-                Logger().exception("UDPTransceiver._transmitterLoop()")  #, debug=True)
+                self._logger.exception("UDPTransceiver._transmitterLoop()")  #, debug=True)
 
         self._transmitterSock.close()
 
-        Logger().trace("UDPTransceiver._transmitterLoop(): ended")
+        self._logger.trace("UDPTransceiver._transmitterLoop(): ended")
 
     def start(self):
         """
         """
-        Logger().trace("UDPTransceiver.start()")
+        self._logger.trace("UDPTransceiver.start()")
 
         self._running = True
-        self._receiver.start()
-        self._transmitter.start()
+        if self._eventLoop is None:
+            self._receiver.start()
+            self._transmitter.start()
+        else:
+            self._tLSAP.setTransmitHandler(self._transmitPending)
+            self._eventLoop.addReader(self._receiverSock, self._receiveAll)
+            self._eventLoop.start()
 
     def stop(self):
         """
         """
-        Logger().trace("UDPTransceiver.stop()")
+        self._logger.trace("UDPTransceiver.stop()")
 
         self._running = False
+        if self._eventLoop is not None:
+            self._eventLoop.removeReader(self._receiverSock)
+            self._eventLoop.callSoon(self._receiverSock.close)
+            self._eventLoop.callSoon(self._transmitterSock.close)
 
     def join(self):
         """
         """
-        Logger().trace("UDPTransceiver.join()")
+        self._logger.trace("UDPTransceiver.join()")
 
-        self._transmitter.join()
-        self._receiver.join()
+        if self._eventLoop is None:
+            self._transmitter.join()
+            self._receiver.join()
 
 
 if __name__ == '__main__':
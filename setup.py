@@ -72,6 +72,7 @@ setup(name=config.APP_NAME,
       download_url="http://www.pknyx.org/wiki/Download",
 
       packages=["pknyx",
+                "pknyx.benchmarks",
                 "pknyx.common",
                 "pknyx.core",
                 "pknyx.core.dptXlator",
@@ -94,4 +95,6 @@ setup(name=config.APP_NAME,
 
       install_requires=["APScheduler == 2.1.2",
                         "argparse"],
+
+      extras_require={"numpy": ["numpy"]},
 )